@@ -43,15 +43,18 @@ constant_table_list = [
    at_cascade/add_log_entry.py
    at_cascade/avgint_parent_grid.py
    at_cascade/bilinear.py
+   at_cascade/cascade_context.py
    at_cascade/cascade_root_node.py
    at_cascade/check_cascade_node.py
    at_cascade/check_log.py
    at_cascade/clear_shared.py
    at_cascade/com_cov_reference.py
+   at_cascade/com_cov_reference_all.py
    at_cascade/continue_cascade.py
    at_cascade/copy_other_tbl.py
    at_cascade/copy_root_db.py
    at_cascade/create_all_node_db.py
+   at_cascade/create_job_queue.py
    at_cascade/create_job_table.py
    at_cascade/create_shift_db.py
    at_cascade/data_include.py
@@ -70,10 +73,17 @@ constant_table_list = [
    at_cascade/get_parent_node.py
    at_cascade/get_var_id.py
    at_cascade/job_descendant.py
+   at_cascade/job_priority.py
+   at_cascade/job_progress.py
+   at_cascade/job_subtree.py
    at_cascade/map_shared.py
    at_cascade/move_table.py
    at_cascade/no_ode_fit.py
    at_cascade/omega_constraint.py
+   at_cascade/queue_worker.py
+   at_cascade/run_one_job.py
+   at_cascade/set_job_queue_status.py
+   at_cascade/system_command.py
    at_cascade/table_exists.py
    at_cascade/table_name2id.py
 }
@@ -90,15 +100,18 @@ from .                      import csv
 from .add_log_entry         import add_log_entry
 from .avgint_parent_grid    import avgint_parent_grid
 from .bilinear              import bilinear
+from .cascade_context       import cascade_context
 from .cascade_root_node     import cascade_root_node
 from .check_cascade_node    import check_cascade_node
 from .check_log             import check_log
 from .clear_shared          import clear_shared
 from .com_cov_reference     import com_cov_reference
+from .com_cov_reference_all import com_cov_reference_all
 from .continue_cascade      import continue_cascade
 from .copy_other_tbl        import copy_other_tbl
 from .copy_root_db          import copy_root_db
 from .create_all_node_db    import create_all_node_db
+from .create_job_queue      import create_job_queue
 from .create_job_table      import create_job_table
 from .create_shift_db       import create_shift_db
 from .data_include          import data_include
@@ -117,10 +130,17 @@ from .get_freeze_dict       import get_freeze_dict
 from .get_parent_node       import get_parent_node
 from .get_var_id            import get_var_id
 from .job_descendant        import job_descendant
+from .job_priority          import job_priority
+from .job_progress          import job_progress
+from .job_subtree           import job_subtree
 from .map_shared            import map_shared
 from .move_table            import move_table
 from .no_ode_fit            import no_ode_fit
 from .omega_constraint      import omega_constraint
+from .queue_worker          import queue_worker
+from .run_one_job           import run_one_job
+from .set_job_queue_status  import set_job_queue_status
+from .system_command        import system_command
 from .table_exists          import table_exists
 from .table_name2id         import table_name2id
 # END_SORT_THIS_LINE_MINUS_1
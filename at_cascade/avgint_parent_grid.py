@@ -49,6 +49,8 @@ fit_job_id
 **********
 This is the :ref:`create_job_table@job_table@job_id`
 for the job fits the fit_database.
+The children of this job in *job_table* determine the
+child covariate references in the avgint table.
 This is not used when *job_table* is ``None`` .
 
 parent_node
@@ -108,17 +110,15 @@ import at_cascade
 # ----------------------------------------------------------------------------
 # cov_reference_list =
 def get_cov_reference_list(
-   n_covariate, cov_reference_table, node_id, split_reference_id
+   n_covariate, cov_reference_index, node_id, split_reference_id
 ) :
    #
-   #
-   cov_reference_list = n_covariate * [None]
-   for row in cov_reference_table :
-      if row['node_id'] == node_id :
-         if row['split_reference_id'] == split_reference_id :
-            covariate_id = row['covariate_id']
-            if covariate_id < len(cov_reference_list) :
-               cov_reference_list[covariate_id] = row['reference_value']
+   # cov_reference_list
+   # see cascade_context.cov_reference_index
+   key                 = (node_id, split_reference_id)
+   reference           = cov_reference_index.get(key, list())
+   cov_reference_list  = reference[: n_covariate]
+   cov_reference_list += (n_covariate - len(cov_reference_list)) * [None]
    if None in cov_reference_list :
       covariate_id = cov_reference_list.index(None)
       msg  = 'all_node database: cov_reference table: '
@@ -130,121 +130,6 @@ def get_cov_reference_list(
    #
    return cov_reference_list
 # ----------------------------------------------------------------------------
-# This routine is very similar to get_child_job_table in create_job_table.
-# Perhaps there is a good way to combine these two routines.
-#
-# child_job_list =
-def possible_child_job_list(
-   # all node database tables
-   option_all_table      ,
-   node_split_table      ,
-   split_reference_table ,
-   # fit node database tables
-   fit_node_id           ,
-   node_table            ,
-   covariate_table       ,
-) :
-   assert type(fit_node_id) == int
-   tables = (
-      option_all_table      ,
-      node_split_table      ,
-      split_reference_table ,
-      node_table            ,
-      covariate_table       ,
-   )
-   for table in tables :
-      assert type(table) == list
-      if len(table) > 0 :
-         assert type( table[0] == dict )
-   #
-   # option_all_dict
-   option_all_dict = dict()
-   for row in option_all_table :
-      option_all_dict[ row['option_name'] ] = row['option_value']
-   #
-   # fit_node_children
-   fit_node_children = list()
-   for (node_id, row) in enumerate(node_table) :
-      if row['parent'] == fit_node_id :
-         fit_node_children.append(node_id)
-   #
-   # refit_split
-   if 'refit_split' in option_all_dict :
-      refit_split = option_all_dict['refit_split']
-      assert refit_split in [ 'true', 'false' ]
-      refit_split = refit_split == 'true'
-   else :
-      refit_split = False
-   #
-   # root_node_name
-   assert 'root_node_name' in option_all_dict
-   root_node_name = option_all_dict['root_node_name']
-   #
-   # root_node_id
-   root_node_id = at_cascade.table_name2id(node_table, 'node', root_node_name)
-   #
-   # root_split_reference_id
-   if 'root_split_reference_name' in option_all_dict :
-      root_split_reference_name = option_all_dict['root_split_reference_name']
-      root_split_reference_id   = at_cascade.table_name2id(
-         split_reference_table,
-         'split_reference',
-         root_split_reference_name
-      )
-   else :
-      root_split_reference_id   = None
-      if refit_split :
-         msg  = 'option_all_table: refit_split is true and '
-         msg += ' root_split_reference_name does not appear'
-         assert False, msg
-   #
-   # fit_split_reference_id
-   cov_info = at_cascade.get_cov_info(
-      option_all_table, covariate_table, split_reference_table
-   )
-   if 'split_reference_id' not in cov_info :
-      fit_split_reference_id = None
-   else :
-      fit_split_reference_id = cov_info['split_reference_id']
-   #
-   # Special case where there is no splitting covariate
-   if fit_split_reference_id == None :
-      child_job_list = list()
-      for shift_node_id in fit_node_children :
-         child_job = (shift_node_id, None)
-         child_job_list.append(child_job)
-      return child_job_list
-   #
-   # already_split
-   already_split = root_split_reference_id != fit_split_reference_id
-   #
-   # node_split_set
-   node_split_set = set()
-   for row in node_split_table :
-      node_split_set.add( row['node_id'] )
-   #
-   # shift_reference_set
-   if already_split or fit_node_id not in node_split_set :
-      shift_reference_set = { fit_split_reference_id }
-   else :
-      shift_reference_set = set( range( len(split_reference_table) ) )
-      shift_reference_set.remove( root_split_reference_id )
-   #
-   #
-   # child_job_list
-   child_job_list = list()
-   if fit_node_id in node_split_set and not already_split and refit_split :
-      for shift_split_reference_id in shift_reference_set :
-         child_job = (fit_node_id, shift_split_reference_id)
-         child_job_list.append(child_job)
-   else :
-      for shift_split_reference_id in shift_reference_set :
-         for shift_node_id in fit_node_children :
-            child_job = (shift_node_id, shift_split_reference_id)
-            child_job_list.append(child_job)
-   #
-   return child_job_list
-# ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.avgint_parent_grid
 def avgint_parent_grid(
@@ -257,18 +142,15 @@ def avgint_parent_grid(
    assert type(fit_database) == str
    assert type(job_table) == list or job_table == None
    assert type(fit_job_id) == int or fit_job_id == None
+   assert job_table == None or fit_job_id != None
    # END_DEF
    #
    # option_all_table
-   connection = dismod_at.create_connection(
-      all_node_database, new = False, readonly = True
-   )
-   get_table             = dismod_at.get_table_dict
-   option_all_table      = get_table(connection, 'option_all')
-   node_split_table      = get_table(connection, 'node_split')
-   split_reference_table = get_table(connection, 'split_reference')
-   cov_reference_table   = get_table(connection, 'cov_reference')
-   connection.close()
+   context               = at_cascade.cascade_context(all_node_database)
+   get_table             = context.get_table
+   option_all_table      = get_table('option_all')
+   split_reference_table = get_table('split_reference')
+   cov_reference_index   = context.cov_reference_index()
    #
    # root_database
    root_database      = None
@@ -332,14 +214,15 @@ def avgint_parent_grid(
    )
    #
    # child_job_list
-   child_job_list = possible_child_job_list(
-      option_all_table       = option_all_table,
-      node_split_table       = node_split_table ,
-      split_reference_table  = split_reference_table ,
-      fit_node_id            = parent_node_id,
-      node_table             = fit_tables['node'],
-      covariate_table        = fit_tables['covariate'],
-   )
+   # (fit_node_id, split_reference_id) for the children of the fit job
+   child_job_list = list()
+   if job_table != None :
+      start_child_job_id = job_table[fit_job_id]['start_child_job_id']
+      end_child_job_id   = job_table[fit_job_id]['end_child_job_id']
+      for job_id in range(start_child_job_id, end_child_job_id) :
+         job_row   = job_table[job_id]
+         child_job = ( job_row['fit_node_id'], job_row['split_reference_id'] )
+         child_job_list.append(child_job)
    #
    # cov_reference_dict
    n_covariate  = len( fit_tables['covariate'] )
@@ -349,7 +232,7 @@ def avgint_parent_grid(
       # cov_reference_list
       cov_reference_list = get_cov_reference_list(
          n_covariate,
-         cov_reference_table,
+         cov_reference_index,
          parent_node_id,
          fit_split_reference_id
       )
@@ -367,7 +250,7 @@ def avgint_parent_grid(
          assert shift_node_id == parent_node_id or node_id == parent_node_id
          cov_reference_list = get_cov_reference_list(
             n_covariate,
-            cov_reference_table,
+            cov_reference_index,
             shift_node_id,
             shift_split_reference_id
          )
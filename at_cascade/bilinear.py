@@ -1,11 +1,14 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
-# SPDX-FileContributor: 2021-24 Bradley M. Bell
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
 # ----------------------------------------------------------------------------
+import bisect
 import numpy
-import scipy.interpolate
 """
 {xrst_begin bilinear}
+{xrst_spell
+   scipy
+}
 
 Bilinear Spline Interpolation
 #############################
@@ -72,23 +75,231 @@ sets z to the value of the spline for *z_name* .
 
 #. The values x and y are ``float`` or ``int`` .
 #. The value z is a  ``float`` .
+#. If x and y are ``numpy.ndarray`` with the same shape,
+   z is a ``numpy.ndarray`` with that shape and each element of z is
+   equal to the value of the spline at the corresponding elements of x and y.
+   This is faster than calling the spline once for each (x, y) pair
+   and the results are the same.
 #. The function is extended as constant with respect to x (y)
    for values of x (y) outside the limits of x_grid (y_grid).
 
+Many Columns
+============
+All the splines in *spline_dict* share one rectangular grid object
+*grid* = *spline_dict* [ *z_name* ] ``.grid`` and
+*spline_dict* [ *z_name* ] ``.z_index`` is the index of *z_name*
+in *z_list* . The function call
+{xrst_code py}
+   z = grid(x, y, z_index_list)
+{xrst_code}
+evaluates the splines with index in *z_index_list* at the
+``numpy.ndarray`` x and y (which have the same shape).
+The return value z is a ``numpy.ndarray`` with shape
+``(len(`` *z_index_list* ``),) +`` x.shape .
+The location of each (x, y) in the grid is only computed once for all
+the splines.
+
+Interpolation
+=============
+The value at a grid point is the corresponding value in *table* .
+Between grid points, the value is the linear interpolant in x and y
+(bilinear interpolant in the interior of a grid rectangle).
+If a *z_name* column is constant with respect to x (y), it is only
+interpolated in y (x). For example, a column that is constant has that
+exact value at all points.
+
+Scipy
+=====
+This is the same function as the linear scipy splines that were used
+by previous versions of bilinear; i.e., the same values at the grid points,
+the same interpolation between grid points,
+the same extension outside the grid,
+and the same treatment of columns that are constant in x or y.
+The floating point operations are not the same.
+For example, scipy computes spline coefficients that can differ from
+the values in *table* by a few units in the last place.
+If z is a value computed by bilinear and z_scipy is the corresponding
+value computed by the previous version,
+
+   | z - z_scipy | <= 1e-14 * | z_scipy |
+
 Example
 *******
 :ref:`example_bilinear-name`
 
 {xrst_end bilinear}
 """
+# ----------------------------------------------------------------------------
+# (index, weight) = bracket(grid, value)
+# grid:   a sorted numpy array of float with no duplicates.
+# value:  a numpy array of float.
+# index:  index[k] is the grid interval that contains value[k] after
+#         it is limited to the range of the grid; i.e., the last index
+#         with grid[index] <= value and index <= len(grid) - 2.
+# weight: weight[k] is the fraction of the interval that value[k] is past
+#         grid[index]. If len(grid) is one, index and weight are zero.
+def bracket(grid, value) :
+   n_grid = len(grid)
+   if n_grid == 1 :
+      index  = numpy.zeros( value.shape, dtype = int )
+      weight = numpy.zeros( value.shape, dtype = float )
+      return (index, weight)
+   value  = numpy.clip(value, grid[0], grid[-1])
+   index  = numpy.searchsorted(grid, value, side = 'right') - 1
+   index  = numpy.minimum(index, n_grid - 2)
+   weight = (value - grid[index]) / (grid[index + 1] - grid[index])
+   return (index, weight)
+#
+# (index, weight) = scalar_bracket(grid, value)
+# Same as bracket where grid is a list and value is a float.
+# This uses the same floating point operations as bracket.
+def scalar_bracket(grid, value) :
+   n_grid = len(grid)
+   if n_grid == 1 :
+      return (0, 0.0)
+   value  = max(value, grid[0])
+   value  = min(value, grid[-1])
+   index  = bisect.bisect_right(grid, value) - 1
+   index  = min(index, n_grid - 2)
+   weight = (value - grid[index]) / (grid[index + 1] - grid[index])
+   return (index, weight)
+# ----------------------------------------------------------------------------
+# Interpolation, on one rectangular grid, for all the z columns.
+#
+# z_grid[z_index, x_index, y_index]:
+# is the value of the z column with index z_index at
+# x_grid[x_index], y_grid[y_index].
+#
+# const_x[z_index], const_y[z_index]:
+# is true if the z column with index z_index is constant w.r.t. x (y).
+# Constant columns are not interpolated in that direction, so they are
+# exactly constant.
+#
+# z = grid(x, y, z_index_list):
+# x and y are numpy arrays of float with the same shape. The return value z
+# is a numpy array with shape (len(z_index_list),) + x.shape and
+# z[k, ...] is the value of the column z_index_list[k] at each (x, y).
+# The bracketing of (x, y) in the grid is computed once for all the columns.
+#
+class bilinear_grid :
+   def __init__(self, x_grid, y_grid, z_grid) :
+      assert type(x_grid) == list
+      assert type(y_grid) == list
+      assert type(z_grid) == numpy.ndarray
+      assert z_grid.shape[1:] == ( len(x_grid), len(y_grid) )
+      self.x_grid  = x_grid
+      self.y_grid  = y_grid
+      self.x_array = numpy.array(x_grid, dtype = float)
+      self.y_array = numpy.array(y_grid, dtype = float)
+      self.z_grid  = z_grid
+      self.const_x = numpy.all( z_grid == z_grid[:, :1, :], axis = (1, 2) )
+      self.const_y = numpy.all( z_grid == z_grid[:, :, :1], axis = (1, 2) )
+      #
+      # python versions of z_grid, const_x, const_y used by scalar
+      self.z_grid_list  = z_grid.tolist()
+      self.const_x_list = self.const_x.tolist()
+      self.const_y_list = self.const_y.tolist()
+   def __call__(self, x, y, z_index_list) :
+      assert type(x) == numpy.ndarray
+      assert type(y) == numpy.ndarray
+      assert x.shape == y.shape
+      #
+      # x_index, x_weight, y_index, y_weight, x_lower, y_lower
+      (x_index, x_weight) = bracket(self.x_array, x.astype(float) )
+      (y_index, y_weight) = bracket(self.y_array, y.astype(float) )
+      x_lower             = 1.0 - x_weight
+      y_lower             = 1.0 - y_weight
+      #
+      # z_index, const_x, const_y, z_grid
+      z_index = numpy.array(z_index_list, dtype = int)
+      const_x = self.const_x[z_index]
+      const_y = self.const_y[z_index]
+      z_grid  = self.z_grid[z_index]
+      #
+      # result
+      result = numpy.empty( (len(z_index),) + x.shape, dtype = float )
+      #
+      # constant
+      select = const_x & const_y
+      if numpy.any(select) :
+         value          = z_grid[select, 0, 0]
+         result[select] = value.reshape( value.shape + x.ndim * (1,) )
+      #
+      # constant w.r.t. x
+      select = const_x & ~ const_y
+      if numpy.any(select) :
+         z_0            = z_grid[select, 0, :]
+         result[select] = y_lower * numpy.take(z_0, y_index, axis = 1) + \
+            y_weight * numpy.take(z_0, y_index + 1, axis = 1)
+      #
+      # constant w.r.t. y
+      select = ~ const_x & const_y
+      if numpy.any(select) :
+         z_0            = z_grid[select, :, 0]
+         result[select] = x_lower * numpy.take(z_0, x_index, axis = 1) + \
+            x_weight * numpy.take(z_0, x_index + 1, axis = 1)
+      #
+      # not constant
+      # index_00 is the index in the flattened grid of (x_index, y_index)
+      select = ~ const_x & ~ const_y
+      if numpy.any(select) :
+         n_y      = len(self.y_grid)
+         z_s      = z_grid[select].reshape( numpy.sum(select), -1 )
+         index_00 = x_index * n_y + y_index
+         index_10 = index_00 + n_y
+         z_lower  = x_lower * numpy.take(z_s, index_00, axis = 1) + \
+            x_weight * numpy.take(z_s, index_10, axis = 1)
+         z_upper  = x_lower * numpy.take(z_s, index_00 + 1, axis = 1) + \
+            x_weight * numpy.take(z_s, index_10 + 1, axis = 1)
+         result[select] = y_lower * z_lower + y_weight * z_upper
+      #
+      return result
+   def scalar(self, x, y, z_index) :
+      assert type(x) == float
+      assert type(y) == float
+      assert type(z_index) == int
+      #
+      # x_index, x_weight, y_index, y_weight
+      (x_index, x_weight) = scalar_bracket(self.x_grid, x)
+      (y_index, y_weight) = scalar_bracket(self.y_grid, y)
+      #
+      # result
+      # same floating point operations as in __call__
+      z_grid  = self.z_grid_list[z_index]
+      const_x = self.const_x_list[z_index]
+      const_y = self.const_y_list[z_index]
+      x_lower = 1.0 - x_weight
+      y_lower = 1.0 - y_weight
+      if const_x and const_y :
+         result = z_grid[0][0]
+      elif const_x :
+         result = y_lower * z_grid[0][y_index] + \
+            y_weight * z_grid[0][y_index + 1]
+      elif const_y :
+         result = x_lower * z_grid[x_index][0] + \
+            x_weight * z_grid[x_index + 1][0]
+      else :
+         z_lower = x_lower * z_grid[x_index][y_index] + \
+            x_weight * z_grid[x_index + 1][y_index]
+         z_upper = x_lower * z_grid[x_index][y_index + 1] + \
+            x_weight * z_grid[x_index + 1][y_index + 1]
+         result  = y_lower * z_lower + y_weight * z_upper
+      return result
+# ----------------------------------------------------------------------------
+# Evaluates one z column of a bilinear_grid
 class spline_wrapper :
-   def __init__(self, spline, box, const_x, const_y) :
-      self.spline  = spline
-      self.box     = box
-      self.const_x = const_x
-      self.const_y = const_y
+   def __init__(self, grid, z_index) :
+      assert type(grid) == bilinear_grid
+      assert type(z_index) == int
+      self.grid    = grid
+      self.z_index = z_index
    def __call__(self, x, y) :
       #
+      # array case
+      if type(x) == numpy.ndarray or type(y) == numpy.ndarray :
+         result = self.grid(x, y, [ self.z_index ] )
+         return result[0]
+      #
       # x, y
       if type(x) == int :
          x = float(x)
@@ -97,30 +308,10 @@ class spline_wrapper :
       assert type(x) == float
       assert type(y) == float
       #
-      # x, y
-      # The documentation for RectBivariateSpline says
-      # 'Evaluated points outside the data range will be extrapolated.' .
-      # but testing indicates the following is not necessary
-      x = max(x, self.box['x_min'])
-      x = min(x, self.box['x_max'])
-      y = max(y, self.box['y_min'])
-      y = min(y, self.box['y_max'])
-      #
       # result
-      if self.const_x and self.const_y :
-         result = self.spline
-      elif self.const_x :
-         result = self.spline(y)
-      elif self.const_y :
-         result = self.spline(x)
-      else :
-         result = self.spline(x, y)
-      assert type(result) == numpy.ndarray
-      assert result.size == 1
-      #
-      result = float(result)
+      result = self.grid.scalar(x, y, self.z_index)
       return result
-
+# ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.bilinear
 def bilinear(
@@ -168,70 +359,39 @@ def bilinear(
       return (x_grid, y_grid, None)
    #
    # triple_list
-   triple_list = sorted(triple_list)
+   triple_list = sorted(triple_list, key = lambda triple : triple[0 : 2] )
    #
    # spline_dict
    spline_dict = dict()
+   if len(z_list) == 0 :
+      return (x_grid, y_grid, spline_dict)
    #
-   # z_name
-   for z_name in z_list :
+   # z_grid
+   z_grid    = numpy.empty( (len(z_list), n_x, n_y) )
+   z_grid[:] = numpy.nan
+   #
+   # index, triple
+   for (index, triple) in enumerate( triple_list ) :
+      #
+      # x_index, y_index
+      x        = triple[0]
+      y        = triple[1]
+      x_index  = int( index / n_y )
+      y_index  = index % n_y
+      if x != x_grid[x_index] :
+         return(x_grid, y_grid, None)
+      if y != y_grid[y_index] :
+         return(x_grid, y_grid, None)
       #
       # z_grid
-      z_grid    = numpy.empty( (n_x, n_y) )
-      z_grid[:] = numpy.nan
-      #
-      # index, triple
-      for (index, triple) in enumerate( triple_list ) :
-         #
-         # x_index, y_index
-         x        = triple[0]
-         y        = triple[1]
-         x_index  = int( index / n_y )
-         y_index  = index % n_y
-         if x != x_grid[x_index] :
-            return(x_grid, y_grid, None)
-         if y != y_grid[y_index] :
-            return(x_grid, y_grid, None)
-         #
-         # z_grid
-         row                      = triple[2]
-         value                    = float( row[z_name] )
-         z_grid[x_index, y_index] =  value
-      #
-      # const_x
-      const_x = True
-      for y_index in range(n_y) :
-         const_col = numpy.all( z_grid[0, y_index] == z_grid[:, y_index] )
-         const_x   = const_x and const_col
-      #
-      # const_y
-      const_y = True
-      for x_index in range(n_x) :
-         const_row = numpy.all( z_grid[x_index, 0] == z_grid[x_index, :] )
-         const_y   = const_y and const_row
-      #
-      # spline
-      if const_x and const_y :
-         spline = numpy.array( z_grid[0, 0] )
-      elif const_x :
-         spline = scipy.interpolate.UnivariateSpline(
-            y_grid, z_grid[0,:], k=1, s=0
-         )
-      elif const_y :
-         spline = scipy.interpolate.UnivariateSpline(
-            x_grid, z_grid[:,0], k=1, s=0
-         )
-      else :
-         spline = scipy.interpolate.RectBivariateSpline(
-            x_grid, y_grid, z_grid, kx=1, ky=1, s=0
-         )
-      box = {
-         'x_min' : x_grid[0],
-         'x_max' : x_grid[-1],
-         'y_min' : y_grid[0],
-         'y_max' : y_grid[-1],
-      }
-      spline_dict[z_name] = spline_wrapper(spline , box, const_x, const_y)
+      row = triple[2]
+      for (z_index, z_name) in enumerate(z_list) :
+         z_grid[z_index, x_index, y_index] = float( row[z_name] )
+   #
+   # spline_dict
+   grid = bilinear_grid(x_grid, y_grid, z_grid)
+   for (z_index, z_name) in enumerate(z_list) :
+      spline_dict[z_name] = spline_wrapper(grid, z_index)
    #
    # BEGIN_RETURN
    # ...
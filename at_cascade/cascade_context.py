@@ -0,0 +1,276 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin cascade_context}
+{xrst_spell
+   inode
+}
+
+Read Only Information for a Cascade Shared by the Jobs in a Process
+###################################################################
+
+cascade_context
+***************
+{xrst_code py}
+context = cascade_context(all_node_database)
+{xrst_code}
+
+all_node_database
+=================
+is a python string specifying the location of the
+:ref:`all_node_db-name`
+relative to the current working directory.
+
+context
+=======
+The first time this routine is called for an all node database,
+a *context* object is created.
+Later calls, by the same process, return the same object
+as long as the modification time, size, and inode of
+*all_node_database* have not changed.
+Hence the all node database is read once per process
+instead of once for each job (and each child of each job).
+A process created by forking a process that has a *context*
+also has a copy of it.
+
+option_all
+**********
+{xrst_code py}
+option_all = context.option_all
+{xrst_code}
+is a ``dict`` mapping each
+:ref:`option_all_table@option_name` to its
+:ref:`option_all_table@option_value` .
+It should not be modified.
+
+node_split_set
+**************
+{xrst_code py}
+node_split_set = context.node_split_set
+{xrst_code}
+is the ``set`` of node_id values in the
+:ref:`node_split_table-name` .
+
+get_table
+*********
+{xrst_code py}
+table = context.get_table(table_name)
+{xrst_code}
+
+table_name
+==========
+This ``str`` is the name of a table in the all node database.
+
+table
+=====
+is a ``list`` of ``dict`` representation of the table.
+The table is read the first time it is requested and the same
+list is returned by later calls.
+It should not be modified.
+
+get_index
+*********
+{xrst_code py}
+index = context.get_index(table_name)
+{xrst_code}
+
+table_name
+==========
+This ``str`` is the name of a table in the all node database
+that has a node_id and a split_reference_id column; e.g.,
+cov_reference or omega_index.
+
+index
+=====
+is a ``dict`` .
+If *node_id* and *split_reference_id* are values that appear in
+the same row of the table, *index* [ ( *node_id* , *split_reference_id* ) ]
+is the ``list`` of rows in *table* that have those values
+(in the order that they appear in the table).
+The index is built the first time it is requested.
+It should not be modified.
+
+cov_reference_index
+*******************
+{xrst_code py}
+cov_reference_index = context.cov_reference_index()
+{xrst_code}
+is a ``dict`` representation of the :ref:`cov_reference_table-name` .
+If *node_id* and *split_reference_id* appear in the same row of the table,
+*cov_reference_index* [ ( *node_id* , *split_reference_id* ) ]
+is a ``list`` with length one plus the maximum covariate_id for that pair.
+Its *covariate_id* element is the reference_value for the pair and
+*covariate_id* ( ``None`` if there is no such row).
+If there is more than one such row, the last one is used.
+The index is built the first time it is requested.
+It should not be modified.
+
+dismod_at_version
+*****************
+{xrst_code py}
+version = context.dismod_at_version()
+{xrst_code}
+is the ``str`` printed by the command ``dismod_at --version``
+(with leading and trailing white space removed).
+The command is only run the first time this function is called.
+
+cache
+*****
+{xrst_code py}
+cache = context.cache
+{xrst_code}
+is a ``dict`` that routines can use to store values that are computed
+from the all node database; e.g., :ref:`omega_constraint-name` .
+It starts out empty and is discarded with the context when
+the all node database changes.
+
+database_dir
+************
+{xrst_code py}
+database_dir = context.database_dir(
+   node_table, fit_node_id, fit_split_reference_id
+)
+{xrst_code}
+is the :ref:`get_database_dir@database_dir` for the specified fit,
+relative to the :ref:`option_all_table@result_dir` .
+Here *node_table* is the node table for this cascade
+and the other arguments are the same as for :ref:`get_database_dir-name` .
+
+{xrst_end cascade_context}
+'''
+# ----------------------------------------------------------------------------
+import os
+import dismod_at
+import at_cascade
+# ----------------------------------------------------------------------------
+class cascade_context_class :
+   #
+   # __init__
+   def __init__(self, all_node_database) :
+      assert type(all_node_database) == str
+      #
+      self.all_node_database = all_node_database
+      self.table             = dict()
+      self.index             = dict()
+      self.version           = None
+      self.cov_reference     = None
+      self.cache             = dict()
+      #
+      # option_all
+      self.option_all = dict()
+      for row in self.get_table('option_all') :
+         self.option_all[ row['option_name'] ] = row['option_value']
+      #
+      # node_split_set
+      self.node_split_set = set()
+      for row in self.get_table('node_split') :
+         self.node_split_set.add( row['node_id'] )
+   #
+   # get_table
+   def get_table(self, table_name) :
+      assert type(table_name) == str
+      if table_name not in self.table :
+         connection = dismod_at.create_connection(
+            self.all_node_database, new = False, readonly = True
+         )
+         self.table[table_name] = \
+            dismod_at.get_table_dict(connection, table_name)
+         connection.close()
+      return self.table[table_name]
+   #
+   # get_index
+   def get_index(self, table_name) :
+      assert type(table_name) == str
+      if table_name not in self.index :
+         index = dict()
+         for row in self.get_table(table_name) :
+            key = ( row['node_id'], row['split_reference_id'] )
+            if key not in index :
+               index[key] = list()
+            index[key].append(row)
+         self.index[table_name] = index
+      return self.index[table_name]
+   #
+   # cov_reference_index
+   def cov_reference_index(self) :
+      if self.cov_reference is None :
+         cov_reference = dict()
+         for (key, row_list) in self.get_index('cov_reference').items() :
+            n_covariate = 1 + max( row['covariate_id'] for row in row_list )
+            reference   = n_covariate * [ None ]
+            for row in row_list :
+               reference[ row['covariate_id'] ] = row['reference_value']
+            cov_reference[key] = reference
+         self.cov_reference = cov_reference
+      return self.cov_reference
+   #
+   # dismod_at_version
+   def dismod_at_version(self) :
+      if self.version is None :
+         version = dismod_at.system_command_prc(
+            command       = [ 'dismod_at', '--version' ] ,
+            print_command = False,
+            return_stdout = True,
+            return_stderr = False,
+         )
+         self.version = version.strip()
+      return self.version
+   #
+   # database_dir
+   def database_dir(self, node_table, fit_node_id, fit_split_reference_id) :
+      assert type(node_table) == list
+      #
+      # split_reference_table
+      split_reference_table = self.get_table('split_reference')
+      #
+      # root_node_id
+      root_node_name = self.option_all['root_node_name']
+      root_node_id   = \
+         at_cascade.table_name2id(node_table, 'node', root_node_name)
+      #
+      # root_split_reference_id
+      root_split_reference_id = None
+      if 'root_split_reference_name' in self.option_all :
+         root_split_reference_name = \
+            self.option_all['root_split_reference_name']
+         root_split_reference_id = at_cascade.table_name2id(
+            split_reference_table,
+            'split_reference',
+            root_split_reference_name
+         )
+      #
+      database_dir = at_cascade.get_database_dir(
+         node_table              = node_table,
+         split_reference_table   = split_reference_table,
+         node_split_set          = self.node_split_set,
+         root_node_id            = root_node_id,
+         root_split_reference_id = root_split_reference_id,
+         fit_node_id             = fit_node_id,
+         fit_split_reference_id  = fit_split_reference_id,
+      )
+      return database_dir
+# ----------------------------------------------------------------------------
+# context_cache
+# maps the absolute path of an all node database to a tuple containing
+# the value returned by os.stat for the database and the context for it.
+context_cache = dict()
+# ----------------------------------------------------------------------------
+def cascade_context(all_node_database) :
+   assert type(all_node_database) == str
+   #
+   # key, stat
+   key       = os.path.abspath(all_node_database)
+   file_stat = os.stat(all_node_database)
+   stat      = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+   #
+   # context_cache
+   if key in context_cache :
+      (cache_stat, context) = context_cache[key]
+      if cache_stat == stat :
+         return context
+   context            = cascade_context_class(all_node_database)
+   context_cache[key] = (stat, context)
+   #
+   return context
@@ -47,6 +47,18 @@ For each job, the first type of fit is attempted.
 If it fails, and there is a second type of fit, it is attempted.
 If it also fails, the corresponding job fails.
 
+resume
+******
+If *resume* is true, this call continues a previous call to
+cascade_root_node that did not complete; e.g., because it was terminated.
+The jobs that were completed by the previous call are not run again;
+see :ref:`fit_parallel@resume` .
+In addition, if the root node job was completed,
+the *root_fit_database* is not changed.
+Only the :ref:`glossary@fit_goal_set` used by the previous call,
+or a subset of it, should be used when *resume* is true.
+If *resume* is false (its default value), all the jobs are run.
+
 root_fit_database
 *****************
 This database is located at
@@ -121,12 +133,14 @@ def cascade_root_node(
    all_node_database       ,
    fit_goal_set            ,
    no_ode_fit              = False,
-   fit_type_list           = [ 'both', 'fixed' ]
+   fit_type_list           = [ 'both', 'fixed' ],
+   resume                  = False,
 ) :
    assert type(all_node_database)  == str
    assert type(fit_goal_set)       == set
    assert type(no_ode_fit)         == bool
    assert type(fit_type_list)      == list
+   assert type(resume)             == bool
    # END_DEF
    #
    # split_reference_table, option_all_table
@@ -163,16 +177,31 @@ def cascade_root_node(
    root_fit_database = f'{result_dir}/{root_node_name}/dismod.db'
    if not os.path.exists( f'{result_dir}/{root_node_name}' ) :
       os.makedirs( f'{result_dir}/{root_node_name}' )
-   if not no_ode_fit :
-      at_cascade.copy_root_db(root_database, root_fit_database)
-      at_cascade.omega_constraint(all_node_database, root_fit_database)
-   else :
-      at_cascade.no_ode_fit(
-         all_node_database  = all_node_database,
-         root_database      = root_database,
-         option_all_dict    = option_all_dict,
-         fit_type           = fit_type_list[0],
+   #
+   # root_complete
+   # is the root node job complete from a previous call
+   root_complete = False
+   if resume and os.path.isfile(root_fit_database) :
+      connection = dismod_at.create_connection(
+         root_fit_database, new = False, readonly = True
       )
+      if at_cascade.table_exists(connection, 'log') :
+         command  = 'SELECT message FROM log '
+         command += "WHERE message_type = 'at_cascade'"
+         message_list  = dismod_at.sql_command(connection, command)
+         root_complete = ('children: OK',) in message_list
+      connection.close()
+   if not root_complete :
+      if not no_ode_fit :
+         at_cascade.copy_root_db(root_database, root_fit_database)
+         at_cascade.omega_constraint(all_node_database, root_fit_database)
+      else :
+         at_cascade.no_ode_fit(
+            all_node_database  = all_node_database,
+            root_database      = root_database,
+            option_all_dict    = option_all_dict,
+            fit_type           = fit_type_list[0],
+         )
    #
    # node_table, covariate_table, fit_integrand
    fit_or_root = at_cascade.fit_or_root_class(
@@ -225,4 +254,5 @@ def cascade_root_node(
       max_number_cpu    = max_number_cpu,
       fit_type_list     = fit_type_list,
       shared_unique     = '',
+      resume            = resume,
    )
@@ -28,7 +28,8 @@ to run the cascade:
 
    FileExistsError: [Errno 17] File exists: *name*
 
-where *name* ends with ``_number_cpu_inuse`` or ``_job_status``.
+where *name* ends with ``_number_cpu_inuse`` , ``_job_status`` ,
+or ``_peak_rss`` .
 This may happen if the previous :ref:`fit_parallel-name`
 did not terminate cleanly; e.g., if the system crashed.
 
@@ -72,7 +73,7 @@ def clear_shared(all_node_database, job_name) :
    shared_memory_prefix_plus = f'{shared_memory_prefix}_{job_name}'
    #
    # name
-   for name in  [ '_number_cpu_inuse', '_job_status' ] :
+   for name in  [ '_number_cpu_inuse', '_job_status', '_peak_rss' ] :
       #
       # shared_memory_name
       shared_memory_name = shared_memory_prefix_plus + name
@@ -0,0 +1,227 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin com_cov_reference_all}
+
+Compute Covariate Reference Values for All Nodes and Splits
+###########################################################
+Compute the same values as :ref:`com_cov_reference-name`
+for a list of nodes and all the split reference values,
+using one pass through the data table.
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+Arguments
+*********
+The arguments
+*option_all_table* , *split_reference_table* , *node_table* ,
+*covariate_table* , and *data_table*
+are the same as for :ref:`com_cov_reference-name` .
+
+shift_node_list
+***************
+is a ``list`` of the node_id values that we are computing
+covariate references for.
+
+cov_reference_dict
+******************
+The return value is a ``dict`` .
+For each *shift_node_id* in *shift_node_list* ,
+and each *split_reference_id* in the split reference table
+(None if the split reference table is empty)
+*cov_reference_dict* [ ( *shift_node_id* , *split_reference_id* ) ]
+is equal to the corresponding *cov_reference_list* returned by
+com_cov_reference.
+
+Method
+******
+The data table is traversed once, in order, for each split reference.
+Each data row that is within the max difference
+is added to the list of values for its node, and each of its ancestors,
+that is in *shift_node_list* .
+The work is proportional to the number of data rows times the depth
+of the node tree (times the number of covariates and split references)
+instead of the number of data rows times the number of nodes.
+The average for each node is computed from the values
+in data table order, the same as in com_cov_reference.
+Hence the results are identical to com_cov_reference
+(not just equal up to floating point rounding).
+
+{xrst_end com_cov_reference_all}
+'''
+import math
+import numpy
+import dismod_at
+import at_cascade
+# ----------------------------------------------------------------------------
+# ancestor_list = get_ancestor_list(node_table, shift_node_set)
+# ancestor_list[node_id] is a list of the node_id values, in shift_node_set,
+# for node_id and its ancestors.
+def get_ancestor_list(node_table, shift_node_set) :
+   n_node        = len(node_table)
+   ancestor_list = n_node * [ None ]
+   for node_id in range(n_node) :
+      #
+      # path
+      path      = list()
+      ancestor  = node_id
+      while ancestor is not None and ancestor_list[ancestor] is None :
+         path.append(ancestor)
+         ancestor = node_table[ancestor]['parent']
+      #
+      # ancestor_list
+      if ancestor is None :
+         shift_list = list()
+      else :
+         shift_list = ancestor_list[ancestor]
+      for node in reversed(path) :
+         if node in shift_node_set :
+            shift_list = [ node ] + shift_list
+         ancestor_list[node] = shift_list
+   return ancestor_list
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.com_cov_reference_all
+def com_cov_reference_all(
+   option_all_table      ,
+   split_reference_table ,
+   node_table            ,
+   covariate_table       ,
+   shift_node_list       ,
+   data_table            = None,
+) :
+   assert type(option_all_table) == list
+   assert type(split_reference_table) == list
+   assert type(node_table) == list
+   assert type(covariate_table) == list
+   assert type(shift_node_list) == list
+   assert type(data_table) == list or data_table == None
+   # END_DEF
+   #
+   # root_database
+   root_database      = None
+   for row in option_all_table :
+      if row['option_name'] == 'root_database' :
+         root_database      = row['option_value']
+   assert root_database != None
+   #
+   # data_table
+   if data_table == None :
+      connection = dismod_at.create_connection(
+         root_database, new = False, readonly = True
+      );
+      data_table = dismod_at.get_table_dict(connection, 'data')
+      connection.close()
+   #
+   # cov_info
+   cov_info = at_cascade.get_cov_info(
+      option_all_table,
+      covariate_table,
+      split_reference_table
+   )
+   #
+   # rel_covariate_id_list
+   rel_covariate_id_list = sorted( cov_info['rel_covariate_id_set'] )
+   #
+   # split_covariate_id
+   split_covariate_id = None
+   if len( split_reference_table ) > 0 :
+      split_covariate_id = cov_info['split_covariate_id']
+   #
+   # check max_difference
+   for covariate_id in rel_covariate_id_list :
+      covariate_row  = covariate_table[covariate_id]
+      max_difference = covariate_row['max_difference']
+      if not max_difference in [ None, math.inf ] :
+         msg  = f'com_cov_reference: covariate_id = {covariate_id}\n'
+         msg += 'is a relative covariate and '
+         msg += f'max_difference = {max_difference} is not None or infinity'
+         assert False, msg
+   #
+   # n_covariate, n_data
+   n_covariate = len( covariate_table )
+   n_data      = len( data_table )
+   #
+   # split_reference_list
+   if len( split_reference_table ) == 0 :
+      split_reference_list = [ None ]
+   else :
+      split_reference_list = list( range( len(split_reference_table) ) )
+   #
+   # data_value
+   # data_value[data_id, covariate_id] is nan when the value is null
+   data_value = numpy.empty( (n_data, n_covariate), dtype = float )
+   for (data_id, data_row) in enumerate(data_table) :
+      for covariate_id in range(n_covariate) :
+         value = data_row[ f'x_{covariate_id}' ]
+         if value is None :
+            value = numpy.nan
+         data_value[data_id, covariate_id] = value
+   #
+   # ancestor_list
+   ancestor_list = get_ancestor_list( node_table, set(shift_node_list) )
+   #
+   # rel_label
+   rel_label = [ f'x_{covariate_id}' for covariate_id in rel_covariate_id_list ]
+   #
+   # cov_reference_dict
+   cov_reference_dict = dict()
+   for split_reference_id in split_reference_list :
+      #
+      # reference
+      reference = [ row['reference'] for row in covariate_table ]
+      if split_reference_id is not None :
+         row = split_reference_table[split_reference_id]
+         reference[split_covariate_id] = row['split_reference_value']
+      #
+      # in_bnd
+      # same as in com_cov_reference: null values and infinite max
+      # differences do not exclude a data row
+      in_bnd = numpy.ones( n_data, dtype = bool )
+      for covariate_id in range(n_covariate) :
+         max_difference = covariate_table[covariate_id]['max_difference']
+         if max_difference is not None and max_difference != math.inf :
+            value    = data_value[:, covariate_id]
+            abs_diff = numpy.abs( value - reference[covariate_id] )
+            in_bnd  &= numpy.isnan(value) | (abs_diff <= max_difference)
+      #
+      # value_list
+      # value_list[shift_node_id][j] is the list of values for the
+      # j-th relative covariate in data table order.
+      value_list = dict()
+      for shift_node_id in shift_node_list :
+         value_list[shift_node_id] = [ list() for label in rel_label ]
+      for data_id in numpy.flatnonzero(in_bnd) :
+         data_row = data_table[data_id]
+         for shift_node_id in ancestor_list[ data_row['node_id'] ] :
+            node_value_list = value_list[shift_node_id]
+            for (j, label) in enumerate(rel_label) :
+               cov_value = data_row[label]
+               if cov_value is not None :
+                  node_value_list[j].append(cov_value)
+      #
+      # cov_reference_dict
+      # use the original python values so that sum is the same as in
+      # com_cov_reference
+      for shift_node_id in shift_node_list :
+         cov_reference_list = list( reference )
+         for (j, covariate_id) in enumerate(rel_covariate_id_list) :
+            covariate_list = value_list[shift_node_id][j]
+            if len( covariate_list ) > 0 :
+               cov_reference_list[covariate_id] = \
+                  sum(covariate_list) / len(covariate_list)
+         key = (shift_node_id, split_reference_id)
+         cov_reference_dict[key] = cov_reference_list
+   # -------------------------------------------------------------------------
+   # BEGIN_RETURN
+   # ...
+   assert type(cov_reference_dict) == dict
+   return cov_reference_dict
+   # END_RETURN
@@ -76,6 +76,15 @@ for this parameter.
    of the splitting covariate in *shared_unique*  .
    (The splitting covariate is sex in the :ref:`csv.fit-name` case.)
 
+resume
+******
+If *resume* is true, this call continues a previous call to
+continue_cascade, with the same arguments, that did not complete.
+The jobs that were completed by the previous call are not run again;
+see :ref:`fit_parallel@resume` .
+If *resume* is false (its default value),
+all the jobs below *fit_database* are run.
+
 {xrst_end   continue_cascade}
 '''
 import time
@@ -92,12 +101,14 @@ def continue_cascade(
    fit_goal_set      = None,
    fit_type_list     = [ 'both', 'fixed' ],
    shared_unique     = '',
+   resume            = False,
 ) :
    assert type(all_node_database) == str
    assert type(fit_database) == str
    assert type(fit_goal_set)      == set
    assert type(fit_type_list)     == list
    assert type(shared_unique)     == str
+   assert type(resume)            == bool
    # END_DEF
    #
    # split_reference_table, option_all, node_split_table, fit_goal
@@ -201,4 +212,5 @@ def continue_cascade(
       max_number_cpu    = max_number_cpu,
       fit_type_list     = fit_type_list,
       shared_unique     = shared_unique,
+      resume            = resume,
    )
@@ -292,34 +292,44 @@ def create_all_node_db(
    #
    # cov_reference_table
    if cov_reference_table == None :
-      cov_reference_table = list()
+      #
+      # shift_node_list
+      shift_node_list = list()
       for node_id in range( len(node_table) ) :
          ancestor      = node_id
          while ancestor != root_node_id and ancestor != None :
             ancestor = node_table[ancestor]['parent']
          if ancestor == root_node_id :
-            if len(split_reference_table) == 0 :
-               split_reference_list = [ None ]
-            else :
-               split_reference_list = range( len(split_reference_table) )
-            for split_reference_id in split_reference_list :
-               reference_list = at_cascade.com_cov_reference(
-                  option_all_table      = option_all_table,
-                  split_reference_table = split_reference_table,
-                  node_table            = node_table,
-                  covariate_table       = covariate_table,
-                  shift_node_id         = node_id,
-                  split_reference_id    = split_reference_id,
-                  data_table            = data_table,
-               )
-               for (covariate_id, reference) in enumerate(reference_list) :
-                  row = {
-                     'node_id'            : node_id ,
-                     'split_reference_id' : split_reference_id,
-                     'covariate_id'       : covariate_id,
-                     'reference_value'    : reference_list[covariate_id],
-                  }
-                  cov_reference_table.append(row)
+            shift_node_list.append( node_id )
+      #
+      # cov_reference_dict
+      cov_reference_dict = at_cascade.com_cov_reference_all(
+         option_all_table      = option_all_table,
+         split_reference_table = split_reference_table,
+         node_table            = node_table,
+         covariate_table       = covariate_table,
+         shift_node_list       = shift_node_list,
+         data_table            = data_table,
+      )
+      #
+      # cov_reference_table
+      if len(split_reference_table) == 0 :
+         split_reference_list = [ None ]
+      else :
+         split_reference_list = range( len(split_reference_table) )
+      cov_reference_table = list()
+      for node_id in shift_node_list :
+         for split_reference_id in split_reference_list :
+            reference_list = \
+               cov_reference_dict[ (node_id, split_reference_id) ]
+            for (covariate_id, reference) in enumerate(reference_list) :
+               row = {
+                  'node_id'            : node_id ,
+                  'split_reference_id' : split_reference_id,
+                  'covariate_id'       : covariate_id,
+                  'reference_value'    : reference_list[covariate_id],
+               }
+               cov_reference_table.append(row)
    # -------------------------------------------------------------------------
    # Write all node database
    # -------------------------------------------------------------------------
@@ -341,6 +351,9 @@ def create_all_node_db(
    dismod_at.create_table(
       all_connection, tbl_name, col_name, col_type, row_list
    )
+   command  = 'CREATE INDEX cov_reference_node_split '
+   command += 'ON cov_reference(node_id, split_reference_id)'
+   dismod_at.sql_command(all_connection, command)
    #
    # omega_age_grid table
    tbl_name    = 'omega_age_grid'
@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin create_job_queue}
+{xrst_spell
+   sqlite
+}
+
+Create a Job Queue Database
+###########################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+}
+
+Purpose
+*******
+The job queue database is an sqlite file that is used to coordinate
+the processes that run the jobs in a cascade; see :ref:`queue_worker-name` .
+It only uses the file system,
+so the processes can be on any host that mounts the directory
+containing the database.
+It also records the job status for reporting the progress of a cascade; see
+:ref:`fit_parallel@job_queue_database` .
+
+job_queue_database
+******************
+is the name of the job queue database.
+If this file already exists, it is replaced.
+
+job_table
+*********
+This is a :ref:`create_job_table@job_table` containing the jobs
+necessary to fit the :ref:`glossary@fit_goal_set`.
+
+all_node_database
+*****************
+is a python string specifying the location of the
+:ref:`all_node_db-name`
+relative to the current working directory.
+The current working directory must be the same for all the
+processes that use the job queue.
+
+fit_integrand
+*************
+is a ``set`` of integrand_id values that occur in the data table; see
+:ref:`get_fit_integrand-name`.
+
+fit_type_list
+*************
+is a ``list`` of fit types that are tried, in order, for each job;
+see :ref:`run_one_job@fit_type_list` .
+
+priority
+********
+If this is None, the jobs are run in job_id order.
+Otherwise it is a ``list`` or numpy array with length equal to the
+length of *job_table* .
+In this case, when more than one job is ready, the job with the largest
+priority is run first; see :ref:`job_priority-name` .
+
+job_status
+**********
+is a ``list`` with length equal to the length of *job_table* .
+It contains the initial status for each job; i.e.,
+skip, wait, ready, or done.
+A job with status ready or done must be the start job,
+or have a parent job with status done.
+
+job_queue Table
+***************
+This table has the following columns:
+
+.. csv-table::
+   :header-rows: 1
+
+   Column,        Meaning
+   job_id,        the job_id for this row
+   job_name,      the job_name for this job
+   priority,      the priority for this job
+   subtree_begin, see :ref:`job_subtree@subtree@subtree_begin`
+   subtree_end,   see :ref:`job_subtree@subtree@subtree_end`
+   job_status,    skip; wait; ready; run; done; error; or abort
+   host_name,     host that ran this job (null if not run)
+   process_id,    process that ran this job (null if not run)
+   start_time,    unix time when the job started (null if not run)
+   end_time,      unix time when the job finished (null if not finished)
+
+The other columns are the same as in the *job_table* .
+The status skip is used for prior_only jobs.
+
+queue_option Table
+******************
+This table has columns option_name and option_value.
+It contains the values of
+*all_node_database* , *fit_integrand* , and *fit_type_list* .
+
+{xrst_end create_job_queue}
+'''
+# ----------------------------------------------------------------------------
+import os
+import sqlite3
+import at_cascade
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.create_job_queue
+def create_job_queue(
+   job_queue_database,
+   job_table,
+   all_node_database,
+   fit_integrand,
+   fit_type_list,
+   priority,
+   job_status,
+) :
+   assert type(job_queue_database) == str
+   assert type(job_table) == list
+   assert type(all_node_database) == str
+   assert type(fit_integrand) == set
+   assert type(fit_type_list) == list
+   assert type(job_status) == list
+   assert len(job_status) == len(job_table)
+   # END_DEF
+   #
+   # subtree_begin, subtree_end
+   (subtree_order, subtree_begin, subtree_end) = \
+      at_cascade.job_subtree(job_table)
+   #
+   # job_queue_database
+   if os.path.exists(job_queue_database) :
+      os.remove(job_queue_database)
+   connection = sqlite3.connect(job_queue_database)
+   #
+   # job_queue table
+   command = '''CREATE TABLE job_queue(
+      job_id             INTEGER PRIMARY KEY,
+      job_name           TEXT,
+      fit_node_id        INTEGER,
+      split_reference_id INTEGER,
+      parent_job_id      INTEGER,
+      start_child_job_id INTEGER,
+      end_child_job_id   INTEGER,
+      prior_only         INTEGER,
+      priority           REAL,
+      subtree_begin      INTEGER,
+      subtree_end        INTEGER,
+      job_status         TEXT,
+      host_name          TEXT,
+      process_id         INTEGER,
+      start_time         REAL,
+      end_time           REAL
+   )'''
+   connection.execute(command)
+   command = 'CREATE INDEX job_queue_status ON job_queue(job_status)'
+   connection.execute(command)
+   #
+   # job_queue table
+   row_list = list()
+   for (job_id, row) in enumerate(job_table) :
+      if priority is None :
+         job_priority = 0.0
+      else :
+         job_priority = float( priority[job_id] )
+      row_list.append( (
+         job_id,
+         row['job_name'],
+         row['fit_node_id'],
+         row['split_reference_id'],
+         row['parent_job_id'],
+         row['start_child_job_id'],
+         row['end_child_job_id'],
+         int( row['prior_only'] ),
+         job_priority,
+         int( subtree_begin[job_id] ),
+         int( subtree_end[job_id] ),
+         job_status[job_id],
+         None,
+         None,
+         None,
+         None,
+      ) )
+   command  = 'INSERT INTO job_queue VALUES '
+   command += '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+   connection.executemany(command, row_list)
+   #
+   # queue_option table
+   command = 'CREATE TABLE queue_option(option_name TEXT, option_value TEXT)'
+   connection.execute(command)
+   row_list = [
+      ( 'all_node_database', all_node_database ),
+      ( 'fit_integrand', ' '.join( str(i) for i in sorted(fit_integrand) ) ),
+      ( 'fit_type_list', ' '.join( fit_type_list ) ),
+   ]
+   command = 'INSERT INTO queue_option VALUES (?, ?)'
+   connection.executemany(command, row_list)
+   #
+   connection.commit()
+   connection.close()
+   return
@@ -211,6 +211,28 @@ Log Table
 =========
 There is no log table in the shifted databases.
 
+Slim Shift Databases
+====================
+If the :ref:`option_all_table@slim_shift_db` option is true,
+each shift database is created by copying only the tables
+that the child fit needs from the *fit_database*.
+The dismod_at output tables (e.g., the data_subset, fit_var,
+sample, and predict tables) are not copied.
+Otherwise, each shift database starts as a copy of the entire
+*fit_database* and the output tables are replaced when the child is fit.
+
+Processes
+=========
+If the :ref:`option_all_table@max_shift_db_process` option is
+greater than one, the shift databases are divided among that many
+processes (at most) and created in parallel.
+The number of processes is also at most one more than the number of idle cpus
+(when the load average is available on this system).
+Each shift database is first written to a file with ``.tmp``
+appended to its name and then renamed.
+Hence a shift database is not present unless it is complete.
+If the creation of a shift database fails, its ``.tmp`` file is removed.
+
 no_ode_fit
 **********
 If this argument is true (false) if the *fit_database*
@@ -234,23 +256,22 @@ import os
 import math
 import copy
 import shutil
+import multiprocessing
 import numpy
 import dismod_at
 import at_cascade
 # ----------------------------------------------------------------------------
 # cov_reference_list =
 def get_cov_reference_list(
-   n_covariate, cov_reference_table, node_id, split_reference_id
+   n_covariate, cov_reference_index, node_id, split_reference_id
 ) :
    #
-   #
-   cov_reference_list = n_covariate * [None]
-   for row in cov_reference_table :
-      if row['node_id'] == node_id :
-         if row['split_reference_id'] == split_reference_id :
-            covariate_id = row['covariate_id']
-            if covariate_id < len(cov_reference_list) :
-               cov_reference_list[covariate_id] = row['reference_value']
+   # cov_reference_list
+   # see cascade_context.cov_reference_index
+   key                 = (node_id, split_reference_id)
+   reference           = cov_reference_index.get(key, list())
+   cov_reference_list  = reference[: n_covariate]
+   cov_reference_list += (n_covariate - len(cov_reference_list)) * [None]
    if None in cov_reference_list :
       covariate_id = cov_reference_list.index(None)
       msg  = 'all_node database: cov_reference table: '
@@ -262,6 +283,73 @@ def get_cov_reference_list(
    #
    return cov_reference_list
 # ----------------------------------------------------------------------------
+# slim_skip_table_set
+# These fit_database tables are not copied to a slim shift database.
+# The dismod_at output tables are re-created when the child is fit,
+# the avgint table is replaced by an empty avgint table, and the other
+# tables are dropped from the shift databases.
+slim_skip_table_set = {
+   'age_avg',
+   'avgint',
+   'bnd_mulcov',
+   'c_shift_avgint',
+   'c_shift_predict_fit_var',
+   'c_shift_predict_sample',
+   'data_sim',
+   'data_subset',
+   'depend_var',
+   'fit_data_subset',
+   'fit_var',
+   'hes_fixed',
+   'hes_random',
+   'log',
+   'mixed_info',
+   'predict',
+   'prior_sim',
+   'sample',
+   'scale_var',
+   'start_var',
+   'trace_fixed',
+   'var',
+}
+# ----------------------------------------------------------------------------
+# copy_slim_database(fit_database, shift_database, schema_only_set)
+# Copy the tables in fit_database, that are not in slim_skip_table_set,
+# to a new shift_database. For tables in schema_only_set, only the
+# table definition (not the rows) is copied.
+def copy_slim_database(fit_database, shift_database, schema_only_set) :
+   #
+   # connection
+   connection = dismod_at.create_connection(
+      shift_database, new = True, readonly = False
+   )
+   fit_path = fit_database.replace("'", "''")
+   command  = f"ATTACH DATABASE '{fit_path}' AS fit"
+   dismod_at.sql_command(connection, command)
+   #
+   # sql_list
+   command  = 'SELECT type, tbl_name, sql FROM fit.sqlite_master '
+   command += "WHERE type IN ('table', 'index') AND sql IS NOT NULL "
+   command += 'ORDER BY rowid'
+   sql_list = dismod_at.sql_command(connection, command)
+   #
+   # shift_database
+   # create the tables, copy the rows, and then create the indices
+   for ty in [ 'table', 'index' ] :
+      for (sql_type, table_name, sql) in sql_list :
+         keep = sql_type == ty
+         keep = keep and not table_name.startswith('sqlite_')
+         keep = keep and table_name not in slim_skip_table_set
+         if keep :
+            dismod_at.sql_command(connection, sql)
+            if ty == 'table' and table_name not in schema_only_set :
+               command  = f'INSERT INTO main."{table_name}" '
+               command += f'SELECT * FROM fit."{table_name}"'
+               dismod_at.sql_command(connection, command)
+   #
+   dismod_at.sql_command(connection, 'DETACH DATABASE fit')
+   connection.close()
+# ----------------------------------------------------------------------------
 def add_index_to_name(table, name_col) :
    row   = table[-1]
    name  = row[name_col]
@@ -336,12 +424,148 @@ def get_time_id_next_list(smooth_table, smooth_grid_table, time_table ) :
       time_id_next_list.append( time_id_dict )
    return time_id_next_list
 # ----------------------------------------------------------------------------
+# smooth_grid_index = get_smooth_grid_index(smooth_grid_table)
+# smooth_grid_index[smooth_id] is the list of rows in smooth_grid_table
+# that have the specified smooth_id (in the order they appear in the table).
+def get_smooth_grid_index(smooth_grid_table) :
+   smooth_grid_index = dict()
+   for row in smooth_grid_table :
+      smooth_id = row['smooth_id']
+      if smooth_id not in smooth_grid_index :
+         smooth_grid_index[smooth_id] = list()
+      smooth_grid_index[smooth_id].append(row)
+   return smooth_grid_index
+# ----------------------------------------------------------------------------
+# fit_sample = get_fit_sample(fit_database, c_shift_avgint_table)
+# fit_sample['index'][key] is the row of fit_sample['value'] that contains
+# the samples for key = (integrand_id, node_id, split_id, age_id, time_id).
+# fit_sample['value'] is a numpy array with shape (n_key, n_sample).
+# The samples for each key are in the order they appear in the
+# c_shift_predict_sample table.
+def get_fit_sample(fit_database, c_shift_avgint_table) :
+   #
+   # avgint_id, avg_integrand
+   connection = dismod_at.create_connection(
+      fit_database, new = False, readonly = True
+   )
+   command  = 'SELECT avgint_id, avg_integrand FROM c_shift_predict_sample '
+   command += 'ORDER BY c_shift_predict_sample_id'
+   row_list = dismod_at.sql_command(connection, command)
+   connection.close()
+   avgint_id     = numpy.array( [ row[0] for row in row_list ], dtype = int )
+   avg_integrand = numpy.array( [ row[1] for row in row_list ], dtype = float)
+   #
+   # index, avgint_index
+   # avgint_index[avgint_id] is the fit_sample['index'] value for avgint_id
+   index        = dict()
+   avgint_index = numpy.full( len(c_shift_avgint_table), -1, dtype = int )
+   for this_avgint_id in numpy.unique(avgint_id) :
+      avgint_row   = c_shift_avgint_table[this_avgint_id]
+      integrand_id = avgint_row['integrand_id']
+      node_id      = avgint_row['node_id']
+      age_id       = avgint_row['c_age_id']
+      time_id      = avgint_row['c_time_id']
+      split_id     = avgint_row['c_split_reference_id']
+      key          = (integrand_id, node_id, split_id, age_id, time_id)
+      if key not in index :
+         index[key] = len(index)
+      avgint_index[this_avgint_id] = index[key]
+   #
+   # n_sample
+   row_index = avgint_index[avgint_id]
+   count     = numpy.bincount(row_index, minlength = len(index) )
+   n_sample  = 0
+   if len(index) > 0 :
+      n_sample = int( count[0] )
+   if numpy.any( count != n_sample ) :
+      msg  = 'create_shift_db: c_shift_predict_sample table does not have '
+      msg += 'the same number of samples for each key'
+      assert False, msg
+   #
+   # value
+   order = numpy.argsort(row_index, kind = 'stable')
+   value = avg_integrand[order].reshape( len(index), n_sample )
+   #
+   fit_sample = { 'index' : index, 'value' : value }
+   return fit_sample
+# ----------------------------------------------------------------------------
+# set_sample_std(fit_sample, std_request_list)
+# Each element of std_request_list is a tuple
+#     (shift_prior_row, key, mean, eta, std_factor)
+# and this routine sets
+#     shift_prior_row['std'] = std_factor * std
+# where std is the standard deviation of the samples for key
+# relative to mean (in log space when eta is not None).
+# The calculations are vectorized over the requests and the results are
+# the same as computing numpy.std for each request's samples separately.
+def set_sample_std(fit_sample, std_request_list) :
+   for log_space in [ False, True ] :
+      #
+      # request_list
+      request_list = list()
+      for request in std_request_list :
+         if (request[3] is not None) == log_space :
+            request_list.append(request)
+      if len(request_list) > 0 :
+         #
+         # sample, mean
+         index  = fit_sample['index']
+         row    = [ index[ request[1] ] for request in request_list ]
+         sample = fit_sample['value'][row, :]
+         mean   = numpy.array(
+            [ request[2] for request in request_list ], dtype = float
+         )
+         if not log_space :
+            #
+            # std
+            std = numpy.std(sample, axis = 1, mean = mean[:, numpy.newaxis])
+         else :
+            # There is a log trasnformation of these variables before
+            # passing them to cppad_mixed. Hence their values are gaussian
+            # in log space.
+            #
+            # log_sample
+            # math.log is used (instead of numpy.log) so the results are
+            # the same as computing the log one sample at a time.
+            eta        = numpy.array(
+               [ request[3] for request in request_list ], dtype = float
+            )
+            sample     = numpy.maximum(sample, - eta[:, numpy.newaxis] / 5.0)
+            sample     = sample + eta[:, numpy.newaxis]
+            log_sample = numpy.fromiter(
+               map( math.log, sample.ravel().tolist() ),
+               dtype = float,
+               count = sample.size,
+            ).reshape( sample.shape )
+            #
+            # log_std
+            log_mean = [ math.log(m + e) for (m, e) in zip(mean, eta) ]
+            log_mean = numpy.array(log_mean, dtype = float)
+            log_std  = numpy.std(
+               log_sample, axis = 1, mean = log_mean[:, numpy.newaxis]
+            )
+            #
+            # std
+            # inverse log transformation
+            std = list()
+            for (i, request) in enumerate(request_list) :
+               mean_i = request[2]
+               eta_i  = request[3]
+               std.append( (math.exp(log_std[i]) - 1) * (mean_i + eta_i) )
+         #
+         # shift_prior_row['std']
+         for (i, request) in enumerate(request_list) :
+            shift_prior_row        = request[0]
+            std_factor             = request[4]
+            shift_prior_row['std'] = std_factor * std[i]
+# ----------------------------------------------------------------------------
 # The smoothing for the new shift_table['smooth_grid'] row is the most
 # recent smoothing added to shift_table['smooth']; i.e., its smoothing_id
 # is len( shift_table['smooth'] ) - 1.
 def add_shift_grid_row(
    fit_fit_var,
    fit_sample,
+   std_request_list,
    fit_table,
    shift_table,
    fit_grid_row,
@@ -430,33 +654,15 @@ def add_shift_grid_row(
             mean                     = max(mean, lower)
             shift_prior_row['mean']  = mean
             #
-            # if no_ode_fit then len(fit_sample) is zero
-            if len(fit_sample) > 0 :
+            # if no_ode_fit then len(fit_sample['index']) is zero
+            if len(fit_sample['index']) > 0 :
                #
-               # std
-               eta        = fit_prior_row['eta']
-               if eta is None :
-                  std  = numpy.std(fit_sample[key], mean=mean)
-               else:
-                  # There is a log trasnformation of this variable before
-                  # passing it to cppad_mixed. Hence its value are gaussian
-                  # in log space.
-                  #
-                  # log_sample
-                  log_sample = list()
-                  for sample in fit_sample[key] :
-                     sample = max( - eta / 5.0 , sample )
-                     log_sample.append( math.log( sample + eta ) )
-                  #
-                  # log_std
-                  log_mean = math.log(mean + eta)
-                  log_std  = numpy.std(log_sample, mean = log_mean, ddof = 0)
-                  #
-                  # inverse log transformation
-                  std      = (math.exp(log_std) - 1) * (mean + eta)
-               #
-               # shift_prior_row['std']
-               shift_prior_row['std']         = shift_prior_std_factor * std
+               # std_request_list
+               # shift_prior_row['std'] is set by set_sample_std
+               eta = fit_prior_row['eta']
+               std_request_list.append(
+                  (shift_prior_row, key, mean, eta, shift_prior_std_factor)
+               )
          #
          # shift_table['prior']
          shift_table['prior'].append( shift_prior_row )
@@ -544,18 +750,17 @@ def create_shift_db(
    predict_sample = not no_ode_fit
    #
    # all_table
-   connection = dismod_at.create_connection(
-      all_node_database, new = False, readonly = True
-   )
+   context    = at_cascade.cascade_context(all_node_database)
    all_table  = dict()
    for name in [
       'option_all',
       'split_reference',
       'mulcov_freeze',
-      'cov_reference',
    ] :
-      all_table[name] =  dismod_at.get_table_dict(connection, name)
-   connection.close()
+      all_table[name] = context.get_table(name)
+   #
+   # cov_reference_index
+   cov_reference_index = context.cov_reference_index()
    #
    # root_database
    root_database      = None
@@ -598,6 +803,27 @@ def create_shift_db(
       if row['option_name'] == 'no_ode_ignore' :
          no_ode_ignore = row['option_value'].strip()
    #
+   # slim_shift_db
+   slim_shift_db = False
+   for row in all_table['option_all'] :
+      if row['option_name'] == 'slim_shift_db' :
+         slim_shift_db = row['option_value'].strip()
+         if slim_shift_db not in [ 'true', 'false' ] :
+            msg  = f'option_all table: slim_shift_db = {slim_shift_db} '
+            msg += 'is not true or false'
+            assert False, msg
+         slim_shift_db = slim_shift_db == 'true'
+   #
+   # max_shift_db_process
+   max_shift_db_process = 1
+   for row in all_table['option_all'] :
+      if row['option_name'] == 'max_shift_db_process' :
+         max_shift_db_process = int( row['option_value'] )
+         if max_shift_db_process < 1 :
+            msg  = 'option_all table: max_shift_db_process = '
+            msg += f'{max_shift_db_process} is less than one'
+            assert False, msg
+   #
    # freeze_type
    freeze_type = 'mean'
    for row in all_table['option_all'] :
@@ -633,8 +859,7 @@ def create_shift_db(
    ] :
       fit_table[name] = fit_or_root.get_table(name)
    if predict_sample :
-      for name in [ 'c_shift_predict_sample', 'sample' ] :
-         fit_table[name] = fit_or_root.get_table(name)
+      fit_table['sample'] = fit_or_root.get_table('sample')
    fit_or_root.close()
    #
    # age_id_next_list
@@ -647,6 +872,9 @@ def create_shift_db(
       fit_table['smooth'], fit_table['smooth_grid'], fit_table['time']
    )
    #
+   # smooth_grid_index
+   smooth_grid_index = get_smooth_grid_index( fit_table['smooth_grid'] )
+   #
    # name_rate2integrand
    name_rate2integrand = {
       'pini'  : 'prevalence',
@@ -683,20 +911,10 @@ def create_shift_db(
       fit_fit_var[key] = predict_row['avg_integrand']
    #
    # fit_sample
-   fit_sample = dict()
    if predict_sample :
-      for predict_row in fit_table['c_shift_predict_sample'] :
-         avgint_id          = predict_row['avgint_id']
-         avgint_row         = fit_table['c_shift_avgint'][avgint_id]
-         integrand_id       = avgint_row['integrand_id']
-         node_id            = avgint_row['node_id']
-         age_id             = avgint_row['c_age_id']
-         time_id            = avgint_row['c_time_id']
-         split_id           = avgint_row['c_split_reference_id']
-         key           = (integrand_id, node_id, split_id, age_id, time_id)
-         if not key in fit_sample :
-            fit_sample[key] = list()
-         fit_sample[key].append( predict_row['avg_integrand'] )
+      fit_sample = get_fit_sample(fit_database, fit_table['c_shift_avgint'])
+   else :
+      fit_sample = { 'index' : dict(), 'value' : None }
    #
    # fit_node_name
    fit_node_name = None
@@ -710,7 +928,9 @@ def create_shift_db(
    fit_node_id = at_cascade.table_name2id(
       fit_table['node'], 'node', fit_node_name
    )
-   for shift_name in shift_databases :
+   #
+   # create_one_shift_db
+   def create_one_shift_db(shift_name) :
       # ---------------------------------------------------------------------
       # create shift_databases[shift_name]
       # ---------------------------------------------------------------------
@@ -776,8 +996,16 @@ def create_shift_db(
          )
       #
       # shift_database     = fit_database
-      shift_database = shift_databases[shift_name]
-      shutil.copyfile(fit_database, shift_database)
+      # The database is created with a temporary name and then renamed,
+      # so a partially written shift database is never present.
+      final_database = shift_databases[shift_name]
+      shift_database = final_database + '.tmp'
+      if slim_shift_db :
+         copy_slim_database(
+            fit_database, shift_database, set( shift_table.keys() )
+         )
+      else :
+         shutil.copyfile(fit_database, shift_database)
       #
       # shift_table['option']
       # Set value for parent_node_name and other_database
@@ -798,7 +1026,7 @@ def create_shift_db(
       n_covariate = len( fit_table['covariate'] )
       cov_reference_list = get_cov_reference_list(
          n_covariate,
-         all_table['cov_reference'],
+         cov_reference_index,
          shift_node_id,
          shift_split_reference_id
       )
@@ -817,6 +1045,9 @@ def create_shift_db(
          shift_row  = shift_table['covariate'][split_covariate_id]
          shift_row['reference'] = reference
       #
+      # std_request_list
+      std_request_list = list()
+      #
       # --------------------------------------------------------------------
       # shift_table['mulcov']
       # and corresponding entries in
@@ -885,25 +1116,25 @@ def create_shift_db(
             # add rows for this smoothing
             node_id  = None
             split_id = None
-            for fit_grid_row in fit_table['smooth_grid'] :
-               if fit_grid_row['smooth_id'] == fit_smooth_id :
-                  add_shift_grid_row(
-                     fit_fit_var,
-                     fit_sample,
-                     fit_table,
-                     shift_table,
-                     fit_grid_row,
-                     integrand_id,
-                     node_id,
-                     split_id,
-                     shift_prior_std_factor_mulcov,
-                     shift_prior_dage,
-                     shift_prior_dtime,
-                     freeze,
-                     copy_row,
-                     age_id_next_list[fit_smooth_id],
-                     time_id_next_list[fit_smooth_id],
-                  )
+            for fit_grid_row in smooth_grid_index[fit_smooth_id] :
+               add_shift_grid_row(
+                  fit_fit_var,
+                  fit_sample,
+                  std_request_list,
+                  fit_table,
+                  shift_table,
+                  fit_grid_row,
+                  integrand_id,
+                  node_id,
+                  split_id,
+                  shift_prior_std_factor_mulcov,
+                  shift_prior_dage,
+                  shift_prior_dtime,
+                  freeze,
+                  copy_row,
+                  age_id_next_list[fit_smooth_id],
+                  time_id_next_list[fit_smooth_id],
+               )
 
       # --------------------------------------------------------------------
       # shift_table['rate']
@@ -960,25 +1191,25 @@ def create_shift_db(
             #
             # shift_table['smooth_grid']
             # add rows for this smoothing
-            for fit_grid_row in fit_table['smooth_grid'] :
-               if fit_grid_row['smooth_id'] == fit_smooth_id :
-                  add_shift_grid_row(
-                     fit_fit_var,
-                     fit_sample,
-                     fit_table,
-                     shift_table,
-                     fit_grid_row,
-                     integrand_id,
-                     shift_node_id,
-                     shift_split_reference_id,
-                     shift_prior_std_factor,
-                     shift_prior_dage,
-                     shift_prior_dtime,
-                     freeze,
-                     copy_row,
-                     age_id_next_list[fit_smooth_id],
-                     time_id_next_list[fit_smooth_id],
-                  )
+            for fit_grid_row in smooth_grid_index[fit_smooth_id] :
+               add_shift_grid_row(
+                  fit_fit_var,
+                  fit_sample,
+                  std_request_list,
+                  fit_table,
+                  shift_table,
+                  fit_grid_row,
+                  integrand_id,
+                  shift_node_id,
+                  shift_split_reference_id,
+                  shift_prior_std_factor,
+                  shift_prior_dage,
+                  shift_prior_dtime,
+                  freeze,
+                  copy_row,
+                  age_id_next_list[fit_smooth_id],
+                  time_id_next_list[fit_smooth_id],
+               )
          # ----------------------------------------------------------------
          # fit_smooth_id
          fit_smooth_id = None
@@ -1005,29 +1236,31 @@ def create_shift_db(
             shift_rate_row['child_smooth_id'] = shift_smooth_id
             #
             # add rows for this smoothing to shift_table['smooth_grid']
-            for fit_grid_row in fit_table['smooth_grid'] :
-               if fit_grid_row['smooth_id'] == fit_smooth_id :
-                  #
-                  # update: shift_table['smooth_grid']
-                  shift_grid_row = copy.copy( fit_grid_row )
-                  #
-                  for ty in [
-                     'value_prior_id', 'dage_prior_id', 'dtime_prior_id'
-                         ] :
-                     prior_id  = fit_grid_row[ty]
-                     if prior_id is None :
-                        shift_grid_row[ty] = None
-                     else :
-                        prior_row = fit_table['prior'][prior_id]
-                        prior_row = copy.copy(prior_row)
-                        prior_id  = len( shift_table['prior'] )
-                        shift_table['prior'].append( prior_row )
-                        add_index_to_name(
-                           shift_table['prior'], 'prior_name'
-                        )
-                        shift_grid_row[ty] = prior_id
-                  shift_grid_row['smooth_id']      = shift_smooth_id
-                  shift_table['smooth_grid'].append( shift_grid_row )
+            for fit_grid_row in smooth_grid_index[fit_smooth_id] :
+               #
+               # update: shift_table['smooth_grid']
+               shift_grid_row = copy.copy( fit_grid_row )
+               #
+               for ty in [
+                  'value_prior_id', 'dage_prior_id', 'dtime_prior_id'
+                      ] :
+                  prior_id  = fit_grid_row[ty]
+                  if prior_id is None :
+                     shift_grid_row[ty] = None
+                  else :
+                     prior_row = fit_table['prior'][prior_id]
+                     prior_row = copy.copy(prior_row)
+                     prior_id  = len( shift_table['prior'] )
+                     shift_table['prior'].append( prior_row )
+                     add_index_to_name(
+                        shift_table['prior'], 'prior_name'
+                     )
+                     shift_grid_row[ty] = prior_id
+               shift_grid_row['smooth_id']      = shift_smooth_id
+               shift_table['smooth_grid'].append( shift_grid_row )
+      #
+      # shift_table['prior']
+      set_sample_std(fit_sample, std_request_list)
       #
       # shift_connection
       new        = False
@@ -1048,7 +1281,7 @@ def create_shift_db(
       if predict_sample :
          drop_list.append(  'c_shift_predict_sample' )
       for table_name in drop_list :
-         command  = f'DROP TABLE {table_name}'
+         command  = f'DROP TABLE IF EXISTS {table_name}'
          dismod_at.sql_command(shift_connection, command)
       #
       # shift_connection
@@ -1056,3 +1289,75 @@ def create_shift_db(
       #
       # shift_database
       at_cascade.omega_constraint(all_node_database, shift_database)
+      #
+      # final_database
+      os.replace(shift_database, final_database)
+   #
+   # remove_tmp_database
+   def remove_tmp_database(shift_name) :
+      tmp_database = shift_databases[shift_name] + '.tmp'
+      if os.path.exists(tmp_database) :
+         os.remove(tmp_database)
+   #
+   # create_shift_db_list
+   def create_shift_db_list(shift_name_list) :
+      for shift_name in shift_name_list :
+         try :
+            create_one_shift_db(shift_name)
+         except BaseException :
+            remove_tmp_database(shift_name)
+            raise
+   #
+   # shift_name_list
+   shift_name_list = list( shift_databases.keys() )
+   #
+   # n_process
+   # Use at most max_shift_db_process processes and
+   # at most one more than the number of idle cpus (when it is available).
+   # The fork start method is not available on some systems; e.g. Windows.
+   n_process = min(max_shift_db_process, len(shift_name_list))
+   if n_process > 1 :
+      if 'fork' not in multiprocessing.get_all_start_methods() :
+         n_process = 1
+   if n_process > 1 :
+      n_cpu = os.cpu_count()
+      try :
+         load_average = os.getloadavg()[0]
+      except (AttributeError, OSError) :
+         load_average = None
+      if n_cpu is not None and load_average is not None :
+         n_idle    = n_cpu - math.ceil(load_average)
+         n_process = min(n_process, n_idle + 1)
+   #
+   # shift_databases
+   if n_process <= 1 :
+      create_shift_db_list(shift_name_list)
+   else :
+      # fork is used so that the processes can share fit_table and the
+      # other values computed above without pickling them.
+      context      = multiprocessing.get_context('fork')
+      process_list = list()
+      for i in range(n_process) :
+         p = context.Process(
+            target = create_shift_db_list,
+            args   = ( shift_name_list[i :: n_process] , ),
+         )
+         p.start()
+         process_list.append(p)
+      for p in process_list :
+         p.join()
+      #
+      # failed_list
+      # shift names handled by a process that failed
+      failed_list = list()
+      for (i, p) in enumerate(process_list) :
+         if p.exitcode != 0 :
+            failed_list += shift_name_list[i :: n_process]
+      #
+      # remove the temporary databases for a process that was killed
+      for shift_name in failed_list :
+         remove_tmp_database(shift_name)
+      if len(failed_list) > 0 :
+         msg  = 'create_shift_db: a process failed while creating the '
+         msg += 'shift databases for: ' + ' '.join(failed_list)
+         assert False, msg
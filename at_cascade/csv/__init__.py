@@ -108,6 +108,7 @@ Routines
    at_cascade/csv/ancestor_fit.py
    at_cascade/csv/check_table.py
    at_cascade/csv/covariate_avg.py
+   at_cascade/csv/covariate_avg_all.py
    at_cascade/csv/covariate_both.py
    at_cascade/csv/covariate_same.py
    at_cascade/csv/covariate_spline.py
@@ -120,6 +121,8 @@ Routines
    at_cascade/csv/pre_parallel.py
    at_cascade/csv/pre_user.py
    at_cascade/csv/predict.py
+   at_cascade/csv/read_column.py
+   at_cascade/csv/read_column_chunk.py
    at_cascade/csv/read_table.py
    at_cascade/csv/set_truth.py
    at_cascade/csv/simulate.py
@@ -130,23 +133,26 @@ Routines
 {xrst_end csv.module}
 '''
 # BEGIN_SORT_THIS_LINE_PLUS_1
-from .ancestor_fit     import ancestor_fit
-from .check_table      import check_table
-from .covariate_avg    import covariate_avg
-from .covariate_both   import covariate_both
-from .covariate_same   import covariate_same
-from .covariate_spline import covariate_spline
-from .empty_str        import empty_str
-from .fit              import fit
-from .get_header       import get_header
-from .join_file        import join_file
-from .pre_one_job      import pre_one_job
-from .pre_one_process  import pre_one_process
-from .pre_parallel     import pre_parallel
-from .pre_user         import pre_user
-from .predict          import predict
-from .read_table       import read_table
-from .set_truth        import set_truth
-from .simulate         import simulate
-from .write_table      import write_table
+from .ancestor_fit      import ancestor_fit
+from .check_table       import check_table
+from .covariate_avg     import covariate_avg
+from .covariate_avg_all import covariate_avg_all
+from .covariate_both    import covariate_both
+from .covariate_same    import covariate_same
+from .covariate_spline  import covariate_spline
+from .empty_str         import empty_str
+from .fit               import fit
+from .get_header        import get_header
+from .join_file         import join_file
+from .pre_one_job       import pre_one_job
+from .pre_one_process   import pre_one_process
+from .pre_parallel      import pre_parallel
+from .pre_user          import pre_user
+from .predict           import predict
+from .read_column       import read_column
+from .read_column_chunk import read_column_chunk
+from .read_table        import read_table
+from .set_truth         import set_truth
+from .simulate          import simulate
+from .write_table       import write_table
 # END_SORT_THIS_LINE_MINUS_1
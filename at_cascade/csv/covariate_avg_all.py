@@ -0,0 +1,150 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin csv.covariate_avg_all}
+
+Compute Covariate Averages for All Nodes and Sexes
+##################################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+covariate_table
+***************
+Is the same as for :ref:`csv.covariate_avg-name` .
+If there are no rows with *sex* equal to ``both`` ,
+the averages for ``both`` are computed as if the rows had been added
+by :ref:`csv.covariate_both-name` .
+
+covariate_average_dict
+**********************
+This return is a dict where the keys are ( *node_name* , *sex* ) tuples.
+For each *node_name* and *sex* in the covariate table
+(and *sex* equal to ``both`` ),
+*covariate_average_dict* [ ( *node_name* , *sex* ) ]
+is equal to the *covariate_average* returned by
+
+   covariate_avg( *covariate_table* , *node_name* , *sex* )
+
+The values are exactly equal because the sum for each covariate
+is accumulated in the same order, and starting at the same value,
+as in covariate_avg.
+
+Speed
+*****
+The covariate table is only scanned once, instead of once for each
+node and sex.
+
+{xrst_end csv.covariate_avg_all}
+'''
+import numpy
+# BEGIN_DEF
+# at_cascade.csv.covariate_avg_all
+def covariate_avg_all(covariate_table) :
+   assert type(covariate_table) == list
+   assert type(covariate_table[0]) == dict
+   # END_DEF
+   #
+   # covariate_name_list
+   covariate_name_list = list()
+   for key in covariate_table[0].keys() :
+      if key not in [ 'node_name', 'sex', 'age', 'time', 'omega' ] :
+         covariate_name_list.append(key)
+   #
+   # group_list, row_group, female_index, male_index, has_both
+   # group_list[group_id] is the (node_name, sex) for a group_id
+   # row_group[row_index] is the group_id for a row of covariate_table
+   # female_index, male_index map (node_name, age, time) to a row index.
+   group_id     = dict()
+   group_list   = list()
+   row_group    = numpy.empty( len(covariate_table), dtype = int )
+   female_index = dict()
+   male_index   = dict()
+   has_both     = False
+   line_number  = 0
+   for (row_index, row) in enumerate(covariate_table) :
+      line_number += 1
+      sex          = row['sex']
+      if sex not in  { 'female', 'male', 'both' } :
+         msg  = f'covariate.csv at line {line_number}\n'
+         msg += 'sex = {sex} is not female or male'
+         assert False, msg
+      #
+      key = ( row['node_name'], sex )
+      if key not in group_id :
+         group_id[key] = len(group_list)
+         group_list.append(key)
+      row_group[row_index] = group_id[key]
+      #
+      triple = ( row['node_name'], row['age'], row['time'] )
+      if sex == 'female' :
+         female_index[triple] = row_index
+      elif sex == 'male' :
+         male_index[triple] = row_index
+      else :
+         has_both = True
+   #
+   # value
+   value = numpy.empty(
+      ( len(covariate_table), len(covariate_name_list) ), dtype = float
+   )
+   for (row_index, row) in enumerate(covariate_table) :
+      for (j, covariate_name) in enumerate(covariate_name_list) :
+         value[row_index, j] = float( row[covariate_name] )
+   #
+   # value, row_group
+   # add the both rows in the same order and with the same values
+   # as covariate_both
+   if not has_both :
+      assert set( female_index.keys() ) == set( male_index.keys() )
+      female = numpy.array( list( female_index.values() ), dtype = int )
+      male   = numpy.array(
+         [ male_index[triple] for triple in female_index ], dtype = int
+      )
+      value_female = value[female, :]
+      value_male   = value[male, :]
+      value_both   = numpy.where(
+         value_female == value_male,
+         value_female,
+         (value_female + value_male) / 2.0,
+      )
+      both_group = numpy.empty( len(female), dtype = int )
+      for (i, triple) in enumerate(female_index) :
+         key = ( triple[0], 'both' )
+         if key not in group_id :
+            group_id[key] = len(group_list)
+            group_list.append(key)
+         both_group[i] = group_id[key]
+      value     = numpy.concatenate( (value, value_both) )
+      row_group = numpy.concatenate( (row_group, both_group) )
+   #
+   # count, covariate_sum
+   # bincount adds the weights in order, starting at zero, for each group
+   n_group       = len(group_list)
+   count         = numpy.bincount(row_group, minlength = n_group)
+   covariate_sum = numpy.empty( (n_group, len(covariate_name_list) ) )
+   for j in range( len(covariate_name_list) ) :
+      covariate_sum[:, j] = numpy.bincount(
+         row_group, weights = value[:, j], minlength = n_group
+      )
+   #
+   # covariate_average_dict
+   covariate_average_dict = dict()
+   for (group_id, key) in enumerate(group_list) :
+      covariate_average = dict()
+      for (j, covariate_name) in enumerate(covariate_name_list) :
+         covariate_average[covariate_name] = \
+            float( covariate_sum[group_id, j] ) / int( count[group_id] )
+      covariate_average_dict[key] = covariate_average
+   #
+   # BEGIN_RETURN
+   # ...
+   assert type(covariate_average_dict) == dict
+   return covariate_average_dict
+   # END_RETURN
@@ -1,8 +1,9 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
-# SPDX-FileContributor: 2024 Bradley M. Bell
+# SPDX-FileContributor: 2024-26 Bradley M. Bell
 # ----------------------------------------------------------------------------
-import copy
+import operator
+import numpy
 '''
 {xrst_begin csv.covariate_same}
 
@@ -51,6 +52,16 @@ For a *node_name* , *sex*, and *cov_name* is *covariate_table*
    for all the (node_name, sex, cov_name) triples
    that have the same *cov_name* value for each age and time.
 
+Method
+******
+For each *cov_name* , the values corresponding to each (node_name, sex)
+pair are stored in a row of a numpy matrix.
+The bytes for each row are used as a key in a dictionary that maps
+the key to the first (node_other, sex_other) pair,
+in sorted order, that has the same values.
+A nan is not equal to any value, so a pair that has a nan value
+for *cov_name* is only the same as itself.
+
 Side Effects
 ************
 This routine reports and error
@@ -67,10 +78,19 @@ see :ref:`csv.cov_same_xam-name` .
 # at_cascade.csv.covariate_same
 def covariate_same(covariate_table) :
    assert type(covariate_table) == list
-   for row in covariate_table :
-      for key in row :
-         type_check = str if key in [ 'node_name' , 'sex' ] else float
-         assert type( row[key] ) == type_check
+   #
+   # column
+   # column[key] is the column of covariate_table corresponding to key.
+   # It is a list for node_name and sex and a numpy array for the others.
+   column = dict()
+   for key in covariate_table[0] :
+      value_list = list( map( operator.itemgetter(key), covariate_table ) )
+      type_check = str if key in [ 'node_name' , 'sex' ] else float
+      assert set( map(type, value_list) ) == { type_check }
+      if type_check == str :
+         column[key] = value_list
+      else :
+         column[key] = numpy.array(value_list, dtype = float)
    # END_DEF
    #
    #
@@ -78,90 +98,92 @@ def covariate_same(covariate_table) :
    exclude    = { 'node_name', 'sex', 'age', 'time'}
    cov_list   = list( set( covariate_table[0].keys() ) - exclude )
    #
-   # node_set, sex_set, age_set, time_set
-   node_set   = set()
-   sex_set    = set()
-   age_set    = set()
-   time_set   = set()
-   for row in covariate_table :
-      node_set.add( row['node_name'] )
-      sex_set.add(  row['sex'] )
-      age_set.add(  row['age'] )
-      time_set.add( row['time'] )
-   #
-   # node_list, sex_list, age_list, time_list
-   node_list = sorted( node_set )
-   sex_list  = sorted( sex_set )
-   age_list  = sorted( age_set )
-   time_list = sorted( time_set )
+   # node_list, node_index, sex_list, sex_index
+   index_dict = dict()
+   for key in [ 'node_name', 'sex' ] :
+      name_list       = sorted( set( column[key] ) )
+      name2index      = { name : i for (i, name) in enumerate(name_list) }
+      index_dict[key] = numpy.fromiter(
+         map( name2index.__getitem__, column[key] ) ,
+         dtype = int ,
+         count = len(covariate_table) ,
+      )
+      if key == 'node_name' :
+         node_list = name_list
+      else :
+         sex_list  = name_list
+   node_index = index_dict['node_name']
+   sex_index  = index_dict['sex']
    #
-   # cov_subtable
-   cov_subtable = dict()
-   for node_name in node_list :
-      for sex in sex_list :
-         cov_subtable[ (node_name, sex) ] = list()
+   # age_list, time_list
+   age_list   = numpy.unique( column['age'] )
+   time_list  = numpy.unique( column['time'] )
    #
-   # cov_subtable
-   for row in covariate_table :
-      node_name = row['node_name']
-      sex       = row['sex']
-      cov_subtable[ (node_name, sex) ].append( row )
+   # pair_list
+   # all the (node_name, sex) pairs in sorted order
+   pair_list = [ (node, sex) for node in node_list for sex in sex_list ]
    #
-   # cov_subtable
-   for pair in cov_subtable :
-      table = cov_subtable[pair]
-      table = sorted(table, key = lambda row : (row['age'], row['time']) )
-      cov_subtable[pair] = table
+   # order
+   # the rows in pair_list order and then sorted by age and time
+   pair_index = node_index * len(sex_list) + sex_index
+   order      = numpy.lexsort( (column['time'], column['age'], pair_index) )
    #
    # check age-time grid
-   n_age  = len(age_list)
-   n_time = len(time_list)
-   for pair in cov_subtable :
-      table = cov_subtable[pair]
-      for (i_age, age) in enumerate(age_list) :
-         for (i_time, time) in enumerate(time_list) :
-            index = i_age * n_time + i_time
-            row   = table[index]
-            age   = row['age']
-            time  = row['time']
-            if age != age_list[i_age] or time != time_list[i_time] :
-               (node_name, sex) = pair
-               msg  = 'covariate_spline: Error in covariate.csv\n'
-               msg += f'node_name = {node_name}, sex = {sex} \n'
-               msg += 'Expected following rectangular grid:\n'
-               msg += f'age_grid  = {age_list}\n'
-               msg += f'time_grid = {time_list}'
-               assert False, msg
+   # bad_pair[i_pair] is true if the rows for pair_list[i_pair] are not
+   # the rectangular grid age_list by time_list.
+   n_age      = len(age_list)
+   n_time     = len(time_list)
+   n_grid     = n_age * n_time
+   pair_count = numpy.bincount( pair_index, minlength = len(pair_list) )
+   bad_pair   = pair_count != n_grid
+   pair_index = pair_index[order]
+   position   = numpy.arange( len(order) ) - \
+      ( numpy.cumsum(pair_count) - pair_count )[pair_index]
+   position   = numpy.minimum(position, n_grid - 1)
+   bad_row    = ( column['age'][order] != age_list[position // n_time] ) | \
+      ( column['time'][order] != time_list[position % n_time] )
+   bad_pair[ pair_index[bad_row] ] = True
+   if numpy.any(bad_pair) :
+      (node_name, sex) = pair_list[ int( numpy.argmax(bad_pair) ) ]
+      msg  = 'covariate_spline: Error in covariate.csv\n'
+      msg += f'node_name = {node_name}, sex = {sex} \n'
+      msg += 'Expected following rectangular grid:\n'
+      msg += f'age_grid  = {age_list.tolist()}\n'
+      msg += f'time_grid = {time_list.tolist()}'
+      assert False, msg
    #
    # cov_same
    cov_same = dict()
    for cov_name in cov_list :
       #
-      # cov_value_dict
-      cov_value_dict = dict()
-      for pair in cov_subtable :
-         cov_value = list()
-         for row in cov_subtable[pair] :
-            cov_value.append( row[cov_name] )
-         cov_value_dict[pair] = cov_value
+      # cov_matrix
+      # cov_matrix[i_pair, index] is the cov_name value for pair_list[i_pair]
+      # at age_list[i_age], time_list[i_time] where
+      # index = i_age * n_time + i_time.
+      cov_matrix = column[cov_name][order].reshape( len(pair_list), n_grid )
+      #
+      # cov_matrix
+      # map -0.0 to 0.0 so that values that are equal have the same bytes
+      cov_matrix = cov_matrix + 0.0
+      #
+      # has_nan
+      has_nan = numpy.any( numpy.isnan(cov_matrix), axis = 1 ).tolist()
       #
-      # cov_value_list
-      cov_value_list = sorted(cov_value_dict.items(), key = lambda x : x[1])
+      # bytes2triple
+      # maps the key for a set of values to the first triple that has them
+      bytes2triple = dict()
       #
       # cov_same
-      previous_value  = None
-      previous_triple = None
-      for (pair, cov_value) in cov_value_list :
+      # A nan is not equal to any value, so a pair that has a nan value
+      # gets a key that is unique and is only the same as itself.
+      for (i_pair, pair) in enumerate(pair_list) :
          (node_name, sex) = pair
          triple           = (node_name, sex, cov_name)
-         if cov_value == previous_value :
-            other_triple           = cov_same[previous_triple]
-            cov_same[triple]       = other_triple
-            assert cov_same[other_triple] == other_triple
+         if has_nan[i_pair] :
+            key = i_pair
          else :
-            cov_same[triple] = triple
-         previous_value  = cov_value
-         previous_triple = triple
+            key = cov_matrix[i_pair].tobytes()
+         cov_same[triple] = bytes2triple.setdefault(key, triple)
    # BEGIN_RETURN
    #
    assert type(cov_same) == dict
@@ -1,7 +1,8 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
-# SPDX-FileContributor: 2021-25 Bradley M. Bell
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
 # ----------------------------------------------------------------------------
+import csv
 import multiprocessing
 import queue
 import dismod_at
@@ -9,6 +10,7 @@ import at_cascade
 import copy
 import os
 import time
+import numpy
 r'''
 
 {xrst_begin csv.fit}
@@ -1232,6 +1234,350 @@ class weighting_function :
          assert False, msg
       return self.value[ (age, time) ]
 # ----------------------------------------------------------------------------
+# value = spline_list_value(spline_dict, name_list, age, time)
+#
+# value[k, i] is spline_dict[ name_list[k] ]( age[i], time[i] ) .
+# The splines that share a bilinear grid are evaluated together;
+# see bilinear Many Columns.
+def spline_list_value(spline_dict, name_list, age, time) :
+   #
+   # grid_dict
+   # grid_dict[ id(grid) ] = (grid, k_list, z_index_list)
+   grid_dict = dict()
+   for (k, name) in enumerate(name_list) :
+      spline = spline_dict[name]
+      key    = id( spline.grid )
+      if key not in grid_dict :
+         grid_dict[key] = ( spline.grid, list(), list() )
+      grid_dict[key][1].append(k)
+      grid_dict[key][2].append(spline.z_index)
+   #
+   # value
+   value = numpy.empty( (len(name_list), len(age)) )
+   for (grid, k_list, z_index_list) in grid_dict.values() :
+      value[k_list] = grid(age, time, z_index_list)
+   return value
+# ----------------------------------------------------------------------------
+# set_data_covariate(
+#  data_table, age_mid, time_mid, spline_cov, covariate_name_list
+# )
+#
+# data_table
+# is the list of dict corresponding to data_in.csv. For each row, and each
+# covariate_name in covariate_name_list, row[covariate_name] is set to the
+# value of the covariate at the node_name and sex for the row and at
+# the corresponding age_mid and time_mid. If the sex is both, it is the
+# average of the female and male values.
+#
+# age_mid, time_mid
+# are numpy arrays with the age and time midpoint for each row.
+#
+# spline_cov
+# is the covariate spline dict returned by csv.covariate_spline.
+#
+# The rows are grouped by (node_name, sex) and the splines are evaluated
+# for all the rows and covariates in a group at once. The results are the
+# same as evaluating the splines one row and one covariate at a time.
+def set_data_covariate(
+   data_table, age_mid, time_mid, spline_cov, covariate_name_list
+) :
+   #
+   # group_row_list
+   group_row_list = dict()
+   for (i_row, row) in enumerate(data_table) :
+      key = ( row['node_name'], row['sex'] )
+      if key not in group_row_list :
+         group_row_list[key] = list()
+      group_row_list[key].append(i_row)
+   #
+   # (node_name, sex)
+   for (node_name, sex) in group_row_list :
+      #
+      # row_index, age, time
+      row_index = numpy.array( group_row_list[ (node_name, sex) ], dtype=int )
+      age       = age_mid[row_index]
+      time      = time_mid[row_index]
+      #
+      # value_list
+      if sex != 'both' :
+         value = spline_list_value(
+            spline_cov[node_name][sex], covariate_name_list, age, time
+         )
+      else :
+         value = numpy.zeros( (len(covariate_name_list), len(row_index)) )
+         for tmp in [ 'female', 'male' ] :
+            value += spline_list_value(
+               spline_cov[node_name][tmp], covariate_name_list, age, time
+            ) / 2.0
+      value_list = value.tolist()
+      #
+      # data_table
+      for (j, i_row) in enumerate( group_row_list[ (node_name, sex) ] ) :
+         row = data_table[i_row]
+         for (index, covariate_name) in enumerate( covariate_name_list ) :
+            row[covariate_name] = value_list[index][j]
+# ----------------------------------------------------------------------------
+# data_in_chunk_size
+# is the maximum number of data_in.csv rows that are in memory at once
+# while creating the root node database.
+data_in_chunk_size = 10000
+#
+# for (line_number, chunk) in read_data_in(file_name, chunk_size) :
+#
+# file_name
+# is the name of the data_in.csv file.
+#
+# chunk
+# is a list of at most chunk_size rows of data_in.csv, in order.
+# Each row is a dict as in csv.read_table except that empty strings have
+# been converted to None; see csv.empty_str.
+#
+# line_number
+# is the line in data_in.csv that corresponds to chunk[0].
+def read_data_in(file_name, chunk_size) :
+   file_ptr    = open(file_name)
+   reader      = csv.DictReader(file_ptr)
+   line_number = 2
+   chunk       = list()
+   for row in reader :
+      for key in row :
+         if row[key] == '' :
+            row[key] = None
+      chunk.append(row)
+      if len(chunk) == chunk_size :
+         yield (line_number, chunk)
+         line_number += len(chunk)
+         chunk        = list()
+   if len(chunk) > 0 :
+      yield (line_number, chunk)
+   file_ptr.close()
+# ----------------------------------------------------------------------------
+# (data_integrand_set, data_age_time) = data_in_summary(file_name)
+#
+# file_name
+# is the name of the data_in.csv file. This routine checks the columns
+# and the data_id values in this file.
+#
+# data_integrand_set
+# is the set of integrand names that appear in data_in.csv.
+#
+# data_age_time
+# is the tuple (min age_lower, max age_upper, min time_lower, max time_upper)
+# for the rows in data_in.csv (None if there are no rows).
+def data_in_summary(file_name) :
+   #
+   # check_table
+   header = at_cascade.csv.get_header(file_name)
+   at_cascade.csv.check_table(file_name, [ dict.fromkeys(header) ] )
+   #
+   # column_type
+   column_type = {
+      'data_id'        : int ,
+      'integrand_name' : str ,
+      'age_lower'      : float ,
+      'age_upper'      : float ,
+      'time_lower'     : float ,
+      'time_upper'     : float ,
+   }
+   #
+   # data_integrand_set, data_age_time
+   data_integrand_set = set()
+   data_age_time      = None
+   n_row              = 0
+   for column in at_cascade.csv.read_column_chunk(
+      file_name, column_type, data_in_chunk_size
+   ) :
+      #
+      # data_id
+      data_id  = column['data_id']
+      expected = numpy.arange(n_row, n_row + len(data_id) )
+      if not numpy.array_equal(data_id, expected) :
+         i_row = int( expected[ data_id != expected ][0] )
+         line  = i_row + 2
+         msg  = f'Expected data_id = {i_row} in line {line} of data_in.csv'
+         assert False, msg
+      n_row += len(data_id)
+      #
+      # data_integrand_set
+      data_integrand_set.update( column['integrand_name'] )
+      #
+      # data_age_time
+      chunk_age_time = (
+         float( numpy.min( column['age_lower'] ) ) ,
+         float( numpy.max( column['age_upper'] ) ) ,
+         float( numpy.min( column['time_lower'] ) ) ,
+         float( numpy.max( column['time_upper'] ) ) ,
+      )
+      if data_age_time == None :
+         data_age_time = chunk_age_time
+      else :
+         data_age_time = (
+            min( data_age_time[0], chunk_age_time[0] ) ,
+            max( data_age_time[1], chunk_age_time[1] ) ,
+            min( data_age_time[2], chunk_age_time[2] ) ,
+            max( data_age_time[3], chunk_age_time[3] ) ,
+         )
+   return (data_integrand_set, data_age_time)
+# ----------------------------------------------------------------------------
+# insert_data_in(
+#  file_name, root_database, spline_cov, covariate_name_list, weight_dict
+# )
+#
+# file_name
+# is the name of the data_in.csv file. This file has been checked by
+# data_in_summary.
+#
+# root_database
+# is the root node database. Its data table is empty and the data_in.csv
+# rows are added to it. The rows are processed data_in_chunk_size at a time
+# and added using one transaction.
+#
+# spline_cov, covariate_name_list
+# are used to set the covariate values for each row; see set_data_covariate.
+#
+# weight_dict
+# If weight_dict is not None, weight_dict[ (node_name, sex, 'population') ]
+# is the weighting function for the population covariate. It is used for
+# data rows that have a non-zero age interval.
+def insert_data_in(
+   file_name, root_database, spline_cov, covariate_name_list, weight_dict
+) :
+   #
+   # connection
+   connection = dismod_at.create_connection(
+      root_database, new = False, readonly = False
+   )
+   #
+   # name2id
+   # name2id[tbl_name][row_name] is the tbl_name_id for row_name
+   name2id = dict()
+   for tbl_name in [ 'integrand', 'density', 'node', 'subgroup', 'weight' ] :
+      table             = dismod_at.get_table_dict(connection, tbl_name)
+      col_name          = f'{tbl_name}_name'
+      name2id[tbl_name] = dict()
+      for (row_id, row) in enumerate(table) :
+         name2id[tbl_name][ row[col_name] ] = row_id
+   #
+   # x_name
+   # x_name[x_j] is the covariate name corresponding to column x_j
+   covariate_table = dismod_at.get_table_dict(connection, 'covariate')
+   x_name          = dict()
+   for (covariate_id, row) in enumerate(covariate_table) :
+      x_name[ f'x_{covariate_id}' ] = row['covariate_name']
+   #
+   # col_name, command
+   (col_name, col_type) = dismod_at.get_name_type(connection, 'data')
+   assert col_name[0] == 'data_id'
+   command  = 'INSERT INTO data (' + ', '.join(col_name) + ') VALUES ('
+   command += ', '.join( len(col_name) * [ '?' ] ) + ')'
+   #
+   # col_source
+   # col_source[j] = (source, key) determines how to compute the value
+   # in column col_name[j] from a data row.
+   col_source = list()
+   for name in col_name :
+      if name == 'data_id' :
+         col_source.append( ('data_id', None) )
+      elif name == 'hold_out' :
+         col_source.append( ('hold_out', None) )
+      elif name in x_name :
+         col_source.append( ('covariate', x_name[name]) )
+      elif name.endswith('_id') :
+         col_source.append( ('name2id', name[: -3]) )
+      else :
+         col_source.append( ('row', name) )
+   #
+   # cursor
+   cursor = connection.cursor()
+   if not connection.in_transaction :
+      cursor.execute('BEGIN')
+   #
+   # chunk
+   for (line_number, chunk) in read_data_in(file_name, data_in_chunk_size) :
+      #
+      # age_mid, time_mid
+      age_mid    = numpy.empty( len(chunk) )
+      time_mid   = numpy.empty( len(chunk) )
+      for (index, row) in enumerate(chunk) :
+         age_lower       = float( row['age_lower'] )
+         age_upper       = float( row['age_upper'] )
+         time_lower      = float( row['time_lower'] )
+         time_upper      = float( row['time_upper'] )
+         age_mid[index]  = (age_lower + age_upper) / 2.0
+         time_mid[index] = (time_lower + time_upper) / 2.0
+      #
+      # row[c_j] for j = 0, ..., n_covariate - 1
+      set_data_covariate(
+         data_table          = chunk,
+         age_mid             = age_mid,
+         time_mid            = time_mid,
+         spline_cov          = spline_cov,
+         covariate_name_list = covariate_name_list,
+      )
+      #
+      # row_list
+      row_list = list()
+      for (i_chunk, row) in enumerate(chunk) :
+         #
+         # age_lower, age_upper, time_lower, time_upper
+         age_lower  = float( row['age_lower'] )
+         age_upper  = float( row['age_upper'] )
+         time_lower = float( row['time_lower'] )
+         time_upper = float( row['time_upper'] )
+         sex        = row['sex']
+         #
+         # row
+         row['node']       = row['node_name']
+         row['integrand']  = row['integrand_name']
+         row['density']    = row['density_name']
+         for key in [ 'eta', 'nu' ] :
+            if key in row :
+               if row[key] != None :
+                  row[key] = float( row[key] )
+         row['age_lower']  = age_lower
+         row['age_upper']  = age_upper
+         row['time_lower'] = time_lower
+         row['time_upper'] = time_upper
+         row['weight']     = ''
+         row['subgroup']   = 'world'
+         row['sex']        = at_cascade.csv.sex_name2value[sex]
+         row['one']        = '1.0'
+         #
+         # row['weight']
+         if weight_dict != None and age_lower != age_upper :
+            triple        = ( row['node_name'], sex, 'population' )
+            fun           = weight_dict[triple]
+            index         = fun.index
+            weight_name   = f'weight_{index}'
+            row['weight'] = weight_name
+         #
+         # row_list
+         row_out = list()
+         for (source, key) in col_source :
+            if source == 'row' :
+               value = row.get(key, None)
+            elif source == 'covariate' :
+               value = row[key]
+            elif source == 'name2id' :
+               if row[key] in [ None, '' ] :
+                  value = None
+               else :
+                  value = name2id[key][ row[key] ]
+            elif source == 'hold_out' :
+               value = int( row['hold_out'] )
+            else :
+               assert source == 'data_id'
+               value = line_number + i_chunk - 2
+            row_out.append(value)
+         row_list.append( row_out )
+      #
+      # data table
+      cursor.executemany(command, row_list)
+   #
+   # connection
+   connection.commit()
+   connection.close()
+# ----------------------------------------------------------------------------
 # Writes the root node data base
 #
 # root.db
@@ -1280,7 +1626,6 @@ def create_root_database(fit_dir) :
       'parent_rate',
       'child_rate',
       'mulcov',
-      'data_in',
    ]
    print('begin reading csv files')
    for name in input_list :
@@ -1426,60 +1771,13 @@ def create_root_database(fit_dir) :
       csv_covariate_table, node_set
    )
    #
-   # data_table
-   data_table     = input_table['data_in']
-   for (i_row, row) in enumerate(data_table) :
-      if i_row != int( row['data_id'] ) :
-         line = i_row + 2
-         msg  = f'Expected data_id = {i_row} in line {line} of data_in.csv'
-         assert False, msg
-      #
-      # age_mid
-      age_lower = float( row['age_lower'] )
-      age_upper = float( row['age_upper'] )
-      age_mid   = (age_lower + age_upper) / 2.0
-      #
-      # time_mid
-      time_lower = float( row['time_lower'] )
-      time_upper = float( row['time_upper'] )
-      time_mid   = (time_lower + time_upper) / 2.0
-      #
-      # row[c_j] for j = 0, ..., n_covariate - 1
-      node_name = row['node_name']
-      sex       = row['sex']
-      for index, covariate_name in enumerate( root_covariate_ref.keys() ) :
-         if sex != 'both' :
-            spline              = spline_cov[node_name][sex][covariate_name]
-            covariate_value     = spline(age_mid, time_mid)
-            row[covariate_name] = covariate_value
-         else :
-            row[covariate_name] = 0.0
-            for tmp in [ 'female', 'male' ] :
-               spline              = spline_cov[node_name][tmp][covariate_name]
-               covariate_value     = spline(age_mid, time_mid)
-               row[covariate_name] += covariate_value / 2.0
-      #
-      # row
-      row['node']       = row['node_name']
-      row['integrand']  = row['integrand_name']
-      row['density']    = row['density_name']
-      for key in [ 'eta', 'nu' ] :
-         if key in row :
-            if row[key] != None :
-               row[key] = float( row[key] )
-      row['age_lower']  = age_lower
-      row['age_upper']  = age_upper
-      row['time_lower'] = time_lower
-      row['time_upper'] = time_upper
-      row['weight']     = ''
-      row['subgroup']   = 'world'
-      row['sex']        = at_cascade.csv.sex_name2value[sex]
-      row['one']        = '1.0'
+   # data_in_file, data_integrand_set, data_age_time
+   # The data_in.csv rows are added to the root database below.
+   data_in_file = f'{fit_dir}/data_in.csv'
+   (data_integrand_set, data_age_time) = data_in_summary(data_in_file)
    #
    # integrand_table
-   integrand_set = set()
-   for row in data_table :
-      integrand_set.add( row['integrand_name'] )
+   integrand_set = set( data_integrand_set )
    for row in input_table['predict_integrand'] :
       integrand_set.add( row['integrand_name'] )
    for rate_name in name_rate2integrand :
@@ -1512,16 +1810,9 @@ def create_root_database(fit_dir) :
       time_set.add( float( row['time'] ) )
    #
    # age_set, time_set
-   if len( data_table ) > 0 :
-      min_data_age  = data_table[0]['age_lower']
-      max_data_age  = data_table[0]['age_upper']
-      min_data_time = data_table[0]['time_lower']
-      max_data_time = data_table[0]['time_upper']
-      for row in data_table :
-         min_data_age  = min( min_data_age, row['age_lower'] )
-         max_data_age  = max( max_data_age, row['age_upper'] )
-         min_data_time = min( min_data_time, row['time_lower'] )
-         max_data_time = max( max_data_time, row['time_upper'] )
+   if data_age_time != None :
+      (min_data_age, max_data_age, min_data_time, max_data_time) = \
+         data_age_time
       age_set.add(min_data_age)
       age_set.add(max_data_age)
       time_set.add(min_data_time)
@@ -1632,23 +1923,6 @@ def create_root_database(fit_dir) :
       }
       rate_eff_cov_table.append(row)
    #
-   # data_table
-   sex_value2name = dict()
-   for name in at_cascade.csv.sex_name2value :
-      value = at_cascade.csv.sex_name2value[name]
-      sex_value2name[value] = name
-   if 'population' in covariate_list :
-      for row in data_table :
-         age_lower     = float( row['age_lower'] )
-         age_upper     = float( row['age_upper'] )
-         if age_lower != age_upper :
-            sex_name      = sex_value2name[ row['sex'] ]
-            triple        = ( row['node_name'], sex_name, 'population' )
-            fun           = weight_dict[triple]
-            index         = fun.index
-            weight_name   = f'weight_{index}'
-            row['weight'] = weight_name
-   #
    # smooth_dict
    smooth_dict = dict()
    for row in input_table['parent_rate'] :
@@ -1778,7 +2052,7 @@ def create_root_database(fit_dir) :
          weight_table        = weight_table,
          covariate_table     = dismod_at_covariate_table,
          avgint_table        = list(),
-         data_table          = data_table,
+         data_table          = list(),
          prior_table         = prior_table,
          smooth_table        = smooth_table,
          rate_table          = rate_table,
@@ -1787,6 +2061,19 @@ def create_root_database(fit_dir) :
          rate_eff_cov_table  = rate_eff_cov_table,
    )
    #
+   # root.db: data table
+   if 'population' in covariate_list :
+      population_weight_dict = weight_dict
+   else :
+      population_weight_dict = None
+   insert_data_in(
+      file_name           = data_in_file,
+      root_database       = output_file,
+      spline_cov          = spline_cov,
+      covariate_name_list = list( root_covariate_ref.keys() ),
+      weight_dict         = population_weight_dict,
+   )
+   #
    assert type(age_grid) == list
    assert type(time_grid) == list
    assert type(csv_covariate_table) == list
@@ -2018,6 +2305,10 @@ def create_all_node_database(
       n_covariate         = len(  root_node_table['covariate'] )
       n_split             = len( at_cascade.csv.split_reference_table )
       node_table          = root_node_table['node']
+      #
+      # cov_average_dict
+      cov_average_dict = at_cascade.csv.covariate_avg_all(csv_covariate_table)
+      #
       for node_id in range( len(node_table) ) :
          ancestor      = node_id
          while ancestor != root_node_id and ancestor != None :
@@ -2028,9 +2319,11 @@ def create_all_node_database(
                sex           = row['split_reference_name']
                sex_reference = row['split_reference_value']
                node_name     = node_table[node_id]['node_name']
-               cov_average = at_cascade.csv.covariate_avg(
-                  csv_covariate_table, node_name, sex
-               )
+               if (node_name, sex) not in cov_average_dict :
+                  msg  = f'node "{node_name}" does not appear with sex '
+                  msg += f'"{sex}" covariate_table.'
+                  assert False, msg
+               cov_average = cov_average_dict[ (node_name, sex) ]
                reference_list = list()
                for covariate_id in range( n_covariate ) :
                   row             =  root_node_table['covariate'][covariate_id]
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+import numpy
+import at_cascade
+"""
+{xrst_begin csv.read_column}
+
+Read Typed Columns from a CSV File
+##################################
+
+Prototype
+*********
+{xrst_literal ,
+   BEGIN_DEF, END_DEF
+   BEGIN_RETURN, END_RETURN
+}
+
+file_name
+*********
+is a ``str`` with the name of the CSV file.
+
+column_type
+***********
+is a ``dict`` that maps column names to their type; see
+:ref:`csv.read_column_chunk@column_type` .
+
+column
+******
+is a ``dict`` with the same keys as *column_type* .
+It is the same as the :ref:`csv.read_column_chunk@column`
+for a chunk that contains all the rows in the file.
+
+{xrst_end csv.read_column}
+"""
+# BEGIN_DEF
+# at_cascade.csv.read_column
+def read_column(file_name, column_type) :
+   assert type(file_name)   == str
+   assert type(column_type) == dict
+   # END_DEF
+   #
+   # chunk_list
+   chunk_list = list()
+   for column in at_cascade.csv.read_column_chunk(
+      file_name, column_type, chunk_size = 100000
+   ) :
+      chunk_list.append(column)
+   #
+   # column
+   column = dict()
+   for name in column_type :
+      if column_type[name] == str :
+         column[name] = list()
+         for chunk in chunk_list :
+            column[name] += chunk[name]
+      elif len(chunk_list) == 0 :
+         column[name] = numpy.empty(0, dtype = column_type[name] )
+      else :
+         column[name] = numpy.concatenate(
+            [ chunk[name] for chunk in chunk_list ]
+         )
+   #
+   # BEGIN_RETURN
+   # ...
+   assert type(column) == dict
+   return column
+   # END_RETURN
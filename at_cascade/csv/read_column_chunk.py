@@ -0,0 +1,161 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+import csv
+import numpy
+"""
+{xrst_begin csv.read_column_chunk}
+
+Read Typed Columns from a CSV File in Chunks
+############################################
+
+Prototype
+*********
+{xrst_literal ,
+   BEGIN_DEF, END_DEF
+}
+
+file_name
+*********
+is a ``str`` with the name of the CSV file.
+The first line of the file is the header line and the others contain
+the data; see :ref:`csv.read_table-name` .
+
+column_type
+***********
+is a ``dict`` that maps column names to their type.
+Each type is ``float`` , ``int`` , or ``str`` .
+Only the columns in *column_type* are returned,
+and each of them must be in the header line of the file.
+
+chunk_size
+**********
+is a positive ``int`` specifying the maximum number of rows in each chunk.
+
+Generator
+*********
+The return value of ``read_column_chunk`` is a generator and
+{xrst_code py}
+   for column in read_column_chunk(file_name, column_type, chunk_size) :
+{xrst_code}
+iterates over the chunks in the same order as the rows in the file.
+Only one chunk is in memory at a time (plus one line of the file).
+If the file has no data rows, there are no chunks.
+
+column
+******
+For each name in *column_type* , *column* [ *name* ] has one element
+for each row in the chunk:
+
+.. csv-table::
+   :header-rows: 1
+
+   type,    *column* [ *name* ],         empty entry
+   float,   ``numpy.ndarray`` of float,  ``nan``
+   int,     ``numpy.ndarray`` of int,    error
+   str,     ``list`` of ``str`` ,        ``None``
+
+The float and int values are the same as using ``float`` and ``int``
+on the corresponding ``str`` from :ref:`csv.read_table-name` .
+
+Speed and Memory
+****************
+The rows of the file are not stored as dictionaries and the numeric
+columns are stored as numpy arrays.
+For large files, this is much faster and uses much less memory than
+:ref:`csv.read_table-name` followed by converting the values in each row.
+
+Example
+*******
+:ref:`csv.read_column-name` is implemented using ``read_column_chunk`` .
+
+{xrst_end csv.read_column_chunk}
+"""
+# ----------------------------------------------------------------------------
+# column = convert_column(file_name, name, type_, value_list, line_number)
+# Converts the list of str value_list, that starts at line_number in the
+# file, to a column of the specified type.
+def convert_column(file_name, name, type_, value_list, line_number) :
+   if type_ == str :
+      if '' in value_list :
+         value_list = [ None if v == '' else v for v in value_list ]
+      return value_list
+   if type_ == float and '' in value_list :
+      value_list = [ 'nan' if v == '' else v for v in value_list ]
+   try :
+      column = numpy.fromiter(
+         map(type_, value_list), dtype = type_, count = len(value_list)
+      )
+   except ValueError :
+      for (index, value) in enumerate(value_list) :
+         try :
+            type_(value)
+         except ValueError :
+            line = line_number + index
+            msg  = f'{file_name}: line {line}: column {name}\n'
+            msg += f'Cannot convert "{value}" to {type_.__name__}'
+            assert False, msg
+      assert False
+   return column
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.csv.read_column_chunk
+def read_column_chunk(file_name, column_type, chunk_size) :
+   assert type(file_name)   == str
+   assert type(column_type) == dict
+   assert type(chunk_size)  == int and 0 < chunk_size
+   for type_ in column_type.values() :
+      assert type_ in [ float, int, str ]
+   # END_DEF
+   #
+   # reader, header
+   file_ptr = open(file_name)
+   reader   = csv.reader(file_ptr)
+   header   = next(reader)
+   #
+   # column_index
+   column_index = dict()
+   for name in column_type :
+      if name not in header :
+         msg  = f'The column name {name} does not appear in this file\n'
+         msg += f'{file_name}'
+         assert False, msg
+      column_index[name] = header.index(name)
+   #
+   # n_column
+   # number of columns a row must have to contain all the requested columns
+   n_column = max( column_index.values(), default = -1 ) + 1
+   #
+   # value_list, line_number
+   value_list  = { name : list() for name in column_type }
+   line_number = 2
+   n_row       = 0
+   for row in reader :
+      if len(row) < n_column :
+         msg  = f'{file_name}: line {reader.line_num}: '
+         msg += f'has {len(row)} columns and the header has {len(header)}'
+         assert False, msg
+      for name in column_type :
+         value_list[name].append( row[ column_index[name] ] )
+      n_row += 1
+      if n_row == chunk_size :
+         column = dict()
+         for name in column_type :
+            type_            = column_type[name]
+            column[name]     = convert_column(
+               file_name, name, type_, value_list[name], line_number
+            )
+            value_list[name] = list()
+         yield column
+         line_number += n_row
+         n_row        = 0
+   if n_row > 0 :
+      column = dict()
+      for name in column_type :
+         type_        = column_type[name]
+         column[name] = convert_column(
+            file_name, name, type_, value_list[name], line_number
+         )
+      yield column
+   file_ptr.close()
@@ -6,6 +6,7 @@ r'''
 {xrst_begin fit_one_job}
 {xrst_spell
   obj
+  rss
   var
 }
 
@@ -14,9 +15,9 @@ Run One Job
 
 Prototype
 *********
-{xrst_literal
-   # BEGIN_DEF
-   # END_DEF
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
 }
 
 Default Value
@@ -68,6 +69,16 @@ If this argument is not None, it is a ``io.TextIOBase`` object
 corresponding to a file that is opened for writing the tracing output
 for this job.
 
+job_deadline
+************
+If this argument is not None, it is the value of python's ``time.time()``
+when the time for this job runs out; see
+:ref:`option_all_table@job_timeout` .
+It is the same for all the fit types tried for a job; see
+:ref:`run_one_job@fit_type_list` .
+The dismod_at command that is running at this time is killed.
+If it is None, there is no limit on the time for this fit.
+
 fit_database
 ************
 The :ref:`glossary@fit_database` for this fit is
@@ -113,6 +124,17 @@ if the corresponding event occurs:
    at_cascade,   fit: OK,        the maximum likelihood problem was solved
    at_cascade,   sample: OK,     the posterior samples were computed
    at_cascade,   children: OK,   the child databases with priors were created
+   at_cascade,   timeout: ...,   a dismod_at command was killed (see below)
+
+If a dismod_at command is killed because of the
+:ref:`option_all_table@command_timeout` option or the
+:ref:`fit_one_job@job_deadline` ,
+the message is ``timeout:`` *command* ``after`` *seconds* ``seconds``
+where *command* is the dismod_at command; e.g., ``fit`` ,
+and *seconds* is the time limit for the command.
+If the job deadline has passed before a dismod_at command is started,
+the command is not run and the message is
+``timeout: job_timeout exceeded before`` *command* .
 
 Note that the events depend on each other in the following way:
 
@@ -121,11 +143,70 @@ Note that the events depend on each other in the following way:
 #. If fit: OK is present, then no data: abort is **not** present.
 
 
+stage_metrics
+*************
+If the :ref:`option_all_table@stage_metrics` option is true,
+the resources used by each stage of this job are recorded in the
+stage_metrics table in the database
+
+|  *result_dir* ``/stage_metrics.db``
+
+where *result_dir* is specified in the option all table.
+This table is created by :ref:`fit_parallel-name` and a row is added
+as soon as each stage completes; i.e.,
+the stages for a fit that fails are also recorded.
+It has the following columns:
+
+.. csv-table::
+   :header-rows: 1
+
+   Column,           Meaning
+   stage_metrics_id, primary key for this table
+   job_name,         :ref:`create_job_table@job_table@job_name` for this job
+   fit_type,         :ref:`fit_one_job@fit_type` for this fit
+   stage,            name of the stage (see below)
+   command,          the dismod_at command for this stage (null for python)
+   wall_time,        elapsed time in seconds
+   user_time,        user cpu time in seconds
+   system_time,      system cpu time in seconds
+   max_rss,          peak resident set size in megabytes
+   n_data,           number of data rows included in the fit
+   n_var,            number of model variables
+   unix_time,        seconds since the epoch when the stage completed
+
+#. The stages are ``setup`` (reading the input tables),
+   ``data_include`` , ``perturb`` , ``avgint_parent_grid`` ,
+   ``create_shift_db`` , and the dismod_at commands;
+   e.g. ``init`` , ``hold_out`` , ``fit`` , ``sample`` , ``predict`` .
+#. For the dismod_at commands, the cpu times and max_rss are for the
+   command; see :ref:`system_command@usage` .
+   For the other stages, the cpu times include this process
+   and any commands that completed during the stage,
+   and max_rss is the peak for this process so far.
+#. The cpu times and max_rss are null if they are not available
+   on this system.
+#. The values n_data and n_var are null for the stages that
+   complete before they are determined.
+#. If a row cannot be written; e.g., the database is locked for more than
+   a minute, a warning that starts with ``warning: stage_metrics:``
+   is printed and the job continues.
+   Hence the stage metrics never cause a fit to fail.
+
+peak_rss
+********
+The return value *peak_rss* is the maximum, over the dismod_at commands
+run by this job, of the resident set size in megabytes; see
+:ref:`system_command@usage` .
+If this is not available on this system, *peak_rss* is None.
+
 Exception
 *********
 If there is no data from this fit, this routine will raise an exception
 with a message that starts with: ``no data: abort`` ; i.e., the same
 as the message it puts in the log.
+If a dismod_at command is killed because it took too long,
+this routine will raise an exception with a message that starts with
+``timeout:`` ; i.e., the same as the message it puts in the log.
 
 
 {xrst_end fit_one_job}
@@ -133,32 +214,129 @@ as the message it puts in the log.
 # ----------------------------------------------------------------------------
 import io
 import os
+import sys
 import time
 import inspect
+import sqlite3
 import dismod_at
 import at_cascade
+try :
+   import resource
+except ImportError :
+   resource = None
 # -----------------------------------------------------------------------------
-def system_command(command, file_stdout) :
-   if file_stdout is None :
-      dismod_at.system_command_prc(
-         command,
-         print_command = True,
-         return_stdout = False,
-         return_stderr = False,
-         file_stdout   = None,
-         file_stderr   = None,
-         write_command = False,
-      )
-   else :
-      dismod_at.system_command_prc(
-         command,
-         print_command = False,
-         return_stdout = False,
-         return_stderr = False,
-         file_stdout   = file_stdout,
-         file_stderr   = None,
-         write_command = True,
-      )
+# record_stage(metrics, stage, command, usage)
+# write one row to the stage_metrics table in metrics['database'].
+# A failure to write the row is reported, but it does not stop the job.
+def record_stage(metrics, stage, command, usage) :
+   if metrics['database'] is None :
+      return
+   value_tuple = (
+      metrics['job_name'],
+      metrics['fit_type'],
+      stage,
+      command,
+      usage['wall_time'],
+      usage['user_time'],
+      usage['system_time'],
+      usage['max_rss'],
+      metrics['n_data'],
+      metrics['n_var'],
+      time.time(),
+   )
+   command_insert  = 'INSERT INTO stage_metrics VALUES (null, '
+   command_insert += ', '.join( len(value_tuple) * [ '?' ] ) + ')'
+   try :
+      connection = sqlite3.connect(metrics['database'], timeout = 60.0)
+      try :
+         with connection :
+            connection.execute(command_insert, value_tuple)
+      finally :
+         connection.close()
+   except sqlite3.Error as error :
+      job_name = metrics['job_name']
+      msg  = f'warning: stage_metrics: job_name = {job_name}, '
+      msg += f'stage = {stage}: {error}'
+      print(msg)
+# -----------------------------------------------------------------------------
+# log_timeout(metrics, msg)
+# add msg to the log table in metrics['fit_database'] and raise an exception.
+def log_timeout(metrics, msg) :
+   connection = dismod_at.create_connection(
+      metrics['fit_database'], new = False, readonly = False
+   )
+   at_cascade.add_log_entry(connection, msg)
+   connection.close()
+   raise Exception( msg + ' ' + metrics['job_name'] )
+# -----------------------------------------------------------------------------
+# run command, record its resource usage, and update metrics['peak_rss'].
+# If the command takes too long, or the job has no time left,
+# log the timeout and raise an exception.
+def system_command(command, file_stdout, metrics) :
+   #
+   # timeout
+   timeout = metrics['command_timeout']
+   if metrics['deadline'] is not None :
+      remaining = max(0.0, metrics['deadline'] - time.time() )
+      if remaining == 0.0 :
+         msg = f'timeout: job_timeout exceeded before {command[2]}'
+         log_timeout(metrics, msg)
+      if timeout is None or remaining < timeout :
+         timeout = remaining
+   #
+   # usage
+   try :
+      usage = at_cascade.system_command(command, file_stdout, timeout)
+   except AssertionError as e :
+      if not str(e).startswith('system_command timeout:') :
+         raise
+      msg = f'timeout: {command[2]} after {timeout:.1f} seconds'
+      log_timeout(metrics, msg)
+   #
+   record_stage(metrics, command[2], ' '.join(command), usage)
+   if usage['max_rss'] is not None :
+      if metrics['peak_rss'] is None :
+         metrics['peak_rss'] = usage['max_rss']
+      else :
+         metrics['peak_rss'] = max(metrics['peak_rss'], usage['max_rss'])
+# -----------------------------------------------------------------------------
+# begin = begin_stage()
+# wall time and resource usage at the beginning of a python stage
+def begin_stage() :
+   begin = { 'wall_time' : time.time(), 'self' : None, 'children' : None }
+   if resource is not None :
+      begin['self']     = resource.getrusage(resource.RUSAGE_SELF)
+      begin['children'] = resource.getrusage(resource.RUSAGE_CHILDREN)
+   return begin
+# -----------------------------------------------------------------------------
+# end_stage(metrics, stage, begin)
+# record the resources used by a python stage. The cpu times include
+# the child processes that completed during the stage. The max_rss is the
+# peak for this process so far.
+def end_stage(metrics, stage, begin) :
+   usage = {
+      'wall_time'   : time.time() - begin['wall_time'],
+      'user_time'   : None,
+      'system_time' : None,
+      'max_rss'     : None,
+   }
+   if resource is not None :
+      self_end     = resource.getrusage(resource.RUSAGE_SELF)
+      children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+      usage['user_time'] = \
+         self_end.ru_utime - begin['self'].ru_utime + \
+         children_end.ru_utime - begin['children'].ru_utime
+      usage['system_time'] = \
+         self_end.ru_stime - begin['self'].ru_stime + \
+         children_end.ru_stime - begin['children'].ru_stime
+      #
+      # max_rss
+      # ru_maxrss is in bytes on darwin and in kilobytes otherwise
+      if sys.platform == 'darwin' :
+         usage['max_rss'] = self_end.ru_maxrss / (1024.0 * 1024.0)
+      else :
+         usage['max_rss'] = self_end.ru_maxrss / 1024.0
+   record_stage(metrics, stage, None, usage)
 # ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.fit_one_job
@@ -171,6 +349,7 @@ def fit_one_job(
    fit_type                ,
    first_fit               ,
    trace_file_obj   = None ,
+   job_deadline     = None ,
 ) :
    assert type(job_table) == list
    assert type(run_job_id) == int
@@ -181,6 +360,8 @@ def fit_one_job(
    assert type(first_fit) == bool
    if trace_file_obj is not None :
       assert isinstance(trace_file_obj, io.TextIOBase)
+   if job_deadline is not None :
+      assert type(job_deadline) == float
    # END_DEF
    #
    # trace_line_number
@@ -197,6 +378,23 @@ def fit_one_job(
    # file_stdout
    file_stdout = trace_file_obj
    #
+   # begin
+   begin = begin_stage()
+   #
+   # metrics
+   # The database is set below (when option_all_dict is known).
+   metrics = {
+      'database'        : None,
+      'fit_database'    : None,
+      'job_name'        : job_table[run_job_id]['job_name'],
+      'fit_type'        : fit_type,
+      'n_data'          : None,
+      'n_var'           : None,
+      'peak_rss'        : None,
+      'command_timeout' : None,
+      'deadline'        : job_deadline,
+   }
+   #
    # fit_node_id
    fit_node_id = job_table[run_job_id]['fit_node_id']
    #
@@ -209,19 +407,17 @@ def fit_one_job(
    # end_child_job_id
    end_child_job_id = job_table[run_job_id]['end_child_job_id']
    #
+   # context
+   context = at_cascade.cascade_context(all_node_database)
+   #
    # all_table
-   connection  = dismod_at.create_connection(
-      all_node_database, new = False, readonly = True
-   )
    all_table = dict()
    for tbl_name in [
       'option_all',
       'split_reference',
-      'node_split',
       'mulcov_freeze',
    ] :
-      all_table[tbl_name] = dismod_at.get_table_dict(connection, tbl_name)
-   connection.close()
+      all_table[tbl_name] = context.get_table(tbl_name)
    #
    # double_max_fit
    double_max_fit = False
@@ -254,9 +450,24 @@ def fit_one_job(
    else :
       refit_split = False
    #
+   # metrics: command_timeout
+   if 'command_timeout' in option_all_dict :
+      timeout = float( option_all_dict['command_timeout'] )
+      if timeout <= 0.0 :
+         msg = 'option_all table: command_timeout is not greater than zero'
+         assert False, msg
+      metrics['command_timeout'] = timeout
+   #
    # result_dir
    result_dir = option_all_dict['result_dir']
    #
+   # metrics: database
+   if 'stage_metrics' in option_all_dict :
+      stage_metrics = option_all_dict['stage_metrics']
+      assert stage_metrics in [ 'true', 'false' ]
+      if stage_metrics == 'true' :
+         metrics['database'] = f'{result_dir}/stage_metrics.db'
+   #
    # root_node_id
    name         = option_all_dict['root_node_name']
    root_node_id = at_cascade.table_name2id(node_table, 'node', name)
@@ -297,9 +508,7 @@ def fit_one_job(
          assert False, msg
    #
    # node_split_set
-   node_split_set = set()
-   for row in all_table['node_split'] :
-      node_split_set.add( row['node_id'] )
+   node_split_set = context.node_split_set
    #
    # fit_database
    database_dir = at_cascade.get_database_dir(
@@ -312,6 +521,7 @@ def fit_one_job(
       fit_split_reference_id  = fit_split_reference_id,
    )
    fit_database      = f'{result_dir}/{database_dir}/dismod.db'
+   metrics['fit_database'] = fit_database
    #
    # check fit_database
    parent_node_name = at_cascade.get_parent_node(fit_database)
@@ -326,13 +536,7 @@ def fit_one_job(
    fit_or_root.close()
    #
    # dismod_at_version
-   dismod_at_version = dismod_at.system_command_prc(
-      command       = [ 'dismod_at', '--version' ] ,
-      print_command = False,
-      return_stdout = True,
-      return_stderr = False,
-   )
-   dismod_at_version = dismod_at_version.strip()
+   dismod_at_version = context.dismod_at_version()
    #
    # at_cascade_version
    at_cascade_version = 'at_cascade-' + at_cascade.version
@@ -347,9 +551,21 @@ def fit_one_job(
    at_cascade.add_log_entry(connection, at_cascade_version)
    connection.close()
    #
+   # setup
+   end_stage(metrics, 'setup', begin)
+   #
    # init
    command = [ 'dismod_at', fit_database, 'init' ]
-   system_command(command, file_stdout)
+   system_command(command, file_stdout, metrics)
+   #
+   # n_var
+   if metrics['database'] is not None :
+      connection = dismod_at.create_connection(
+         fit_database, new = False, readonly = True
+      )
+      command          = 'SELECT COUNT(*) FROM var'
+      metrics['n_var'] = dismod_at.sql_command(connection, command)[0][0]
+      connection.close()
    #
    # max_fit
    if 'max_fit' in option_all_dict :
@@ -366,7 +582,7 @@ def fit_one_job(
             command += [ max_fit_parent ]
          if balance_fit is not None :
             command += balance_fit
-         system_command(command, file_stdout)
+         system_command(command, file_stdout, metrics)
    #
    # max_abs_effect
    if 'max_abs_effect' in option_all_dict:
@@ -374,7 +590,7 @@ def fit_one_job(
       command =[
          'dismod_at', fit_database, 'bnd_mulcov', max_abs_effect
       ]
-      system_command(command, file_stdout)
+      system_command(command, file_stdout, metrics)
    #
    # perturb_optimization
    perturb_optimization = dict()
@@ -391,17 +607,23 @@ def fit_one_job(
             perturb_optimization[key] = sigma
    #
    # fit_database: scale_var and start_var tables
+   begin = begin_stage()
    for key in perturb_optimization :
       sigma    = perturb_optimization[key]
       tbl_name = f'{key}_var'
       dismod_at.perturb_command( fit_database, tbl_name, sigma )
+   if len( perturb_optimization ) > 0 :
+      end_stage(metrics, 'perturb', begin)
    #
    # fit_node_datase.log_table
    # if fit has no data, abort with 'fit: error: no data abort' in log_table
    # ( unless this fit has no ancestors; i.e., run_job_id == 0 ).
+   begin              = begin_stage()
    data_include_table = at_cascade.data_include(
       fit_database, root_database
    )
+   metrics['n_data']  = len( data_include_table )
+   end_stage(metrics, 'data_include', begin)
    if len( data_include_table )  == 0 and run_job_id > 0:
       msg        = 'no data: abort'
       connection = dismod_at.create_connection(
@@ -416,7 +638,7 @@ def fit_one_job(
    #
    # fit
    command = [ 'dismod_at', fit_database, 'fit', fit_type ]
-   system_command(command, file_stdout)
+   system_command(command, file_stdout, metrics)
    #
    # fit_database.log_table
    connection = dismod_at.create_connection(
@@ -441,11 +663,11 @@ def fit_one_job(
       command = [
          'dismod_at', fit_database, 'set', 'truth_var', 'fit_var'
       ]
-      system_command(command, file_stdout)
+      system_command(command, file_stdout, metrics)
       command = [
          'dismod_at', fit_database, 'simulate', number_simulate
       ]
-      system_command(command, file_stdout)
+      system_command(command, file_stdout, metrics)
    command = [
       'dismod_at',
       fit_database,
@@ -454,7 +676,7 @@ def fit_one_job(
       fit_type,
       number_simulate
    ]
-   system_command(command, file_stdout)
+   system_command(command, file_stdout, metrics)
    #
    # fit_database.log_table
    connection = dismod_at.create_connection(
@@ -465,12 +687,14 @@ def fit_one_job(
    connection.close()
    #
    # avgint_parent_grid
+   begin = begin_stage()
    at_cascade.avgint_parent_grid(
       all_node_database = all_node_database ,
       fit_database      = fit_database ,
       job_table         = job_table         ,
       fit_job_id        = run_job_id        ,
    )
+   end_stage(metrics, 'avgint_parent_grid', begin)
    #
    # connection
    connection = dismod_at.create_connection(
@@ -479,12 +703,12 @@ def fit_one_job(
    #
    # c_shift_predict_fit_var
    command = [ 'dismod_at', fit_database, 'predict', 'fit_var' ]
-   system_command(command, file_stdout)
+   system_command(command, file_stdout, metrics)
    at_cascade.move_table(connection, 'predict', 'c_shift_predict_fit_var')
    #
    # c_shift_predict_sample
    command = [ 'dismod_at', fit_database, 'predict', 'sample' ]
-   system_command(command, file_stdout)
+   system_command(command, file_stdout, metrics)
    at_cascade.move_table(connection, 'predict', 'c_shift_predict_sample')
    #
    # c_shift_avgint
@@ -538,6 +762,7 @@ def fit_one_job(
       shift_databases[shift_name] = shift_node_database
    #
    # create shifted databases
+   begin = begin_stage()
    at_cascade.create_shift_db(
       all_node_database = all_node_database,
       fit_database      = fit_database,
@@ -545,6 +770,7 @@ def fit_one_job(
       no_ode_fit        = False,
       job_table         = job_table,
    )
+   end_stage(metrics, 'create_shift_db', begin)
    #
    # empty_avgint_table
    connection = dismod_at.create_connection(
@@ -563,3 +789,11 @@ def fit_one_job(
    connection.close()
    #
    # trace_line_number( inspect.currentframe().f_lineno )
+   #
+   # peak_rss
+   peak_rss = metrics['peak_rss']
+   #
+   # BEGIN_RETURN
+   assert peak_rss is None or type(peak_rss) == float
+   return peak_rss
+   # END_RETURN
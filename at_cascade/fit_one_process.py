@@ -2,9 +2,6 @@
 # SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
 # SPDX-FileContributor: 2021-24 Bradley M. Bell
 # ----------------------------------------------------------------------------
-# Set this to False when debugging an exception during fit_one_job routine
-catch_exceptions_and_continue = True
-# ----------------------------------------------------------------------------
 '''
 {xrst_begin fit_one_process}
 {xrst_spell
@@ -114,16 +111,107 @@ shared_event
 is multiprocessing event,  used by all the fit processes,
 that is used to signal that the shared memory has changed.
 
+worker_pool
+***********
+If this is false, or *max_number_cpu* is one,
+a new process is spawned for each ready job that can be run in parallel
+(as long as the number of processes is less than *max_number_cpu* ).
+Otherwise, *master_process* must be true and a pool of
+*max_number_cpu* worker processes is started once.
+Each worker pulls job ids from a queue and fits the corresponding jobs
+until there are no more jobs.
+This avoids starting a new python process for each job.
+In this case the master process does not fit any jobs,
+it just passes the ready jobs to the workers; i.e.,
+there are *max_number_cpu* processes fitting jobs plus the master process.
+(If *worker_pool* is false, the master process is one of the
+*max_number_cpu* processes.)
+Each worker puts the job id in a completion queue when it finishes a job.
+The master waits on this queue, so it wakes up as soon as a job completes,
+and it keeps an incrementally updated set of the ready jobs
+(instead of scanning the status of all the jobs).
+The job status values, and the ``trace.out`` files, are the same
+for both cases.
+
+priority
+********
+If this is None, the jobs that are ready are run in job_id order.
+Otherwise, it is a numpy array with length equal to the length of
+*job_table* ; see :ref:`job_priority@priority` .
+In this case, the jobs that are ready are run in order of
+decreasing priority (ties are broken using job_id order).
+
+subtree
+*******
+If this is None, it is computed using *job_table* .
+Otherwise, it is the value returned by
+:ref:`job_subtree-name` for this *job_table* .
+It is used to find the descendants of a job that fails,
+so that they can be aborted without searching the job table.
+
+memory_budget
+*************
+If this is None, the only limit on the number of jobs that run at the
+same time is *max_number_cpu* .
+Otherwise, it is a ``dict`` with the following keys:
+
+.. csv-table::
+   :header-rows: 1
+
+   Key,                  Meaning
+   max_memory,           memory budget in megabytes for all the running jobs
+   job_size,             numpy array with the size of each job
+   shared_peak_rss_name, name of the shared peak memory array
+   peak_rss_file,        csv file where the observed peak memory is recorded
+
+A job is not started if the estimated memory for it, plus the
+estimated memory for the running jobs, is greater than *max_memory*
+(unless no other job is running).
+The shared peak memory array has the same type as the shared job status
+array and contains the observed peak memory for each job in kilobytes,
+or -1 if it has not been observed.
+When a job completes, its peak memory (see :ref:`fit_one_job@peak_rss` )
+is stored in this array and appended to the *peak_rss_file* .
+The memory for a job that has not been observed is estimated as
+*base* + *slope* * *job_size* where
+*base* is the smallest observed peak memory
+(the memory a job uses no matter what its size is) and
+*slope* is the largest ratio of observed peak memory, minus *base* ,
+to job size.
+This estimate is not more than the largest observed peak memory;
+i.e., a job is not expected to use more memory than the ancestor jobs
+that have already run.
+A ready job that does not fit in the budget is skipped and the
+following ready jobs are considered, so small jobs are not blocked
+by a large one.
+The ready jobs are only considered until the memory that is left is
+less than *base* (the smallest possible estimate).
+When *worker_pool* is true, the ready jobs are kept in a heap and
+only the jobs that are considered are removed from it.
+Until there is an observed peak memory, only one job is run at a time.
+
+job_queue_database
+******************
+If this is not None, it is a job queue database created by
+:ref:`create_job_queue-name` for this *job_table* .
+It is used as a journal; i.e.,
+each time a job starts, completes, or fails,
+its status is recorded in this database using
+:ref:`set_job_queue_status-name` .
+It is not used to decide which jobs to run.
+
 {xrst_end fit_one_process}
 '''
 # ----------------------------------------------------------------------------
+import csv
 import sys
+import heapq
+import queue
 import datetime
 import multiprocessing
 from multiprocessing import shared_memory
 import numpy
 import at_cascade
-import dismod_at
 # ----------------------------------------------------------------------------
 # acquire lock
 def acquire_lock(shared_lock) :
@@ -136,58 +224,6 @@ def acquire_lock(shared_lock) :
       msg = f'pre_one_process: did not obtain lock in {seconds} seconds'
       sys.exit(msg)
 # ----------------------------------------------------------------------------
-def get_result_database_dir(
-   all_node_database, node_table, fit_node_id, fit_split_reference_id
-) :
-   #
-   # option_all, node_split_table, split_reference_table
-   connection       = dismod_at.create_connection(
-      all_node_database, new = False, readonly = True
-   )
-   option_all_table = dismod_at.get_table_dict(connection, 'option_all')
-   node_split_table = dismod_at.get_table_dict(connection, 'node_split')
-   split_reference_table = \
-      dismod_at.get_table_dict(connection, 'split_reference')
-   connection.close()
-   #
-   # result_dir, root_node_name
-   result_dir              = None
-   root_node_id            = None
-   root_split_reference_id = None
-   for row in option_all_table :
-      if row['option_name'] == 'result_dir' :
-         result_dir = row['option_value']
-      if row['option_name'] == 'root_node_name' :
-         root_node_name = row['option_value']
-         root_node_id   = \
-            at_cascade.table_name2id(node_table, 'node', root_node_name)
-      if row['option_name'] == 'root_split_reference_name' :
-         root_split_reference_name = row['option_value']
-         root_split_reference_id = at_cascade.table_name2id(
-            split_reference_table,
-            'split_reference',
-            root_split_reference_name
-         )
-   assert result_dir is not None
-   assert root_node_id is not None
-   #
-   # node_split_set
-   node_split_set = set()
-   for row in node_split_table :
-      node_split_set.add( row['node_id'] )
-   #
-   database_dir = at_cascade.get_database_dir(
-      node_table              = node_table,
-      split_reference_table   = split_reference_table,
-      node_split_set          = node_split_set,
-      root_node_id            = root_node_id,
-      root_split_reference_id = root_split_reference_id,
-      fit_node_id             = fit_node_id,
-      fit_split_reference_id  = fit_split_reference_id,
-   )
-   return f'{result_dir}/{database_dir}'
-# )
-# ----------------------------------------------------------------------------
 def try_one_job(
    job_table,
    this_job_id,
@@ -202,6 +238,10 @@ def try_one_job(
    shared_event,
    shared_job_status,
    job_status_name,
+   subtree,
+   memory_budget,
+   shared_peak_rss,
+   job_queue_database,
 )  :
    assert type(job_table) == list
    assert type(this_job_id) == int
@@ -222,83 +262,25 @@ def try_one_job(
    job_status_error = job_status_name.index( 'error' )
    job_status_abort = job_status_name.index( 'abort' )
    #
-   # database_dir
-   row = job_table[this_job_id]
-   fit_node_id            = row['fit_node_id']
-   fit_split_reference_id = row['split_reference_id']
-   result_database_dir = get_result_database_dir(
-      all_node_database,
-      node_table,
-      fit_node_id,
-      fit_split_reference_id
-   )
-   #
    # job_name
    job_name = job_table[this_job_id]['job_name']
    #
-   # prior_only
-   assert not job_table[this_job_id]['prior_only']
+   # job_queue_database
+   if job_queue_database is not None :
+      at_cascade.set_job_queue_status(job_queue_database, this_job_id, 'run')
    #
-   # trace_file_obj
-   trace_file_obj = None
-   if max_number_cpu > 1 :
-      trace_file_name = f'{result_database_dir}/trace.out'
-      trace_file_obj  = open(trace_file_name, 'w')
-   #
-   # job_done, fit_type_index, fit_type, have_data
-   job_done       = False
-   have_data      = True
-   fit_type_index = 0
-   while have_data and (not job_done) and (fit_type_index< len(fit_type_list)) :
-      fit_type        = fit_type_list[fit_type_index]
-      fit_type_index += 1
-      #
-      # print message at start of this fit
-      now             = datetime.datetime.now()
-      current_time    = now.strftime("%H:%M:%S")
-      print( f'Begin: {current_time}: fit {fit_type:<5} {job_name}' )
-      #
-      # fit_one_job
-      # the lock should not be aquired during this operation
-      if not catch_exceptions_and_continue :
-         at_cascade.fit_one_job(
-            job_table         = job_table,
-            run_job_id        = this_job_id ,
-            all_node_database = all_node_database,
-            node_table        = node_table,
-            fit_integrand     = fit_integrand,
-            fit_type          = fit_type,
-            first_fit         = fit_type_index == 1,
-            trace_file_obj    = trace_file_obj,
-         )
-         #
-         # job_done
-         job_done = True
-      else :
-         try :
-            at_cascade.fit_one_job(
-               job_table         = job_table,
-               run_job_id        = this_job_id ,
-               all_node_database = all_node_database,
-               node_table        = node_table,
-               fit_integrand     = fit_integrand,
-               fit_type          = fit_type,
-               first_fit         = fit_type_index == 1,
-               trace_file_obj    = trace_file_obj,
-            )
-            #
-            # job_done
-            job_done = True
-         except Exception as e:
-            job_done = False
-            msg      = str(e)
-            if msg.startswith( 'no data: abort' ) :
-               have_data = False
-            print( f'fit {fit_type} {job_name} message: ' + msg )
-   #
-   # trace_file_obj
-   if trace_file_obj != None :
-      trace_file_obj.close()
+   # job_done, fit_type, peak_rss
+   # the lock should not be aquired during this operation
+   trace = max_number_cpu > 1
+   (job_done, fit_type, peak_rss) = at_cascade.run_one_job(
+      job_table         = job_table,
+      run_job_id        = this_job_id,
+      all_node_database = all_node_database,
+      node_table        = node_table,
+      fit_integrand     = fit_integrand,
+      fit_type_list     = fit_type_list,
+      trace             = trace,
+   )
    #
    if job_done :
       #
@@ -309,6 +291,15 @@ def try_one_job(
       assert shared_job_status[this_job_id] == job_status_run
       shared_job_status[this_job_id] = job_status_done
       #
+      # shared_peak_rss, peak_rss_file
+      if memory_budget is not None and peak_rss is not None :
+         shared_peak_rss[this_job_id] = int( 1024.0 * peak_rss )
+         job_size      = float( memory_budget['job_size'][this_job_id] )
+         peak_rss_file = memory_budget['peak_rss_file']
+         with open(peak_rss_file, 'a') as file_obj :
+            writer = csv.writer(file_obj)
+            writer.writerow( [ job_name, job_size, peak_rss ] )
+      #
       # shared_job_status[child_job_id]
       start_child_job_id    = job_table[this_job_id ]['start_child_job_id']
       end_child_job_id      = job_table[this_job_id ]['end_child_job_id']
@@ -329,14 +320,12 @@ def try_one_job(
    else :
       # if job not ok
       #
-      # descendant_set
-      descendant_set = { this_job_id }
-      n_job          = len(job_table)
-      for job_id in range(this_job_id + 1, n_job) :
-         parent_job_id = job_table[job_id]['parent_job_id']
-         if parent_job_id in descendant_set :
-            descendant_set.add( job_id )
-      descendant_set.remove( this_job_id )
+      # descendant
+      # job_id for all the descendants of this job
+      (subtree_order, subtree_begin, subtree_end) = subtree
+      begin      = subtree_begin[this_job_id] + 1
+      end        = subtree_end[this_job_id]
+      descendant = subtree_order[begin : end]
       #
       # shared_lock
       acquire_lock(shared_lock)
@@ -348,14 +337,19 @@ def try_one_job(
          print(msg)
       shared_job_status[this_job_id] = job_status_error
       #
-      # shared_job_status[descendant_set]
-      for job_id in descendant_set :
-         if shared_job_status[job_id] != job_status_skip :
-            if shared_job_status[job_id] != job_status_wait :
-               msg  = 'try_one_job: except: shared_job_status[job_id] = '
-               msg += job_status_name[ shared_job_status[job_id] ]
-               print(msg)
-            shared_job_status[job_id] = job_status_abort
+      # descendant_status
+      descendant_status = shared_job_status[descendant]
+      #
+      # check descendant_status
+      not_skip = descendant_status != job_status_skip
+      not_wait = descendant_status != job_status_wait
+      for status in descendant_status[ not_skip & not_wait ] :
+         msg  = 'try_one_job: except: shared_job_status[job_id] = '
+         msg += job_status_name[status]
+         print(msg)
+      #
+      # shared_job_status[descendant]
+      shared_job_status[ descendant[not_skip] ] = job_status_abort
       #
       # release
       # shared memory has changed
@@ -365,6 +359,16 @@ def try_one_job(
       # ok
       job_done = False
    #
+   # job_queue_database
+   if job_queue_database is not None :
+      if job_done :
+         job_status = 'done'
+      else :
+         job_status = 'error'
+      at_cascade.set_job_queue_status(
+         job_queue_database, this_job_id, job_status
+      )
+   #
    if max_number_cpu > 1 :
       #
       # print message at end
@@ -389,6 +393,453 @@ def try_one_job(
       #
    return
 # ----------------------------------------------------------------------------
+# (shm, shared_array) = get_shared_array(shared_name, length)
+def get_shared_array(shared_name, length) :
+   assert type(shared_name) == str
+   assert type(length) == int
+   #
+   tmp    = numpy.empty(length, dtype = int )
+   mapped = at_cascade.map_shared( shared_name )
+   shm    = multiprocessing.shared_memory.SharedMemory(
+      create = False, size = tmp.nbytes, name = mapped
+   )
+   shared_array = numpy.ndarray(
+      tmp.shape, dtype = tmp.dtype, buffer = shm.buf
+   )
+   return (shm, shared_array)
+# ----------------------------------------------------------------------------
+# job_id_ready = sort_ready(job_id_ready, priority)
+def sort_ready(job_id_ready, priority) :
+   if priority is None :
+      return job_id_ready
+   order = numpy.argsort( - priority[job_id_ready], kind = 'stable' )
+   return job_id_ready[order]
+# ----------------------------------------------------------------------------
+# model = memory_model(memory_budget, shared_peak_rss)
+# The model for the peak memory, in megabytes, of a job that has not been
+# observed is min(top, base + slope * job_size) where base is the smallest
+# observed peak, slope is the largest observed ratio of peak memory minus
+# base to job size, and top is the largest observed peak.
+# The return value is the tuple (base, slope, top), or None if there are
+# no observed peak memory values.
+def memory_model(memory_budget, shared_peak_rss) :
+   #
+   # observed
+   observed = shared_peak_rss >= 0
+   if not numpy.any(observed) :
+      return None
+   #
+   # base, slope, top
+   job_size = memory_budget['job_size']
+   peak     = shared_peak_rss[observed] / 1024.0
+   base     = float( numpy.min( peak ) )
+   slope    = float( numpy.max( (peak - base) / job_size[observed] ) )
+   top      = float( numpy.max( peak ) )
+   return (base, slope, top)
+# ----------------------------------------------------------------------------
+# job_memory = estimate_memory(
+#  job_id_array, memory_budget, shared_peak_rss, model = None
+# )
+# Estimate of the peak memory, in megabytes, for the jobs in job_id_array.
+# A job that has an observed peak memory uses that value. Otherwise, the
+# estimate is given by model; see memory_model. If model is None, it is
+# computed using memory_model.
+# The return value is None if there are no observed peak memory values.
+def estimate_memory(
+   job_id_array, memory_budget, shared_peak_rss, model = None
+) :
+   #
+   # base, slope, top
+   if model is None :
+      model = memory_model(memory_budget, shared_peak_rss)
+   if model is None :
+      return None
+   (base, slope, top) = model
+   #
+   # job_memory
+   job_size   = memory_budget['job_size']
+   job_memory = numpy.minimum( top, base + slope * job_size[job_id_array] )
+   known      = shared_peak_rss[job_id_array] >= 0
+   job_memory[known] = shared_peak_rss[job_id_array][known] / 1024.0
+   return job_memory
+# ----------------------------------------------------------------------------
+# job_id_admit = admit_jobs(
+#  job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+# )
+# Jobs in job_id_ready (in order) that can be started now. This is at most
+# n_slot jobs and, if memory_budget is not None, the estimated memory for the
+# running and admitted jobs must be less than or equal the budget.
+# A job that does not fit is skipped and the following jobs are considered
+# until the memory left is less than the smallest possible estimate.
+# If no jobs are running, at least one job is admitted.
+def admit_jobs(
+   job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+) :
+   #
+   # n_slot
+   n_slot = max(n_slot, 0)
+   if memory_budget is None or job_id_ready.size == 0 :
+      return job_id_ready[: n_slot]
+   #
+   # model, ready_memory
+   model        = memory_model(memory_budget, shared_peak_rss)
+   ready_memory = estimate_memory(
+      job_id_ready, memory_budget, shared_peak_rss, model
+   )
+   if ready_memory is None :
+      # no observed peak memory values, run one job at a time
+      if job_id_run.size == 0 :
+         return job_id_ready[: min(n_slot, 1) ]
+      return job_id_ready[: 0]
+   #
+   # memory_inuse
+   run_memory   = estimate_memory(
+      job_id_run, memory_budget, shared_peak_rss, model
+   )
+   memory_inuse = float( numpy.sum(run_memory) )
+   #
+   # job_id_admit
+   # no estimate is less than base
+   base         = model[0]
+   max_memory   = memory_budget['max_memory']
+   job_id_admit = list()
+   for (job_id, memory) in zip(job_id_ready, ready_memory) :
+      if len(job_id_admit) == n_slot :
+         break
+      running = job_id_run.size + len(job_id_admit) > 0
+      if running and max_memory < memory_inuse + base :
+         break
+      if not ( running and max_memory < memory_inuse + memory ) :
+         memory_inuse += memory
+         job_id_admit.append( job_id )
+   return numpy.array(job_id_admit, dtype = int)
+# ----------------------------------------------------------------------------
+# dispatch_list = pop_admitted_jobs(
+#  ready_heap, running_set, n_slot, memory_budget, shared_peak_rss
+# )
+# Same as admit_jobs, except that the ready jobs are the job_id values in
+# ready_heap, a heap of (key, job_id) pairs, and the running jobs are the
+# elements of running_set. The admitted jobs are removed from ready_heap.
+# The jobs are popped from the heap, in order, only until n_slot jobs are
+# admitted or the memory left is less than the smallest possible estimate,
+# so the cost does not depend on the number of ready jobs that remain.
+def pop_admitted_jobs(
+   ready_heap, running_set, n_slot, memory_budget, shared_peak_rss
+) :
+   #
+   # n_slot
+   n_slot = max(n_slot, 0)
+   #
+   # model
+   model = None
+   if memory_budget is not None :
+      model = memory_model(memory_budget, shared_peak_rss)
+      if model is None :
+         # no observed peak memory values, run one job at a time
+         if len(running_set) > 0 :
+            n_slot = 0
+         n_slot = min(n_slot, 1)
+   #
+   # dispatch_list
+   if model is None :
+      dispatch_list = list()
+      while len(ready_heap) > 0 and len(dispatch_list) < n_slot :
+         (key, job_id) = heapq.heappop(ready_heap)
+         dispatch_list.append( job_id )
+      return dispatch_list
+   #
+   # memory_inuse
+   job_id_run   = numpy.array( list(running_set), dtype = int )
+   run_memory   = estimate_memory(
+      job_id_run, memory_budget, shared_peak_rss, model
+   )
+   memory_inuse = float( numpy.sum(run_memory) )
+   #
+   # dispatch_list, skip_list
+   # no estimate is less than base
+   base          = model[0]
+   max_memory    = memory_budget['max_memory']
+   dispatch_list = list()
+   skip_list     = list()
+   while len(ready_heap) > 0 and len(dispatch_list) < n_slot :
+      running = len(running_set) + len(dispatch_list) > 0
+      if running and max_memory < memory_inuse + base :
+         break
+      (key, job_id) = heapq.heappop(ready_heap)
+      memory        = estimate_memory(
+         numpy.array( [ job_id ] ), memory_budget, shared_peak_rss, model
+      )[0]
+      if running and max_memory < memory_inuse + memory :
+         skip_list.append( (key, job_id) )
+      else :
+         memory_inuse += float(memory)
+         dispatch_list.append( job_id )
+   #
+   # ready_heap
+   for element in skip_list :
+      heapq.heappush(ready_heap, element)
+   return dispatch_list
+# ----------------------------------------------------------------------------
+# (shm_peak_rss, shared_peak_rss) = get_shared_peak_rss(memory_budget, n_job)
+def get_shared_peak_rss(memory_budget, n_job) :
+   if memory_budget is None :
+      return (None, None)
+   return get_shared_array( memory_budget['shared_peak_rss_name'], n_job )
+# ----------------------------------------------------------------------------
+# Each process in the worker pool runs this function. It fits the jobs
+# that it gets from job_queue until it gets None. After each job it puts
+# the job_id in done_queue so the master process knows it has completed.
+def pool_worker(
+   job_table,
+   all_node_database,
+   node_table,
+   fit_integrand,
+   max_number_cpu,
+   fit_type_list,
+   job_status_name,
+   shared_job_status_name,
+   shared_number_cpu_inuse_name,
+   shared_lock,
+   shared_event,
+   job_queue,
+   done_queue,
+   subtree,
+   memory_budget,
+   job_queue_database,
+) :
+   #
+   # shm_job_status, shared_job_status
+   (shm_job_status, shared_job_status) = \
+      get_shared_array(shared_job_status_name, len(job_table) )
+   #
+   # shm_number_cpu_inuse, shared_number_cpu_inuse
+   (shm_number_cpu_inuse, shared_number_cpu_inuse) = \
+      get_shared_array(shared_number_cpu_inuse_name, 1)
+   #
+   # shm_peak_rss, shared_peak_rss
+   (shm_peak_rss, shared_peak_rss) = \
+      get_shared_peak_rss(memory_budget, len(job_table) )
+   #
+   # skip_this_job, master_process
+   skip_this_job  = False
+   master_process = False
+   #
+   while True :
+      #
+      # job_id
+      job_id = job_queue.get()
+      if job_id is None :
+         break
+      #
+      # try_one_job
+      # assumes lock is not acquired during this operation
+      try_one_job(
+         job_table,
+         job_id,
+         all_node_database,
+         node_table,
+         fit_integrand,
+         skip_this_job,
+         max_number_cpu,
+         master_process,
+         fit_type_list,
+         shared_lock,
+         shared_event,
+         shared_job_status,
+         job_status_name,
+         subtree,
+         memory_budget,
+         shared_peak_rss,
+         job_queue_database,
+      )
+      #
+      # done_queue
+      done_queue.put( job_id )
+   #
+   # return this processor
+   acquire_lock(shared_lock)
+   shared_number_cpu_inuse[0] -= 1
+   #
+   # release
+   # shared memory has changed
+   shared_event.set()
+   shared_lock.release()
+   #
+   shm_job_status.close()
+   shm_number_cpu_inuse.close()
+   if shm_peak_rss is not None :
+      shm_peak_rss.close()
+   return
+# ----------------------------------------------------------------------------
+# job_id = get_done_job_id(done_queue, worker_list)
+# wait for a worker to complete a job and return the corresponding job_id
+def get_done_job_id(done_queue, worker_list) :
+   seconds = 10.0
+   while True :
+      try :
+         return done_queue.get(block = True, timeout = seconds)
+      except queue.Empty :
+         # The workers do not return until the master tells them to,
+         # so this is only a check that none of them has crashed.
+         for p in worker_list :
+            if not p.is_alive() :
+               msg  = 'fit_one_process: a worker process terminated '
+               msg += f'with exitcode = {p.exitcode}'
+               assert False, msg
+# ----------------------------------------------------------------------------
+# The master process runs this function when worker_pool is true.
+# It does not fit any jobs, it just passes ready jobs to the workers.
+# The ready jobs are kept in a heap that is updated each time a worker
+# completes a job, so the master does not scan the shared job status
+# (except at the beginning) and it wakes up as soon as a job completes.
+def pool_master(
+   job_table,
+   this_job_id,
+   all_node_database,
+   node_table,
+   fit_integrand,
+   skip_this_job,
+   max_number_cpu,
+   fit_type_list,
+   job_status_name,
+   shared_job_status_name,
+   shared_number_cpu_inuse_name,
+   shared_lock,
+   shared_event,
+   shared_job_status,
+   shared_number_cpu_inuse,
+   priority,
+   subtree,
+   memory_budget,
+   shared_peak_rss,
+   job_queue_database,
+) :
+   #
+   # job_status_name
+   job_status_wait  = job_status_name.index( 'wait' )
+   job_status_ready = job_status_name.index( 'ready' )
+   job_status_run   = job_status_name.index( 'run' )
+   job_status_done  = job_status_name.index( 'done' )
+   #
+   # ready_key
+   # key used to order the ready jobs; see sort_ready
+   def ready_key(job_id) :
+      if priority is None :
+         return (0.0, job_id)
+      return ( - float( priority[job_id] ), job_id )
+   #
+   # job_table_index
+   job_table_index = numpy.array( range(len(job_table)), dtype = int )
+   #
+   # n_job_todo, ready_heap
+   acquire_lock(shared_lock)
+   n_job_todo = int( sum(
+      (shared_job_status == job_status_wait)  |
+      (shared_job_status == job_status_ready) |
+      (shared_job_status == job_status_run)
+   ) )
+   ready_heap = list()
+   for job_id in job_table_index[ shared_job_status == job_status_ready ] :
+      job_id = int(job_id)
+      heapq.heappush( ready_heap, ( ready_key(job_id), job_id ) )
+   #
+   # n_worker
+   n_worker = min(max_number_cpu, n_job_todo)
+   #
+   # shared_number_cpu_inuse
+   # The master process does not fit jobs. It is counted as the one process
+   # that is always in use; i.e., shared_number_cpu_inuse[0] is one when
+   # all the workers have returned their processors.
+   shared_number_cpu_inuse[0] += n_worker
+   shared_lock.release()
+   #
+   # job_queue, done_queue
+   job_queue  = multiprocessing.Queue()
+   done_queue = multiprocessing.Queue()
+   #
+   # worker_list
+   worker_list = list()
+   for i in range(n_worker) :
+      args = (
+         job_table,
+         all_node_database,
+         node_table,
+         fit_integrand,
+         max_number_cpu,
+         fit_type_list,
+         job_status_name,
+         shared_job_status_name,
+         shared_number_cpu_inuse_name,
+         shared_lock,
+         shared_event,
+         job_queue,
+         done_queue,
+         subtree,
+         memory_budget,
+         job_queue_database,
+      )
+      p = multiprocessing.Process(target = pool_worker, args = args)
+      p.deamon = False
+      p.start()
+      worker_list.append(p)
+   #
+   # running_set, job_queue
+   # fit_parallel has already set the status for this job to run
+   running_set = set()
+   if not skip_this_job :
+      job_queue.put( this_job_id )
+      running_set.add( this_job_id )
+   #
+   while len(running_set) > 0 or len(ready_heap) > 0 :
+      #
+      # n_slot
+      n_slot = n_worker - len(running_set)
+      #
+      # dispatch_list, ready_heap
+      dispatch_list = pop_admitted_jobs(
+         ready_heap, running_set, n_slot, memory_budget, shared_peak_rss
+      )
+      #
+      if len(dispatch_list) > 0 :
+         #
+         # shared_job_status
+         acquire_lock(shared_lock)
+         for job_id in dispatch_list :
+            assert shared_job_status[job_id] == job_status_ready
+            shared_job_status[job_id] = job_status_run
+         shared_lock.release()
+         #
+         # job_queue, running_set
+         for job_id in dispatch_list :
+            job_queue.put( job_id )
+            running_set.add( job_id )
+      #
+      # job_id, running_set
+      job_id = get_done_job_id(done_queue, worker_list)
+      running_set.remove( job_id )
+      #
+      # ready_heap
+      # If this job is done, its children that are not prior only are ready.
+      # If it had an error, its descendants have been aborted.
+      acquire_lock(shared_lock)
+      if shared_job_status[job_id] == job_status_done :
+         start_child_job_id = job_table[job_id]['start_child_job_id']
+         end_child_job_id   = job_table[job_id]['end_child_job_id']
+         for child_job_id in range(start_child_job_id, end_child_job_id) :
+            if shared_job_status[child_job_id] == job_status_ready :
+               heapq.heappush(
+                  ready_heap, ( ready_key(child_job_id), child_job_id )
+               )
+      shared_lock.release()
+   #
+   # worker_list
+   # tell the workers that there are no more jobs and wait for them to return
+   for p in worker_list :
+      job_queue.put( None )
+   for p in worker_list :
+      p.join()
+   return
+# ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.fit_one_process
 def fit_one_process(
@@ -406,6 +857,11 @@ def fit_one_process(
    shared_number_cpu_inuse_name,
    shared_lock,
    shared_event,
+   worker_pool        = False,
+   priority           = None,
+   subtree            = None,
+   memory_budget      = None,
+   job_queue_database = None,
 ) :
    assert type(job_table)            == list
    assert type(this_job_id)          == int
@@ -422,6 +878,16 @@ def fit_one_process(
    assert type(shared_number_cpu_inuse_name) == str
    assert type(shared_lock)          == multiprocessing.synchronize.Lock
    assert type(shared_event)         == multiprocessing.synchronize.Event
+   assert type(worker_pool)          == bool
+   if priority is not None :
+      assert type(priority) == numpy.ndarray
+      assert len(priority) == len(job_table)
+   if subtree is not None :
+      assert type(subtree) == tuple
+   if memory_budget is not None :
+      assert type(memory_budget) == dict
+   if job_queue_database is not None :
+      assert type(job_queue_database) == str
    # END_DEF
    # ----------------------------------------------------------------------
    job_status_skip  = job_status_name.index( 'skip' )
@@ -434,24 +900,52 @@ def fit_one_process(
    # ----------------------------------------------------------------------
    #
    # shm_job_status, shared_job_status
-   tmp    = numpy.empty(len(job_table), dtype = int )
-   mapped = at_cascade.map_shared( shared_job_status_name )
-   shm_job_status = multiprocessing.shared_memory.SharedMemory(
-      create = False, size = tmp.nbytes, name = mapped
-   )
-   shared_job_status = numpy.ndarray(
-      tmp.shape, dtype = tmp.dtype, buffer = shm_job_status.buf
-   )
+   (shm_job_status, shared_job_status) = \
+      get_shared_array(shared_job_status_name, len(job_table) )
    #
    # shm_number_cpu_inuse, shared_number_cpu_inuse
-   tmp    = numpy.empty(1, dtype = int )
-   mapped = at_cascade.map_shared( shared_number_cpu_inuse_name )
-   shm_number_cpu_inuse = multiprocessing.shared_memory.SharedMemory(
-      create = False, size = tmp.nbytes, name = mapped
-   )
-   shared_number_cpu_inuse = numpy.ndarray(
-      tmp.shape, dtype = tmp.dtype, buffer = shm_number_cpu_inuse.buf
-   )
+   (shm_number_cpu_inuse, shared_number_cpu_inuse) = \
+      get_shared_array(shared_number_cpu_inuse_name, 1)
+   #
+   # shm_peak_rss, shared_peak_rss
+   (shm_peak_rss, shared_peak_rss) = \
+      get_shared_peak_rss(memory_budget, len(job_table) )
+   #
+   # subtree
+   if subtree is None :
+      subtree = at_cascade.job_subtree(job_table)
+   #
+   if worker_pool and max_number_cpu > 1 :
+      assert master_process
+      #
+      # pool_master
+      pool_master(
+         job_table,
+         this_job_id,
+         all_node_database,
+         node_table,
+         fit_integrand,
+         skip_this_job,
+         max_number_cpu,
+         fit_type_list,
+         job_status_name,
+         shared_job_status_name,
+         shared_number_cpu_inuse_name,
+         shared_lock,
+         shared_event,
+         shared_job_status,
+         shared_number_cpu_inuse,
+         priority,
+         subtree,
+         memory_budget,
+         shared_peak_rss,
+         job_queue_database,
+      )
+      shm_job_status.close()
+      shm_number_cpu_inuse.close()
+      if shm_peak_rss is not None :
+         shm_peak_rss.close()
+      return
    #
    # job_table_index
    job_table_index = numpy.array( range(len(job_table)), dtype = int )
@@ -474,6 +968,10 @@ def fit_one_process(
          shared_event,
          shared_job_status,
          job_status_name,
+         subtree,
+         memory_budget,
+         shared_peak_rss,
+         job_queue_database,
       )
    #
    while True :
@@ -482,10 +980,20 @@ def fit_one_process(
       #
       # job_id_ready
       job_id_ready = job_table_index[ shared_job_status == job_status_ready ]
+      job_id_ready = sort_ready(job_id_ready, priority)
       #
       # job_id_run
       job_id_run  = job_table_index[ shared_job_status == job_status_run ]
       #
+      # job_id_ready
+      # this process is not counted in job_id_run, but is in
+      # shared_number_cpu_inuse, so it is one of the available slots
+      if memory_budget is not None :
+         n_slot       = max_number_cpu - shared_number_cpu_inuse[0] + 1
+         job_id_ready = admit_jobs(
+            job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+         )
+      #
       # n_job_ready
       n_job_ready = job_id_ready.size
       #
@@ -503,6 +1011,8 @@ def fit_one_process(
                   #
                   shm_job_status.close()
                   shm_number_cpu_inuse.close()
+                  if shm_peak_rss is not None :
+                     shm_peak_rss.close()
                   return
                else :
                   #
@@ -523,6 +1033,8 @@ def fit_one_process(
                #
                shm_job_status.close()
                shm_number_cpu_inuse.close()
+               if shm_peak_rss is not None :
+                  shm_peak_rss.close()
                return
          else :
             #
@@ -544,6 +1056,8 @@ def fit_one_process(
                #
                shm_job_status.close()
                shm_number_cpu_inuse.close()
+               if shm_peak_rss is not None :
+                  shm_peak_rss.close()
                return
       else :
          #
@@ -594,6 +1108,11 @@ def fit_one_process(
                shared_number_cpu_inuse_name,
                shared_lock,
                shared_event,
+               worker_pool,
+               priority,
+               subtree,
+               memory_budget,
+               job_queue_database,
             )
             target = fit_one_process
             p = multiprocessing.Process(target = target, args = args)
@@ -620,4 +1139,8 @@ def fit_one_process(
             shared_event,
             shared_job_status,
             job_status_name,
+            subtree,
+            memory_budget,
+            shared_peak_rss,
+            job_queue_database,
          )
@@ -6,6 +6,7 @@
 {xrst_begin fit_parallel}
 {xrst_spell
   cpus
+  json
 }
 
 Fit With Specified Maximum Number of Processes
@@ -82,22 +83,139 @@ shared memory names:
    It is suggested that you use the empty string for this value unless you
    are running more than one call with the same prefix and job name.
 
+resume
+******
+If this is true, the jobs that were completed by a previous call to
+fit_parallel are not run again.
+A job is considered complete if the log table in its
+:ref:`glossary@fit_database` contains the ``children: OK`` message
+(see :ref:`fit_one_job@fit_database@log` )
+and its parent job is also complete (or it is the start job).
+The :ref:`fit_parallel@job_queue_database` is not used to decide
+which jobs are complete, so resume works with the default options
+(when the job queue database is not created).
+This has the following limitations:
+
+#. A job that completed is run again if its parent job did not complete;
+   e.g., if the cascade was terminated while the parent was creating the
+   shift databases for its children.
+#. A job that failed is run again.
+#. The fit databases in the result directory must be the ones created by
+   the previous call; i.e., the result directory must not have been
+   changed and the other arguments to fit_parallel,
+   including the fit goal set used to create *job_table* ,
+   must be the same as for the previous call.
+#. The files created by a job that is run again are replaced.
+
+If *resume* is true and the job queue is in shared memory,
+the shared memory names above are cleared (see :ref:`clear_shared-name` )
+before they are created.
+Hence *resume* should only be used when no other call to fit_parallel,
+with the same shared memory names, is running.
+If *resume* is false (its default value),
+all the jobs, except perhaps the start job, are run.
+
 trace.out
 *********
 If the *max_number_cpu* is one, standard output is not redirected.
 Otherwise, standard output for each job is written to a file called
 ``trace.out`` in the same directory as the database for the job.
 
+worker_pool
+***********
+If :ref:`option_all_table@worker_pool` is true and *max_number_cpu*
+is greater than one,
+a fixed pool of *max_number_cpu* worker processes is started once
+and each worker pulls job ids from a queue until there are no more jobs.
+Otherwise, a new process is started for each job that is run in parallel.
+
+max_memory_gb
+*************
+If :ref:`option_all_table@max_memory_gb` appears in the option all table,
+jobs are only started when the estimated memory for the running jobs
+is within this budget; see :ref:`fit_one_process@memory_budget` .
+The size of a job is one plus the number of data rows for its fit node,
+and the descendants of its fit node.
+The observed peak memory for each job is recorded in the file
+
+|  *result_dir* ``/peak_rss.csv``
+
+where *result_dir* is specified in the option all table.
+The values in this file are also used to estimate the memory for a job
+when fit_parallel is called again; e.g., by :ref:`continue_cascade-name` .
+
+job_priority
+************
+The :ref:`option_all_table@job_priority` option determines the
+order in which the ready jobs are run; see :ref:`job_priority-name` .
+
+stage_metrics
+*************
+If :ref:`option_all_table@stage_metrics` is true,
+the :ref:`fit_one_job@stage_metrics` table is created here,
+if it does not already exist, before any of the jobs are run.
+
+job_queue_database
+******************
+If :ref:`option_all_table@job_queue` is ``result_dir`` ,
+or :ref:`option_all_table@progress_interval` is greater than zero,
+the status of the jobs is recorded in the file
+
+|  *result_dir* ``/job_queue_`` *job_name* *shared_unique* ``.db``
+
+which is created by :ref:`create_job_queue-name` .
+Each time a job starts, completes, or fails, the change is committed to
+this database (see :ref:`set_job_queue_status-name` ),
+so it contains the status of the jobs even if fit_parallel is terminated
+before it returns.
+This database is not used by :ref:`fit_parallel@resume` .
+
+job_queue
+*********
+If :ref:`option_all_table@job_queue` is ``result_dir`` ,
+shared memory is not used and the
+:ref:`fit_parallel@job_queue_database` is used to decide which jobs to run.
+In this case, *max_number_cpu* :ref:`queue_worker-name` processes are started
+on this host and fit_parallel returns when all of them have finished.
+Other hosts that mount *result_dir* can help run the jobs by calling
+queue_worker with the same job queue database,
+and the same current working directory, while this is happening.
+The :ref:`option_all_table@max_memory_gb` and
+:ref:`option_all_table@worker_pool` options are not used in this case.
+
+progress
+********
+If :ref:`option_all_table@progress_interval` is greater than zero,
+a separate process uses :ref:`job_progress-name`
+to report the progress every *progress_interval* seconds
+while the jobs are running,
+and once more after all the jobs have finished.
+The report is written to the files
+
+|  *result_dir* ``/progress_`` *job_name* *shared_unique* ``.json``
+|  *result_dir* ``/progress_`` *job_name* *shared_unique* ``.txt``
+
+The json file contains the most recent *progress* dictionary
+returned by job_progress.
+It is replaced (not rewritten) so a reader never sees a partial file.
+The most recent :ref:`job_progress@line` is appended to the text file,
+so one can follow the cascade using ``tail -f`` on this file.
+
 {xrst_end fit_parallel}
 '''
 # ----------------------------------------------------------------------------
+import os
+import csv
+import json
+import sqlite3
 import multiprocessing
+import multiprocessing.connection
 import numpy
 import at_cascade
 import dismod_at
 # ----------------------------------------------------------------------------
-# shared_memory_prefix = get_shared_memory_prefix(all_node_database)
-def get_shared_memory_prefix(all_node_database) :
+# option_all_dict = get_option_all_dict(all_node_database)
+def get_option_all_dict(all_node_database) :
    assert type(all_node_database) == str
    #
    connection           = dismod_at.create_connection(
@@ -105,11 +223,273 @@ def get_shared_memory_prefix(all_node_database) :
    )
    option_all_table     = dismod_at.get_table_dict(connection, 'option_all')
    connection.close()
-   shared_memory_prefix = ""
+   option_all_dict = dict()
    for row in option_all_table :
-      if row['option_name'] == 'shared_memory_prefix' :
-         shared_memory_prefix = row['option_value']
-   return shared_memory_prefix
+      option_all_dict[ row['option_name'] ] = row['option_value']
+   return option_all_dict
+# ----------------------------------------------------------------------------
+# job_weight = get_job_data_weight(job_table, node_table, root_database)
+def get_job_data_weight(job_table, node_table, root_database) :
+   assert type(job_table) == list
+   assert type(node_table) == list
+   assert type(root_database) == str
+   #
+   # count_list
+   connection = dismod_at.create_connection(
+      root_database, new = False, readonly = True
+   )
+   command    = 'SELECT node_id, COUNT(*) FROM data GROUP BY node_id'
+   count_list = dismod_at.sql_command(connection, command)
+   connection.close()
+   #
+   # node_count
+   # number of data rows for each node and its descendants
+   node_count = numpy.zeros( len(node_table), dtype = int )
+   for (node_id, count) in count_list :
+      while node_id is not None :
+         node_count[node_id] += count
+         node_id              = node_table[node_id]['parent']
+   #
+   # job_weight
+   job_weight = list()
+   for row in job_table :
+      job_weight.append( 1.0 + float( node_count[ row['fit_node_id'] ] ) )
+   return job_weight
+# ----------------------------------------------------------------------------
+# peak_rss = read_peak_rss_file(peak_rss_file, job_table)
+# Observed peak memory, in kilobytes, for each job in the job table
+# (-1 if not observed). If the file does not exist, it is created with
+# just its header line.
+def read_peak_rss_file(peak_rss_file, job_table) :
+   assert type(peak_rss_file) == str
+   assert type(job_table) == list
+   #
+   # peak_rss
+   peak_rss = numpy.full( len(job_table), -1, dtype = int )
+   #
+   if not os.path.isfile(peak_rss_file) :
+      with open(peak_rss_file, 'w') as file_obj :
+         writer = csv.writer(file_obj)
+         writer.writerow( [ 'job_name', 'job_size', 'peak_rss' ] )
+      return peak_rss
+   #
+   # job_name2id
+   job_name2id = dict()
+   for (job_id, row) in enumerate(job_table) :
+      job_name2id[ row['job_name'] ] = job_id
+   #
+   # peak_rss
+   # the most recent observation for each job is used
+   with open(peak_rss_file, 'r') as file_obj :
+      for row in csv.DictReader(file_obj) :
+         if row['job_name'] in job_name2id :
+            job_id           = job_name2id[ row['job_name'] ]
+            peak_rss[job_id] = int( 1024.0 * float( row['peak_rss'] ) )
+   return peak_rss
+# ----------------------------------------------------------------------------
+# job_complete = get_job_complete(
+#  all_node_database, node_table, job_table, job_id_list
+# )
+# job_complete[job_id] is true if job_id is in job_id_list and the log table
+# in its fit database contains the children: OK message.
+def get_job_complete(all_node_database, node_table, job_table, job_id_list) :
+   assert type(all_node_database) == str
+   assert type(node_table) == list
+   assert type(job_table) == list
+   #
+   # option_all_dict, node_split_table, split_reference_table
+   option_all_dict  = get_option_all_dict(all_node_database)
+   connection       = dismod_at.create_connection(
+      all_node_database, new = False, readonly = True
+   )
+   node_split_table = dismod_at.get_table_dict(connection, 'node_split')
+   split_reference_table = \
+      dismod_at.get_table_dict(connection, 'split_reference')
+   connection.close()
+   #
+   # result_dir, root_node_id, root_split_reference_id
+   result_dir   = option_all_dict['result_dir']
+   root_node_id = at_cascade.table_name2id(
+      node_table, 'node', option_all_dict['root_node_name']
+   )
+   root_split_reference_id = None
+   if 'root_split_reference_name' in option_all_dict :
+      root_split_reference_id = at_cascade.table_name2id(
+         split_reference_table,
+         'split_reference',
+         option_all_dict['root_split_reference_name'],
+      )
+   #
+   # node_split_set
+   node_split_set = set()
+   for row in node_split_table :
+      node_split_set.add( row['node_id'] )
+   #
+   # job_complete
+   job_complete = numpy.zeros( len(job_table), dtype = bool )
+   for job_id in job_id_list :
+      if not job_table[job_id]['prior_only'] :
+         #
+         # fit_database
+         database_dir = at_cascade.get_database_dir(
+            node_table              = node_table,
+            split_reference_table   = split_reference_table,
+            node_split_set          = node_split_set,
+            root_node_id            = root_node_id,
+            root_split_reference_id = root_split_reference_id,
+            fit_node_id             = job_table[job_id]['fit_node_id'],
+            fit_split_reference_id  = job_table[job_id]['split_reference_id'],
+         )
+         fit_database = f'{result_dir}/{database_dir}/dismod.db'
+         #
+         # job_complete
+         # The shifted databases for jobs that have not been run
+         # do not have a log table.
+         if os.path.isfile(fit_database) :
+            connection = dismod_at.create_connection(
+               fit_database, new = False, readonly = True
+            )
+            if at_cascade.table_exists(connection, 'log') :
+               command  = 'SELECT message FROM log '
+               command += "WHERE message_type = 'at_cascade'"
+               message_list = dismod_at.sql_command(connection, command)
+               job_complete[job_id] = ('children: OK',) in message_list
+            connection.close()
+   return job_complete
+# ----------------------------------------------------------------------------
+# job_status = get_initial_status(
+#  job_table, start_job_id, skip_start_job, subtree, job_complete
+# )
+# The initial status name for each job; i.e., skip, wait, ready, or done.
+def get_initial_status(
+   job_table, start_job_id, skip_start_job, subtree, job_complete
+) :
+   #
+   # job_status
+   job_status = list()
+   for row in job_table :
+      if row['prior_only'] :
+         job_status.append( 'skip' )
+      else :
+         job_status.append( 'wait' )
+   #
+   # job_status
+   # In subtree_order, each job comes before all of its descendants.
+   (subtree_order, subtree_begin, subtree_end) = subtree
+   begin = subtree_begin[start_job_id]
+   end   = subtree_end[start_job_id]
+   for job_id in subtree_order[begin : end] :
+      job_id = int(job_id)
+      if job_status[job_id] != 'skip' :
+         if job_id == start_job_id :
+            ready = True
+            done  = skip_start_job or job_complete[job_id]
+         else :
+            parent_job_id = job_table[job_id]['parent_job_id']
+            ready = job_status[parent_job_id] == 'done'
+            done  = ready and job_complete[job_id]
+         if done :
+            job_status[job_id] = 'done'
+         elif ready :
+            job_status[job_id] = 'ready'
+   return job_status
+# ----------------------------------------------------------------------------
+# run_job_queue(job_queue_database, job_table, max_number_cpu)
+# Run max_number_cpu queue workers on this host and check the final
+# status of each job.
+def run_job_queue(job_queue_database, job_table, max_number_cpu) :
+   assert type(job_queue_database) == str
+   assert type(job_table) == list
+   assert type(max_number_cpu) == int
+   #
+   if max_number_cpu == 1 :
+      at_cascade.queue_worker(job_queue_database, trace = False)
+   else :
+      #
+      # worker_list
+      worker_list = list()
+      for i in range(max_number_cpu) :
+         worker = multiprocessing.Process(
+            target = at_cascade.queue_worker,
+            args   = (job_queue_database, True),
+         )
+         worker.start()
+         worker_list.append( worker )
+      #
+      # worker_list
+      # Join the workers as they finish. This removes a worker that dies
+      # from the process table so the other workers can detect it.
+      while len(worker_list) > 0 :
+         sentinel_list = [ worker.sentinel for worker in worker_list ]
+         multiprocessing.connection.wait(sentinel_list)
+         for worker in list(worker_list) :
+            if not worker.is_alive() :
+               worker.join()
+               worker_list.remove(worker)
+   #
+   # job_status
+   connection = sqlite3.connect(job_queue_database)
+   command    = 'SELECT job_status FROM job_queue ORDER BY job_id'
+   job_status = [ row[0] for row in connection.execute(command) ]
+   connection.close()
+   assert len(job_status) == len(job_table)
+   for job_id in range( len(job_table) ) :
+      assert job_status[job_id] in [ 'done', 'error', 'abort', 'skip' ]
+# ----------------------------------------------------------------------------
+# write_progress(job_queue_database, n_worker, progress_file)
+# Write the progress in json format to progress_file.json and append the
+# human readable line to progress_file.txt .
+def write_progress(job_queue_database, n_worker, progress_file) :
+   progress = at_cascade.job_progress(job_queue_database, n_worker)
+   #
+   # progress_file.json
+   # rename a temporary file so readers never see a partial file
+   temp_file = f'{progress_file}.json.tmp'
+   with open(temp_file, 'w') as file_obj :
+      json.dump(progress, file_obj, indent = 1)
+   os.replace(temp_file, f'{progress_file}.json')
+   #
+   # progress_file.txt
+   with open(f'{progress_file}.txt', 'a') as file_obj :
+      file_obj.write( progress['line'] + '\n' )
+# ----------------------------------------------------------------------------
+# report_progress(
+#  job_queue_database, n_worker, progress_file, progress_interval, stop_event
+# )
+# Write the progress every progress_interval seconds until stop_event is set,
+# and then write it one more time.
+def report_progress(
+   job_queue_database, n_worker, progress_file, progress_interval, stop_event
+) :
+   while not stop_event.wait(progress_interval) :
+      write_progress(job_queue_database, n_worker, progress_file)
+   write_progress(job_queue_database, n_worker, progress_file)
+# ----------------------------------------------------------------------------
+# create_stage_metrics(stage_metrics_database)
+# create the stage_metrics table in stage_metrics_database (if necessary)
+def create_stage_metrics(stage_metrics_database) :
+   new        = not os.path.exists(stage_metrics_database)
+   connection = dismod_at.create_connection(
+      stage_metrics_database, new = new, readonly = False
+   )
+   command  = 'CREATE TABLE IF NOT EXISTS stage_metrics('
+   command += 'stage_metrics_id INTEGER PRIMARY KEY, '
+   command += 'job_name TEXT, fit_type TEXT, stage TEXT, command TEXT, '
+   command += 'wall_time REAL, user_time REAL, system_time REAL, '
+   command += 'max_rss REAL, n_data INTEGER, n_var INTEGER, unix_time REAL)'
+   dismod_at.sql_command(connection, command)
+   connection.close()
+# ----------------------------------------------------------------------------
+# stop_reporter(reporter, stop_event, job_queue_database, n_worker)
+# Stop the progress reporter and print the final progress line
+# (does nothing if reporter is None).
+def stop_reporter(reporter, stop_event, job_queue_database, n_worker) :
+   if reporter is None :
+      return
+   stop_event.set()
+   reporter.join()
+   progress = at_cascade.job_progress(job_queue_database, n_worker)
+   print( 'progress: ' + progress['line'] )
 # ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.fit_parallel
@@ -123,6 +503,7 @@ def fit_parallel(
    max_number_cpu    ,
    fit_type_list     ,
    shared_unique     ,
+   resume            = False,
 ) :
    #
    assert type(job_table)         == list
@@ -134,6 +515,7 @@ def fit_parallel(
    assert type(max_number_cpu)    == int
    assert type(fit_type_list)     == list
    assert type(shared_unique)     == str
+   assert type(resume)            == bool
    # END_DEF
    # ----------------------------------------------------------------------
    # job_status_name
@@ -154,11 +536,156 @@ def fit_parallel(
    job_status_error = job_status_name.index( 'error' )
    job_status_abort = job_status_name.index( 'abort' )
    # ----------------------------------------------------------------------
+   # option_all_dict
+   option_all_dict = get_option_all_dict(all_node_database)
+   #
+   # worker_pool
+   worker_pool = True
+   if 'worker_pool' in option_all_dict :
+      worker_pool = option_all_dict['worker_pool']
+      assert worker_pool in [ 'true', 'false' ]
+      worker_pool = worker_pool == 'true'
+   #
+   # stage_metrics
+   stage_metrics = False
+   if 'stage_metrics' in option_all_dict :
+      stage_metrics = option_all_dict['stage_metrics']
+      assert stage_metrics in [ 'true', 'false' ]
+      stage_metrics = stage_metrics == 'true'
+   #
+   # job_priority
+   job_priority = 'job_id'
+   if 'job_priority' in option_all_dict :
+      job_priority = option_all_dict['job_priority']
+      if job_priority not in [ 'job_id', 'subtree', 'data' ] :
+         msg  = 'option_all table: job_priority is not '
+         msg += 'job_id, subtree, or data'
+         assert False, msg
+   #
+   # max_memory_gb
+   max_memory_gb = None
+   if 'max_memory_gb' in option_all_dict :
+      max_memory_gb = float( option_all_dict['max_memory_gb'] )
+      if max_memory_gb <= 0.0 :
+         msg  = 'option_all table: max_memory_gb is not greater than zero'
+         assert False, msg
+   #
+   # job_queue
+   job_queue = 'shared_memory'
+   if 'job_queue' in option_all_dict :
+      job_queue = option_all_dict['job_queue']
+      if job_queue not in [ 'shared_memory', 'result_dir' ] :
+         msg  = 'option_all table: job_queue is not '
+         msg += 'shared_memory or result_dir'
+         assert False, msg
+   if job_queue == 'result_dir' :
+      max_memory_gb = None
+   #
+   # progress_interval
+   progress_interval = 0.0
+   if 'progress_interval' in option_all_dict :
+      progress_interval = float( option_all_dict['progress_interval'] )
+      if progress_interval < 0.0 :
+         msg  = 'option_all table: progress_interval is less than zero'
+         assert False, msg
+   #
+   # job_weight
+   job_weight = None
+   if job_priority == 'data' or max_memory_gb is not None :
+      job_weight = get_job_data_weight(
+         job_table, node_table, option_all_dict['root_database']
+      )
+   #
+   # priority
+   if job_priority == 'job_id' :
+      priority = None
+   elif job_priority == 'subtree' :
+      priority = at_cascade.job_priority(job_table)
+   else :
+      priority = at_cascade.job_priority(job_table, job_weight)
+   #
+   # subtree
+   subtree = at_cascade.job_subtree(job_table)
+   # ----------------------------------------------------------------------
+   # job_complete
+   if resume :
+      (subtree_order, subtree_begin, subtree_end) = subtree
+      job_id_list  = subtree_order[
+         subtree_begin[start_job_id] : subtree_end[start_job_id]
+      ]
+      job_complete = get_job_complete(
+         all_node_database, node_table, job_table, job_id_list
+      )
+   else :
+      job_complete = numpy.zeros( len(job_table), dtype = bool )
+   #
+   # initial_status
+   initial_status = get_initial_status(
+      job_table, start_job_id, skip_start_job, subtree, job_complete
+   )
+   if resume :
+      n_done = initial_status.count('done')
+      print( f'resume: {n_done} jobs are already done' )
+   #
+   # stage_metrics.db
+   result_dir = option_all_dict['result_dir']
+   if stage_metrics :
+      create_stage_metrics( f'{result_dir}/stage_metrics.db' )
+   #
+   # job_queue_database
+   # This database is only needed to run the jobs or report the progress.
+   start_name         = job_table[start_job_id]['job_name']
+   job_queue_database = None
+   if job_queue == 'result_dir' or progress_interval > 0.0 :
+      job_queue_database = \
+         f'{result_dir}/job_queue_{start_name}{shared_unique}.db'
+      print(f'create: {job_queue_database}')
+      at_cascade.create_job_queue(
+         job_queue_database = job_queue_database,
+         job_table          = job_table,
+         all_node_database  = all_node_database,
+         fit_integrand      = fit_integrand,
+         fit_type_list      = fit_type_list,
+         priority           = priority,
+         job_status         = initial_status,
+      )
+   #
+   # reporter, stop_event
+   # The reporter is a daemon so it does not outlive this process
+   # when an exception is raised.
+   reporter   = None
+   stop_event = None
+   if progress_interval > 0.0 :
+      progress_file = f'{result_dir}/progress_{start_name}{shared_unique}'
+      stop_event    = multiprocessing.Event()
+      reporter      = multiprocessing.Process(
+         target = report_progress,
+         args   = (
+            job_queue_database,
+            max_number_cpu,
+            progress_file,
+            progress_interval,
+            stop_event,
+         ),
+         daemon = True,
+      )
+      reporter.start()
+   #
+   if job_queue == 'result_dir' :
+      #
+      # run_job_queue
+      run_job_queue(job_queue_database, job_table, max_number_cpu)
+      stop_reporter(reporter, stop_event, job_queue_database, max_number_cpu)
+      return
+   # ----------------------------------------------------------------------
    # shared_memory_prefix_plus
-   shared_memory_prefix = get_shared_memory_prefix(all_node_database)
-   start_name           = job_table[start_job_id]['job_name']
+   shared_memory_prefix = ''
+   if 'shared_memory_prefix' in option_all_dict :
+      shared_memory_prefix = option_all_dict['shared_memory_prefix']
    shared_memory_prefix_plus = \
       f'{shared_memory_prefix}_{start_name}{shared_unique}'
+   if resume :
+      at_cascade.clear_shared(all_node_database, start_name + shared_unique)
    print(f'create: {shared_memory_prefix_plus} shared memory')
    # -------------------------------------------------------------------------
    # shared_number_cpu_inuse_name
@@ -188,33 +715,61 @@ def fit_parallel(
       tmp.shape, dtype = tmp.dtype, buffer = shm_job_status.buf
    )
    # -------------------------------------------------------------------------
+   # -------------------------------------------------------------------------
+   # memory_budget, shm_peak_rss, shared_peak_rss
+   if max_memory_gb is None :
+      memory_budget   = None
+      shm_peak_rss    = None
+   else :
+      #
+      # shared_peak_rss_name
+      shared_peak_rss_name = shared_memory_prefix_plus + '_peak_rss'
+      #
+      # shm_peak_rss, shared_peak_rss
+      tmp    = numpy.empty(len(job_table), dtype = int )
+      mapped = at_cascade.map_shared(shared_peak_rss_name)
+      shm_peak_rss = multiprocessing.shared_memory.SharedMemory(
+         create = True, size = tmp.nbytes, name = mapped
+      )
+      shared_peak_rss = numpy.ndarray(
+         tmp.shape, dtype = tmp.dtype, buffer = shm_peak_rss.buf
+      )
+      #
+      # peak_rss_file
+      result_dir    = option_all_dict['result_dir']
+      peak_rss_file = f'{result_dir}/peak_rss.csv'
+      #
+      # shared_peak_rss
+      shared_peak_rss[:] = read_peak_rss_file(peak_rss_file, job_table)
+      #
+      # memory_budget
+      memory_budget = {
+         'max_memory'           : 1024.0 * max_memory_gb,
+         'job_size'             : numpy.array(job_weight, dtype = float),
+         'shared_peak_rss_name' : shared_peak_rss_name,
+         'peak_rss_file'        : peak_rss_file,
+      }
+   # -------------------------------------------------------------------------
    #
    # shm_list
    shm_list = [
          shm_number_cpu_inuse,
          shm_job_status,
    ]
+   if shm_peak_rss is not None :
+      shm_list.append( shm_peak_rss )
    #
    # shared_number_cpu_inuse
    shared_number_cpu_inuse[0] = 1
    #
    # shared_job_status
    for job_id in range( len(job_table) ) :
-      if job_table[job_id]['prior_only'] :
-         shared_job_status[job_id] = job_status_skip
-      else :
-         shared_job_status[job_id]  = job_status_wait
-   if skip_start_job :
-      shared_job_status[start_job_id] = job_status_done
-      #
-      # shared_job_status[child_job_id]
-      start_child_job_id    = job_table[start_job_id ]['start_child_job_id']
-      end_child_job_id      = job_table[start_job_id ]['end_child_job_id']
-      child_range = range(start_child_job_id, end_child_job_id)
-      for child_job_id in child_range :
-         if not job_table[child_job_id]['prior_only'] :
-            shared_job_status[child_job_id] = job_status_ready
-   else :
+      shared_job_status[job_id] = \
+         job_status_name.index( initial_status[job_id] )
+   #
+   # skip_this_job, shared_job_status
+   skip_this_job = initial_status[start_job_id] == 'done'
+   if not skip_this_job :
       shared_job_status[start_job_id] = job_status_run
    #
    # master_process
@@ -235,7 +790,7 @@ def fit_parallel(
       all_node_database,
       node_table,
       fit_integrand,
-      skip_start_job,
+      skip_this_job,
       max_number_cpu,
       master_process,
       fit_type_list,
@@ -244,6 +799,11 @@ def fit_parallel(
       shared_number_cpu_inuse_name,
       shared_lock,
       shared_event,
+      worker_pool,
+      priority,
+      subtree,
+      memory_budget,
+      job_queue_database,
    )
    #
    # shared_number_cpu_inuse
@@ -264,4 +824,7 @@ def fit_parallel(
       shm.close()
       shm.unlink()
    #
+   # reporter
+   stop_reporter(reporter, stop_event, job_queue_database, max_number_cpu)
+   #
    return
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin job_priority}
+{xrst_spell
+   numpy
+}
+
+Priority for Running Jobs Based on Their Subtree
+################################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+job_table
+*********
+Is the :ref:`create_job_table@job_table` for this analysis.
+
+job_weight
+**********
+If this is None, every job that is not
+:ref:`create_job_table@job_table@prior_only` has weight one.
+Otherwise, it is a ``list`` of ``float`` with length equal to the length of
+*job_table* and *job_weight* [ *job_id* ] is the
+amount of work (weight) for the corresponding job.
+The weight for a prior only job is always zero
+because it is completed by the fit for its parent job.
+
+priority
+********
+The return value *priority* is a numpy array of ``float``
+with length equal to the length of *job_table* .
+The value *priority* [ *job_id* ] is the sum of the weights for
+the job *job_id* and all of its descendants in the job table; i.e.,
+it is the remaining work in the subtree for this job.
+When more jobs are ready than there are processes to run them,
+jobs with larger priority are run first.
+This tends to start large subtrees early and avoid a long serial
+tail at the end of a cascade.
+
+Data Weighted Priority
+**********************
+If :ref:`option_all_table@job_priority` is ``data`` ,
+the weight for each job is one plus the number of rows in the
+root database data table that are for the fit node,
+or one of its descendants.
+
+{xrst_end job_priority}
+'''
+# ----------------------------------------------------------------------------
+import numpy
+# -----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.job_priority
+def job_priority(job_table, job_weight = None) :
+   assert type(job_table) == list
+   if job_weight is not None :
+      assert len(job_weight) == len(job_table)
+   # END_DEF
+   #
+   # priority
+   n_job    = len(job_table)
+   priority = numpy.zeros(n_job, dtype = float)
+   for job_id in range(n_job) :
+      if not job_table[job_id]['prior_only'] :
+         if job_weight is None :
+            priority[job_id] = 1.0
+         else :
+            priority[job_id] = float( job_weight[job_id] )
+   #
+   # priority
+   # The parent of a job is before the job in the job table, so one pass
+   # in reverse order accumulates the weight for each subtree.
+   for job_id in range(n_job - 1, 0, -1) :
+      parent_job_id            = job_table[job_id]['parent_job_id']
+      priority[parent_job_id] += priority[job_id]
+   #
+   # BEGIN_RETURN
+   assert type(priority) == numpy.ndarray
+   assert len(priority) == n_job
+   return priority
+   # END_RETURN
@@ -0,0 +1,237 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin job_progress}
+{xrst_spell
+   eta
+   hh
+   mm
+   ss
+}
+
+Progress and Estimated Time Remaining for a Cascade
+###################################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+Purpose
+*******
+This routine summarizes the current state of a cascade using
+the job status journal; i.e., the job queue database.
+It only reads the database, so it can be called by any process,
+on any host that mounts the directory containing the database,
+while the cascade is running.
+
+job_queue_database
+******************
+is the name of a job queue database created by :ref:`create_job_queue-name` .
+
+n_worker
+********
+is the number of processes that are running jobs
+(usually :ref:`option_all_table@max_number_cpu` ).
+If more jobs than this are currently running,
+the number of running jobs is used in its place.
+
+progress
+********
+The return value *progress* is a ``dict`` with the following keys:
+
+.. csv-table::
+   :header-rows: 1
+
+   Key,              Meaning
+   unix_time,        time at which this progress was computed
+   status_count,     ``dict`` mapping each job status to its number of jobs
+   running,          ``list`` with one ``dict`` for each running job
+   elapsed_time,     seconds since the first job in this run started
+   jobs_per_hour,    number of jobs fit per hour during this run
+   mean_job_time,    mean time in seconds for the jobs finished in this run
+   percent_complete, percent of the jobs (that are not skipped) finished
+   eta_seconds,      estimated time in seconds until all the jobs finish
+   line,             a one line human readable summary of this information
+
+A job has finished if its status is done, error, or abort.
+The *elapsed_time* , *jobs_per_hour* , *mean_job_time* , and *eta_seconds*
+values are None if they cannot be computed yet; e.g.,
+before the first job in this run finishes.
+
+running
+=======
+Each element of this list has the keys
+job_name, host_name, process_id, and elapsed_time
+(seconds since the job started).
+
+eta_seconds
+===========
+Let *mean_job_time* be the mean time for the jobs that finished in this run.
+The remaining work is *mean_job_time* times the number of
+jobs that are waiting, ready, or running,
+minus the time already spent on the running jobs.
+The first estimate is the remaining work divided by *n_worker* .
+Jobs in the remaining subtree cannot start before their parent finishes.
+The second estimate is *mean_job_time* times the number of jobs in the
+longest chain of waiting and ready jobs, where each job in the chain
+is the parent of the next.
+The value of *eta_seconds* is the maximum of these two estimates.
+
+line
+====
+This line has the form
+
+| *date* *time* done *n_done* / *n_job* ( *percent* %) run *n_run*
+| ready *n_ready* wait *n_wait* error *n_error* abort *n_abort*
+| rate *jobs_per_hour* /h eta *hh* : *mm* : *ss*
+
+(on one line) where *n_job* is the number of jobs that are not skipped.
+
+{xrst_end job_progress}
+'''
+# ----------------------------------------------------------------------------
+import time
+import sqlite3
+import datetime
+# ----------------------------------------------------------------------------
+# duration_str = get_duration_str(seconds)
+def get_duration_str(seconds) :
+   if seconds is None :
+      return 'unknown'
+   seconds = int( round(seconds) )
+   hours   = seconds // 3600
+   minutes = (seconds % 3600) // 60
+   seconds = seconds % 60
+   return f'{hours}:{minutes:02d}:{seconds:02d}'
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.job_progress
+def job_progress(job_queue_database, n_worker) :
+   assert type(job_queue_database) == str
+   assert type(n_worker) == int
+   assert n_worker > 0
+   # END_DEF
+   #
+   # unix_time
+   unix_time = time.time()
+   #
+   # row_list
+   connection = sqlite3.connect(job_queue_database, timeout = 60.0)
+   command  = 'SELECT job_name, parent_job_id, job_status, host_name, '
+   command += 'process_id, start_time, end_time FROM job_queue ORDER BY job_id'
+   row_list = connection.execute(command).fetchall()
+   connection.close()
+   #
+   # status_count
+   status_count = dict()
+   for name in [ 'skip', 'wait', 'ready', 'run', 'done', 'error', 'abort' ] :
+      status_count[name] = 0
+   for row in row_list :
+      status_count[ row[2] ] += 1
+   #
+   # running, first_start, job_time_list, remaining_chain
+   running         = list()
+   first_start     = None
+   job_time_list   = list()
+   remaining_chain = [0] * len(row_list)
+   for (job_id, row) in enumerate(row_list) :
+      (job_name, parent_job_id, job_status, host_name,
+         process_id, start_time, end_time) = row
+      #
+      # first_start
+      if start_time is not None :
+         if first_start is None or start_time < first_start :
+            first_start = start_time
+      #
+      # running
+      if job_status == 'run' and start_time is not None :
+         running.append( {
+            'job_name'     : job_name,
+            'host_name'    : host_name,
+            'process_id'   : process_id,
+            'elapsed_time' : unix_time - start_time,
+         } )
+      #
+      # job_time_list
+      if job_status in [ 'done', 'error' ] and end_time is not None :
+         job_time_list.append( end_time - start_time )
+      #
+      # remaining_chain
+      # parent_job_id < job_id so the parent value has already been computed
+      if job_status in [ 'wait', 'ready' ] :
+         remaining_chain[job_id] = 1
+         if parent_job_id is not None :
+            remaining_chain[job_id] += remaining_chain[parent_job_id]
+   #
+   # n_job, n_finished, n_remaining
+   n_job       = len(row_list) - status_count['skip']
+   n_finished  = status_count['done']
+   n_finished += status_count['error'] + status_count['abort']
+   n_remaining = n_job - n_finished
+   #
+   # percent_complete
+   if n_job == 0 :
+      percent_complete = 100.0
+   else :
+      percent_complete = 100.0 * n_finished / n_job
+   #
+   # elapsed_time, jobs_per_hour
+   elapsed_time  = None
+   jobs_per_hour = None
+   if first_start is not None :
+      elapsed_time = unix_time - first_start
+      if elapsed_time > 0.0 :
+         jobs_per_hour = 3600.0 * len(job_time_list) / elapsed_time
+   #
+   # mean_job_time
+   mean_job_time = None
+   if len(job_time_list) > 0 :
+      mean_job_time = sum(job_time_list) / len(job_time_list)
+   #
+   # eta_seconds
+   eta_seconds = None
+   if n_remaining == 0 :
+      eta_seconds = 0.0
+   elif mean_job_time is not None :
+      remaining_work = n_remaining * mean_job_time
+      for job in running :
+         remaining_work -= min(job['elapsed_time'], mean_job_time)
+      n_parallel  = max(n_worker, len(running) )
+      eta_seconds = max(
+         remaining_work / n_parallel, max(remaining_chain) * mean_job_time
+      )
+   #
+   # line
+   now   = datetime.datetime.fromtimestamp(unix_time)
+   line  = now.strftime('%Y-%m-%d %H:%M:%S')
+   line += f' done {status_count["done"]}/{n_job}'
+   line += f' ({percent_complete:.0f}%)'
+   for name in [ 'run', 'ready', 'wait', 'error', 'abort' ] :
+      line += f' {name} {status_count[name]}'
+   if jobs_per_hour is None :
+      line += ' rate unknown'
+   else :
+      line += f' rate {jobs_per_hour:.1f}/h'
+   line += ' eta ' + get_duration_str(eta_seconds)
+   #
+   # progress
+   progress = {
+      'unix_time'        : unix_time,
+      'status_count'     : status_count,
+      'running'          : running,
+      'elapsed_time'     : elapsed_time,
+      'jobs_per_hour'    : jobs_per_hour,
+      'mean_job_time'    : mean_job_time,
+      'percent_complete' : percent_complete,
+      'eta_seconds'      : eta_seconds,
+      'line'             : line,
+   }
+   # BEGIN_RETURN
+   assert type(progress) == dict
+   return progress
+   # END_RETURN
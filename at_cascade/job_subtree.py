@@ -0,0 +1,101 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin job_subtree}
+{xrst_spell
+   numpy
+}
+
+Index of the Subtree Below Each Job
+###################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+job_table
+*********
+Is the :ref:`create_job_table@job_table` for this analysis.
+The direct children of each job are contiguous in the job table,
+but the descendants of a job are not.
+
+subtree
+*******
+The return value *subtree* is a ``tuple`` with the following three
+numpy integer arrays, each with length equal to the length of *job_table* :
+
+   ( *subtree_order* , *subtree_begin* , *subtree_end* )
+
+subtree_order
+=============
+This is the job_id values in depth first (pre) order; i.e.,
+each job is followed by all of its descendants.
+
+subtree_begin
+=============
+For each job_id, *subtree_order* [ *subtree_begin* [ *job_id* ] ]
+is equal to *job_id* .
+
+subtree_end
+===========
+For each job_id, the job and all of its descendants are
+
+   *subtree_order* [ *subtree_begin* [ *job_id* ] : *subtree_end* [ *job_id* ] ]
+
+and the descendants (not including the job) are
+
+   *subtree_order* [ *subtree_begin* [ *job_id* ] + 1 : *subtree_end* [ *job_id* ] ]
+
+This can be used to access the descendants of a job in a numpy array,
+indexed by job_id, without searching the job table.
+
+{xrst_end job_subtree}
+'''
+import numpy
+# -----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.job_subtree
+def job_subtree(job_table) :
+   assert type(job_table) == list
+   # END_DEF
+   #
+   # subtree_order, subtree_begin, subtree_end
+   n_job         = len(job_table)
+   subtree_order = numpy.empty(n_job, dtype = int)
+   subtree_begin = numpy.empty(n_job, dtype = int)
+   subtree_end   = numpy.empty(n_job, dtype = int)
+   #
+   # stack
+   # A job_id on the stack is the start of its subtree; -1 - job_id is
+   # its end (all its descendants have been placed in subtree_order).
+   index = 0
+   stack = [ 0 ]
+   while len(stack) > 0 :
+      job_id = stack.pop()
+      if job_id < 0 :
+         subtree_end[-1 - job_id] = index
+      else :
+         subtree_order[index]  = job_id
+         subtree_begin[job_id] = index
+         index                += 1
+         stack.append( -1 - job_id )
+         start_child_job_id = job_table[job_id]['start_child_job_id']
+         end_child_job_id   = job_table[job_id]['end_child_job_id']
+         child_range        = range(start_child_job_id, end_child_job_id)
+         for child_job_id in reversed( child_range ) :
+            stack.append( child_job_id )
+   assert index == n_job
+   #
+   # subtree
+   subtree = (subtree_order, subtree_begin, subtree_end)
+   #
+   # BEGIN_RETURN
+   assert type(subtree) == tuple
+   assert len(subtree) == 3
+   return subtree
+   # END_RETURN
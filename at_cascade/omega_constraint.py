@@ -73,20 +73,159 @@ Other Tables
 ============
 None of the other tables in the database are modified.
 
+Speed
+*****
+The omega data for all the nodes, and the children of each node,
+are computed once per process (and all node database) and stored
+in a numpy array indexed by node, split reference, age, and time;
+see :ref:`cascade_context-name` .
+The constraints for all the children of *parent_node* are then computed
+using this array.
+
 {xrst_end omega_constraint}
 '''
 # ----------------------------------------------------------------------------
+import os
 import copy
+import math
+import numpy
 import dismod_at
 import at_cascade
-from math import log
 # ----------------------------------------------------------------------------
-def child_node_id_list(node_table, parent_node_id) :
-   result = list()
-   for (node_id, row) in enumerate(node_table) :
-      if row['parent'] == parent_node_id :
-         result.append(node_id)
-   return result
+# omega_info = get_omega_info(context, root_database)
+#
+# context
+# is the cascade_context for the all node database.
+#
+# root_database
+# is the name of the root database.
+#
+# omega_info
+# is a dict with the following keys, it is cached in context.cache
+# and only recomputed when the root database changes.
+#
+# omega_info['root_table'][name]
+# is the root database table with the specified name for name equal to
+# age, time, and node.
+#
+# omega_info['children'][node_id]
+# is the list of node_id values for the children of node_id.
+#
+# omega_info['age_id'], omega_info['time_id']
+# are numpy arrays, with length n_omega_age * n_omega_time, containing the
+# age_id and time_id for each omega grid point (time index varies fastest).
+#
+# omega_info['omega'][node_id, split_index, ij]
+# is the omega_all_value for node_id, split_index, and grid point index ij.
+# Here split_index is the split_reference_id, or zero if it is None.
+#
+# omega_info['has_omega'][node_id, split_index]
+# is true (false) if node_id has (does not have) omega data for split_index.
+#
+def get_omega_info(context, root_database) :
+   #
+   # root_stat
+   file_stat = os.stat(root_database)
+   root_stat = (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+   #
+   # omega_info
+   if 'omega_info' in context.cache :
+      omega_info = context.cache['omega_info']
+      if omega_info['root_stat'] == root_stat :
+         return omega_info
+   #
+   # all_tables
+   all_tables = dict()
+   for name in [
+      'omega_all',
+      'omega_index',
+      'omega_age_grid',
+      'omega_time_grid',
+      'split_reference',
+   ] :
+      all_tables[name] = context.get_table(name)
+   #
+   # n_omega_age, n_omega_time, n_omega_ij
+   n_omega_age  = len( all_tables['omega_age_grid'] )
+   n_omega_time = len( all_tables['omega_time_grid'] )
+   n_omega_ij   = n_omega_age * n_omega_time
+   #
+   # root_table
+   connection = dismod_at.create_connection(
+      root_database, new = False, readonly = True
+   )
+   root_table = dict()
+   for name in [ 'age', 'time', 'node' ] :
+      root_table[name] = dismod_at.get_table_dict(connection, name)
+   connection.close()
+   #
+   # check omega_age_grid, omega_time_grid
+   for row in all_tables['omega_age_grid'] :
+      age_id = row['age_id']
+      if age_id >= len( root_table['age'] ) :
+         msg  = f'The age_id {age_id} not valid for the root_database'
+         msg += f'\nbut it appears in the omega_age_grid table '
+         msg += f'of the all_node_database'
+         assert False, msg
+   for row in all_tables['omega_time_grid'] :
+      time_id = row['time_id']
+      if time_id >= len( root_table['time'] ) :
+         msg  = f'The time_id {time_id} not valid for the root_database'
+         msg += f'\nbut it appears in the omega_time_grid table '
+         msg += f'of the all_node_database'
+         assert False, msg
+   #
+   # children
+   n_node   = len( root_table['node'] )
+   children = [ list() for node_id in range(n_node) ]
+   for (node_id, row) in enumerate( root_table['node'] ) :
+      if row['parent'] is not None :
+         children[ row['parent'] ].append(node_id)
+   #
+   # age_id, time_id
+   age_id  = [ row['age_id'] for row in all_tables['omega_age_grid'] ]
+   time_id = [ row['time_id'] for row in all_tables['omega_time_grid'] ]
+   age_id  = numpy.repeat( numpy.array(age_id, dtype = int), n_omega_time)
+   time_id = numpy.tile( numpy.array(time_id, dtype = int), n_omega_age)
+   #
+   # omega_all_value
+   omega_all_value = numpy.array(
+      [ row['omega_all_value'] for row in all_tables['omega_all'] ],
+      dtype = float,
+   )
+   #
+   # omega, has_omega
+   n_split   = max(1, len( all_tables['split_reference'] ) )
+   omega     = numpy.zeros( (n_node, n_split, n_omega_ij), dtype = float )
+   has_omega = numpy.zeros( (n_node, n_split), dtype = bool )
+   for row in all_tables['omega_index'] :
+      omega_all_id = row['omega_all_id']
+      if omega_all_id % n_omega_ij != 0 :
+         msg  = 'omega_index table: Expect omega_all_id to be a multipler '
+         msg += 'of n_omega_age * n_omega_time\n'
+         msg += f'omega_all_id = {omega_all_id} '
+         msg += f'n_omega_age = {n_omega_age} '
+         msg += f'n_omega_time = {n_omega_time} '
+         assert False, msg
+      node_id     = row['node_id']
+      split_index = row['split_reference_id']
+      if split_index is None :
+         split_index = 0
+      omega[node_id, split_index, :] = \
+         omega_all_value[omega_all_id : omega_all_id + n_omega_ij]
+      has_omega[node_id, split_index] = True
+   #
+   omega_info = {
+      'root_stat'   : root_stat ,
+      'root_table'  : root_table ,
+      'children'    : children ,
+      'age_id'      : age_id ,
+      'time_id'     : time_id ,
+      'omega'       : omega ,
+      'has_omega'   : has_omega ,
+   }
+   context.cache['omega_info'] = omega_info
+   return omega_info
 # ----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.omega_constraint
@@ -99,9 +238,7 @@ def omega_constraint(
    # END_DEF
    #
    # all_tables
-   connection        = dismod_at.create_connection(
-      all_node_database, new = False, readonly = True
-   )
+   context    = at_cascade.cascade_context(all_node_database)
    all_tables = dict()
    for name in [
       'option_all',
@@ -111,8 +248,7 @@ def omega_constraint(
       'omega_time_grid',
       'split_reference',
    ] :
-      all_tables[name] = dismod_at.get_table_dict(connection, name)
-   connection.close()
+      all_tables[name] = context.get_table(name)
    #
    # case where omega constrained to zero
    if len( all_tables['omega_time_grid']) == 0 :
@@ -132,6 +268,9 @@ def omega_constraint(
          root_database      = row['option_value']
    assert root_database != None
    #
+   # omega_info
+   omega_info = get_omega_info(context, root_database)
+   #
    # fit_tables
    fit_or_root = at_cascade.fit_or_root_class(
       fit_database, root_database
@@ -139,12 +278,9 @@ def omega_constraint(
    fit_tables   = dict()
    fit_null_row = dict()
    for name in [
-      'age',
-      'time',
       'covariate',
       'nslist',
       'nslist_pair',
-      'node',
       'option',
       'rate',
       'smooth',
@@ -153,6 +289,7 @@ def omega_constraint(
       fit_tables[name]   = fit_or_root.get_table(name)
       fit_null_row[name] = fit_or_root.null_row(name)
    fit_or_root.close()
+   fit_tables['node'] = omega_info['root_table']['node']
    #
    # check some fit_database assumptions
    assert len( fit_tables['nslist'] ) == 0
@@ -162,20 +299,6 @@ def omega_constraint(
          assert row['parent_smooth_id'] is None
          assert row['child_smooth_id'] is None
          assert row['child_nslist_id'] is None
-   for row in all_tables['omega_age_grid'] :
-      age_id = row['age_id']
-      if age_id >= len( fit_tables['age'] ) :
-         msg  = f'The age_id {age_id} not valid for the root_database'
-         msg += f'\nbut it appears in the omega_age_grid table '
-         msg += f'of the all_node_database'
-         assert False, msg
-   for row in all_tables['omega_time_grid'] :
-      time_id = row['time_id']
-      if time_id >= len( fit_tables['time'] ) :
-         msg  = f'The time_id {time_id} not valid for the root_database'
-         msg += f'\nbut it appears in the omega_time_grid table '
-         msg += f'of the all_node_database'
-         assert False, msg
    #
    # split_reference_id
    cov_info = at_cascade.get_cov_info(
@@ -199,23 +322,16 @@ def omega_constraint(
       fit_tables['node'], 'node', parent_node_name
    )
    #
-   # node_id2omega_all_id
-   node_id2omega_all_id = dict()
-   for row in all_tables['omega_index'] :
-      omega_all_id = row['omega_all_id']
-      if omega_all_id % (n_omega_age * n_omega_time) != 0 :
-         msg  = 'omega_index table: Expect omega_all_id to be a multipler '
-         msg += 'of n_omega_age * n_omega_time\n'
-         msg += f'omega_all_id = {omega_all_id} '
-         msg += f'n_omega_age = {n_omega_age} '
-         msg += f'n_omega_time = {n_omega_time} '
-         assert False, msg
-      if row['split_reference_id'] == split_reference_id :
-         node_id2omega_all_id[ row['node_id'] ] = omega_all_id
+   # omega, has_omega
+   # omega[node_id, ij] is the omega data for node_id and grid index ij
+   # has_omega[node_id] is true if node_id has omega data
+   split_index = 0 if split_reference_id is None else split_reference_id
+   omega       = omega_info['omega'][:, split_index, :]
+   has_omega   = omega_info['has_omega'][:, split_index]
    #
    # omega_ancestor_node_id
    node_id = parent_node_id
-   while not node_id in node_id2omega_all_id :
+   while not has_omega[node_id] :
       node_id = fit_tables['node'][node_id]['parent']
       if node_id is None :
          msg  = 'omega_constraint: no ancestor of ' + parent_node_name
@@ -225,11 +341,11 @@ def omega_constraint(
    assert not omega_ancestor_node_id is None
    #
    # parent_omega
-   omega_all_id = node_id2omega_all_id[omega_ancestor_node_id]
-   parent_omega   = list()
-   for ij in range( n_omega_age * n_omega_time ) :
-      row  = all_tables['omega_all'][omega_all_id + ij ]
-      parent_omega.append( row['omega_all_value'] )
+   parent_omega = omega[omega_ancestor_node_id, :]
+   #
+   # age_id_list, time_id_list
+   age_id_list  = omega_info['age_id'].tolist()
+   time_id_list = omega_info['time_id'].tolist()
    #
    # parent_smooth_id
    parent_smooth_id  = len(fit_tables['smooth'])
@@ -241,58 +357,62 @@ def omega_constraint(
    fit_tables['smooth'].append( row )
    #
    # fit_tables['smooth_grid']
-   for i in range( n_omega_age ) :
-      for j in range( n_omega_time ) :
-         row     = copy.copy( fit_null_row['smooth_grid'] )
-         age_id  = all_tables['omega_age_grid'][i]['age_id']
-         time_id = all_tables['omega_time_grid'][j]['time_id']
-         ij      = i * n_omega_time + j
-         omega   = parent_omega[ij]
-         row['age_id']      = age_id
-         row['time_id']     = time_id
-         row['smooth_id']   = parent_smooth_id
-         row['const_value'] = omega
-         fit_tables['smooth_grid'].append( row )
+   for (ij, omega_value) in enumerate( parent_omega.tolist() ) :
+      row     = copy.copy( fit_null_row['smooth_grid'] )
+      row['age_id']      = age_id_list[ij]
+      row['time_id']     = time_id_list[ij]
+      row['smooth_id']   = parent_smooth_id
+      row['const_value'] = omega_value
+      fit_tables['smooth_grid'].append( row )
    #
    # child_node_list
-   child_node_list = child_node_id_list(fit_tables['node'], parent_node_id)
+   child_node_list = omega_info['children'][parent_node_id]
+   #
+   # child_omega
+   # child_omega[k, ij] is the omega data for the k-th child
+   child_index = numpy.array(child_node_list, dtype = int)
+   child_omega = omega[child_index, :]
+   child_omega[ ~ has_omega[child_index], : ] = parent_omega
+   #
+   # check parent_omega
+   if len(child_node_list) > 0 and numpy.any( parent_omega <= 0 ) :
+      ij   = int( numpy.argmax( parent_omega <= 0 ) )
+      msg  = 'parent_omega <= 0\n'
+      msg += f'parent_node_id = {parent_node_id}'
+      msg += f', omega_ancestor_node_id = {omega_ancestor_node_id}'
+      msg += f', parent_omega = {parent_omega[ij]}'
+      assert False, msg
+   #
+   # check child_omega
+   if numpy.any( child_omega <= 0 ) :
+      (k, ij)       = numpy.argwhere( child_omega <= 0 )[0]
+      child_node_id = child_node_list[k]
+      msg  = 'child_omega <= 0'
+      msg += f', child_node_id = {child_node_id}'
+      if has_omega[child_node_id] :
+         msg += f'\nomega_ancestor_node_id = {child_node_id}'
+      else :
+         msg += '\nomega_ancestor_node_id = '
+         msg += str(omega_ancestor_node_id)
+      msg += f', child_omega = {child_omega[k, ij]}'
+      assert False, msg
+   #
+   # random_effect
+   # random_effect[k][ij] is the omega random effect for the k-th child.
+   # math.log is used so the values are the same as computing one at a time.
+   ratio         = child_omega / parent_omega
+   random_effect = list( map( math.log, ratio.ravel().tolist() ) )
+   n_omega_ij    = n_omega_age * n_omega_time
+   random_effect = [
+      random_effect[k * n_omega_ij : (k + 1) * n_omega_ij ]
+      for k in range( len(child_node_list) )
+   ]
    #
    # nslist_id
    nslist_id = len( fit_tables['nslist'] )
    #
    # child_node_id
-   for child_node_id in child_node_list :
-      #
-      # child_omega
-      if not child_node_id in node_id2omega_all_id :
-         child_omega = parent_omega
-      else :
-         omega_all_id = node_id2omega_all_id[child_node_id]
-         child_omega  = list()
-         for ij in range( n_omega_age * n_omega_time ) :
-               row  = all_tables['omega_all'][omega_all_id + ij ]
-               child_omega.append( row['omega_all_value'] )
-      #
-      # random_effect
-      random_effect = list()
-      for ij in range( n_omega_age * n_omega_time ) :
-         if parent_omega[ij] <= 0 :
-            msg  = 'parent_omega <= 0\n'
-            msg += f'parent_node_id = {parent_node_id}'
-            msg += f', omega_ancestor_node_id = {omega_ancestor_node_id}'
-            msg += f', parent_omega = {parent_omega[ij]}'
-            assert False, msg
-         if child_omega[ij] <= 0 :
-            msg  = 'child_omega <= 0'
-            msg += f', child_node_id = {child_node_id}'
-            if child_node_id in node_id2omega_all_id :
-               msg += f'\nomega_ancestor_node_id = {child_node_id}'
-            else :
-               msg += '\nomega_ancestor_node_id = '
-               msg += str(omega_ancestor_node_id)
-            msg += f', child_omega = {child_omega[ij]}'
-            assert False, msg
-         random_effect.append( log( child_omega[ij] / parent_omega[ij] ) )
+   for (k, child_node_id) in enumerate(child_node_list) :
       #
       # smooth_id
       smooth_id = len( fit_tables['smooth'] )
@@ -311,16 +431,13 @@ def omega_constraint(
       fit_tables['smooth'].append( row )
       #
       # fit_tables['smooth_grid']
-      for i in range( n_omega_age ) :
-         for j in range( n_omega_time ) :
-            row     = copy.copy( fit_null_row['smooth_grid'] )
-            age_id  = all_tables['omega_age_grid'][i]['age_id']
-            time_id = all_tables['omega_time_grid'][j]['time_id']
-            row['age_id']      = age_id
-            row['time_id']     = time_id
-            row['smooth_id']   = smooth_id
-            row['const_value'] = random_effect[i * n_omega_time + j]
-            fit_tables['smooth_grid'].append( row )
+      for ij in range( n_omega_ij ) :
+         row     = copy.copy( fit_null_row['smooth_grid'] )
+         row['age_id']      = age_id_list[ij]
+         row['time_id']     = time_id_list[ij]
+         row['smooth_id']   = smooth_id
+         row['const_value'] = random_effect[k][ij]
+         fit_tables['smooth_grid'].append( row )
    #
    # fit_tables['nslist']
    row                = copy.copy( fit_null_row['nslist'] )
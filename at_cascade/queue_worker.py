@@ -0,0 +1,255 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin queue_worker}
+{xrst_spell
+   sqlite
+}
+
+Run Jobs From a Job Queue Database
+##################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+}
+
+Purpose
+*******
+This routine repeatedly claims the ready job with the highest priority
+in a job queue database, runs it, and reports its status.
+Any number of these workers, on any hosts that mount the directory
+containing the database, can run at the same time.
+They do not share any memory, and they communicate only through the
+job queue database.
+
+job_queue_database
+******************
+is the name of a job queue database created by :ref:`create_job_queue-name` .
+The current working directory must be the same as when
+the job queue database was created; i.e., the
+:ref:`create_job_queue@all_node_database` must be relative to the
+current working directory.
+
+trace
+*****
+see :ref:`run_one_job@trace` .
+
+Transactions
+************
+Each change to the job queue is done inside an sqlite
+``BEGIN IMMEDIATE`` transaction, so at most one worker
+can change the database at a time.
+
+#. A worker claims a job by changing its status from ready to run
+   and recording its host name and process id.
+#. If the job succeeds (fails), its status is changed to done (error)
+   using :ref:`set_job_queue_status-name` .
+
+Termination
+***********
+If no job is ready, the worker sleeps for one second and tries again.
+The worker returns when no job is ready or running.
+
+Lost Workers
+************
+If a worker dies while running a job, that job stays in the run state.
+Another worker, on the same host, detects this by checking that the
+corresponding process no longer exists.
+It then changes the status of the job to error and aborts its descendants.
+A worker on one host cannot detect that a process on another host has died.
+
+{xrst_end queue_worker}
+'''
+# ----------------------------------------------------------------------------
+import os
+import time
+import socket
+import sqlite3
+import datetime
+import at_cascade
+import dismod_at
+# ----------------------------------------------------------------------------
+# connection = get_connection(job_queue_database)
+# The isolation_level None means that transactions are begun explicitly
+# (using BEGIN IMMEDIATE) instead of by the python sqlite3 module.
+def get_connection(job_queue_database) :
+   connection = sqlite3.connect(
+      job_queue_database, timeout = 60.0, isolation_level = None
+   )
+   return connection
+# ----------------------------------------------------------------------------
+# job_table = get_job_table(connection)
+def get_job_table(connection) :
+   command  = 'SELECT job_name, fit_node_id, split_reference_id, '
+   command += 'parent_job_id, start_child_job_id, end_child_job_id, '
+   command += 'prior_only FROM job_queue ORDER BY job_id'
+   job_table = list()
+   for row in connection.execute(command) :
+      job_table.append( {
+         'job_name'           : row[0],
+         'fit_node_id'        : row[1],
+         'split_reference_id' : row[2],
+         'parent_job_id'      : row[3],
+         'start_child_job_id' : row[4],
+         'end_child_job_id'   : row[5],
+         'prior_only'         : bool( row[6] ),
+      } )
+   return job_table
+# ----------------------------------------------------------------------------
+# node_table = get_node_table(all_node_database)
+def get_node_table(all_node_database) :
+   #
+   # root_database
+   connection = dismod_at.create_connection(
+      all_node_database, new = False, readonly = True
+   )
+   option_all_table = dismod_at.get_table_dict(connection, 'option_all')
+   connection.close()
+   root_database = None
+   for row in option_all_table :
+      if row['option_name'] == 'root_database' :
+         root_database = row['option_value']
+   assert root_database is not None
+   #
+   # node_table
+   connection = dismod_at.create_connection(
+      root_database, new = False, readonly = True
+   )
+   node_table = dismod_at.get_table_dict(connection, 'node')
+   connection.close()
+   return node_table
+# ----------------------------------------------------------------------------
+# process_exists = check_process(process_id)
+def check_process(process_id) :
+   try :
+      os.kill(process_id, 0)
+   except ProcessLookupError :
+      return False
+   except PermissionError :
+      return True
+   return True
+# ----------------------------------------------------------------------------
+# status_count = get_status_count(connection)
+def get_status_count(connection) :
+   status_count = dict()
+   for name in [ 'skip', 'wait', 'ready', 'run', 'done', 'error', 'abort' ] :
+      status_count[name] = 0
+   command = 'SELECT job_status, COUNT(*) FROM job_queue GROUP BY job_status'
+   for (name, count) in connection.execute(command) :
+      status_count[name] = count
+   return status_count
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.queue_worker
+def queue_worker(job_queue_database, trace = True) :
+   assert type(job_queue_database) == str
+   assert type(trace) == bool
+   # END_DEF
+   #
+   # host_name, process_id
+   host_name  = socket.gethostname()
+   process_id = os.getpid()
+   #
+   # connection
+   connection = get_connection(job_queue_database)
+   #
+   # job_table
+   job_table = get_job_table(connection)
+   #
+   # all_node_database, fit_integrand, fit_type_list
+   command      = 'SELECT option_name, option_value FROM queue_option'
+   queue_option = dict( connection.execute(command).fetchall() )
+   all_node_database = queue_option['all_node_database']
+   fit_type_list     = queue_option['fit_type_list'].split()
+   fit_integrand     = set()
+   for integrand_id in queue_option['fit_integrand'].split() :
+      fit_integrand.add( int(integrand_id) )
+   #
+   # node_table
+   node_table = get_node_table(all_node_database)
+   #
+   while True :
+      #
+      # run_job_id
+      connection.execute('BEGIN IMMEDIATE')
+      command  = "SELECT job_id FROM job_queue WHERE job_status = 'ready' "
+      command += 'ORDER BY priority DESC, job_id LIMIT 1'
+      row      = connection.execute(command).fetchone()
+      if row is not None :
+         run_job_id = row[0]
+         command  = "UPDATE job_queue SET job_status = 'run', "
+         command += 'host_name = ?, process_id = ?, start_time = ? '
+         command += 'WHERE job_id = ?'
+         connection.execute(
+            command, (host_name, process_id, time.time(), run_job_id)
+         )
+         connection.execute('COMMIT')
+      else :
+         #
+         # run_list
+         command  = 'SELECT job_id, process_id FROM job_queue '
+         command += "WHERE job_status = 'run' AND host_name = ?"
+         run_list = connection.execute(command, (host_name,) ).fetchall()
+         #
+         # n_todo
+         command  = 'SELECT COUNT(*) FROM job_queue '
+         command += "WHERE job_status IN ('ready', 'run')"
+         n_todo   = connection.execute(command).fetchone()[0]
+         connection.execute('COMMIT')
+         #
+         # lost workers on this host
+         n_lost = 0
+         for (job_id, other_process_id) in run_list :
+            if not check_process(other_process_id) :
+               job_name = job_table[job_id]['job_name']
+               print( f'queue_worker: lost process running {job_name}' )
+               at_cascade.set_job_queue_status(
+                  job_queue_database, job_id, 'error'
+               )
+               n_lost += 1
+         if n_lost > 0 :
+            continue
+         #
+         if n_todo == 0 :
+            connection.close()
+            return
+         time.sleep(1.0)
+         continue
+      #
+      # job_done, fit_type
+      # the database should not be locked during this operation
+      (job_done, fit_type, peak_rss) = at_cascade.run_one_job(
+         job_table         = job_table,
+         run_job_id        = run_job_id,
+         all_node_database = all_node_database,
+         node_table        = node_table,
+         fit_integrand     = fit_integrand,
+         fit_type_list     = fit_type_list,
+         trace             = trace,
+      )
+      #
+      # job_queue_database
+      if job_done :
+         job_status = 'done'
+      else :
+         job_status = 'error'
+      at_cascade.set_job_queue_status(
+         job_queue_database, run_job_id, job_status
+      )
+      #
+      # status_count
+      status_count = get_status_count(connection)
+      #
+      # print message at end
+      job_name     = job_table[run_job_id]['job_name']
+      now          = datetime.datetime.now()
+      current_time = now.strftime("%H:%M:%S")
+      if job_done :
+         print( f'End:   {current_time}: fit {fit_type:<5} {job_name}' )
+      else :
+         print( f'Error: {current_time}: fit {fit_type:<5} {job_name}' )
+      print( f'       {status_count}' )
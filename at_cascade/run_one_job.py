@@ -0,0 +1,246 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin run_one_job}
+{xrst_spell
+   rss
+}
+
+Try Each Fit Type for One Job
+#############################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+Purpose
+*******
+This routine calls :ref:`fit_one_job-name` for each fit type in
+*fit_type_list* until one of the fits succeeds.
+It does not use any shared memory, so it can be used by a process on
+any host that has access to the :ref:`option_all_table@result_dir` .
+
+job_table
+*********
+This is a :ref:`create_job_table@job_table` containing the jobs
+necessary to fit the :ref:`glossary@fit_goal_set`.
+
+run_job_id
+**********
+This is the :ref:`create_job_table@job_table@job_id`
+for the job that is run.
+This job cannot be a
+:ref:`create_job_table@job_table@prior_only` job.
+
+all_node_database
+*****************
+is a python string specifying the location of the
+:ref:`all_node_db-name`
+relative to the current working directory.
+
+node_table
+**********
+is a ``list`` of ``dict`` containing the node table for this cascade.
+
+fit_integrand
+*************
+is a ``set`` of integrand_id values that occur in the data table; see
+:ref:`get_fit_integrand-name`.
+
+fit_type_list
+*************
+is a ``list`` of fit types that are tried, in order, for this job.
+If a fit fails because there is no data for this job,
+the other fit types are not tried.
+If a fit fails because a command took too long
+(see :ref:`option_all_table@command_timeout` ),
+the next fit type is tried.
+The :ref:`option_all_table@job_timeout` deadline is set once,
+when this routine starts,
+so the next fit type only gets the time that is left for the job.
+
+trace
+*****
+If *trace* is true, the tracing output for this job is written to
+the file ``trace.out`` in the :ref:`glossary@fit_node_dir` for this job.
+Otherwise, it is written to standard output.
+
+result
+******
+The return value *result* is the ``tuple``
+
+   ( *job_done* , *fit_type* , *peak_rss* )
+
+job_done
+========
+is true (false) if one of the fits succeeded (all the fits failed).
+
+fit_type
+========
+is the last fit type that was tried.
+
+peak_rss
+========
+is the :ref:`fit_one_job@peak_rss` for the successful fit.
+If *job_done* is false, this is None.
+
+{xrst_end run_one_job}
+'''
+# ----------------------------------------------------------------------------
+import time
+import datetime
+import at_cascade
+# ----------------------------------------------------------------------------
+# Set this to False when debugging an exception during fit_one_job routine
+catch_exceptions_and_continue = True
+# ----------------------------------------------------------------------------
+def get_result_database_dir(
+   all_node_database, node_table, fit_node_id, fit_split_reference_id
+) :
+   #
+   # context
+   context = at_cascade.cascade_context(all_node_database)
+   #
+   # result_dir
+   result_dir = context.option_all['result_dir']
+   #
+   database_dir = context.database_dir(
+      node_table, fit_node_id, fit_split_reference_id
+   )
+   return f'{result_dir}/{database_dir}'
+# ----------------------------------------------------------------------------
+# job_deadline = get_job_deadline(all_node_database)
+# The time.time() value when the job_timeout for a job that starts now
+# is reached (None if there is no job_timeout option).
+def get_job_deadline(all_node_database) :
+   #
+   # option_all
+   context    = at_cascade.cascade_context(all_node_database)
+   option_all = context.option_all
+   #
+   if 'job_timeout' not in option_all :
+      return None
+   job_timeout = float( option_all['job_timeout'] )
+   if job_timeout <= 0.0 :
+      msg = 'option_all table: job_timeout is not greater than zero'
+      assert False, msg
+   return time.time() + job_timeout
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.run_one_job
+def run_one_job(
+   job_table,
+   run_job_id,
+   all_node_database,
+   node_table,
+   fit_integrand,
+   fit_type_list,
+   trace,
+) :
+   assert type(job_table) == list
+   assert type(run_job_id) == int
+   assert type(all_node_database) == str
+   assert type(node_table) == list
+   assert type(fit_integrand) == set
+   assert type(fit_type_list) == list
+   assert type(trace) == bool
+   # END_DEF
+   #
+   # database_dir
+   row = job_table[run_job_id]
+   fit_node_id            = row['fit_node_id']
+   fit_split_reference_id = row['split_reference_id']
+   result_database_dir = get_result_database_dir(
+      all_node_database,
+      node_table,
+      fit_node_id,
+      fit_split_reference_id
+   )
+   #
+   # job_name
+   job_name = job_table[run_job_id]['job_name']
+   #
+   # prior_only
+   assert not job_table[run_job_id]['prior_only']
+   #
+   # job_deadline
+   # all the fit types for this job share the job_timeout
+   job_deadline = get_job_deadline(all_node_database)
+   #
+   # trace_file_obj
+   trace_file_obj = None
+   if trace :
+      trace_file_name = f'{result_database_dir}/trace.out'
+      trace_file_obj  = open(trace_file_name, 'w')
+   #
+   # job_done, fit_type_index, fit_type, have_data, peak_rss
+   peak_rss       = None
+   job_done       = False
+   have_data      = True
+   fit_type_index = 0
+   while have_data and (not job_done) and (fit_type_index< len(fit_type_list)) :
+      fit_type        = fit_type_list[fit_type_index]
+      fit_type_index += 1
+      #
+      # print message at start of this fit
+      now             = datetime.datetime.now()
+      current_time    = now.strftime("%H:%M:%S")
+      print( f'Begin: {current_time}: fit {fit_type:<5} {job_name}' )
+      #
+      # fit_one_job
+      if not catch_exceptions_and_continue :
+         peak_rss = at_cascade.fit_one_job(
+            job_table         = job_table,
+            run_job_id        = run_job_id ,
+            all_node_database = all_node_database,
+            node_table        = node_table,
+            fit_integrand     = fit_integrand,
+            fit_type          = fit_type,
+            first_fit         = fit_type_index == 1,
+            trace_file_obj    = trace_file_obj,
+            job_deadline      = job_deadline,
+         )
+         #
+         # job_done
+         job_done = True
+      else :
+         try :
+            peak_rss = at_cascade.fit_one_job(
+               job_table         = job_table,
+               run_job_id        = run_job_id ,
+               all_node_database = all_node_database,
+               node_table        = node_table,
+               fit_integrand     = fit_integrand,
+               fit_type          = fit_type,
+               first_fit         = fit_type_index == 1,
+               trace_file_obj    = trace_file_obj,
+               job_deadline      = job_deadline,
+            )
+            #
+            # job_done
+            job_done = True
+         except Exception as e:
+            job_done = False
+            msg      = str(e)
+            if msg.startswith( 'no data: abort' ) :
+               have_data = False
+            print( f'fit {fit_type} {job_name} message: ' + msg )
+   #
+   # trace_file_obj
+   if trace_file_obj != None :
+      trace_file_obj.close()
+   #
+   # result
+   result = (job_done, fit_type, peak_rss)
+   #
+   # BEGIN_RETURN
+   assert type(result) == tuple
+   assert type(result[0]) == bool
+   assert type(result[1]) == str
+   return result
+   # END_RETURN
@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin set_job_queue_status}
+{xrst_spell
+   sqlite
+}
+
+Set the Status of a Job in a Job Queue Database
+###############################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+}
+
+job_queue_database
+******************
+is the name of a job queue database created by :ref:`create_job_queue-name` .
+
+job_id
+******
+is the :ref:`create_job_table@job_table@job_id` for the job.
+
+job_status
+**********
+is the new status for this job and must be one of the following:
+
+run
+===
+The host name and process id for the current process are recorded
+as the process that is running this job.
+The current time is recorded as the start_time for this job.
+
+done
+====
+The current time is recorded as the end_time for this job and the status
+of the children of this job that are waiting is changed to ready.
+
+error
+=====
+The current time is recorded as the end_time for this job and the status
+of all the descendants of this job,
+that are not prior_only jobs, is changed to abort.
+
+Transaction
+***********
+The changes are done inside an sqlite ``BEGIN IMMEDIATE`` transaction,
+so they are not seen by other processes until they are complete.
+If the database is locked by another process,
+this routine waits up to 60 seconds for the lock.
+
+{xrst_end set_job_queue_status}
+'''
+# ----------------------------------------------------------------------------
+import os
+import time
+import socket
+import sqlite3
+# ----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.set_job_queue_status
+def set_job_queue_status(job_queue_database, job_id, job_status) :
+   assert type(job_queue_database) == str
+   assert type(job_id) == int
+   assert job_status in [ 'run', 'done', 'error' ]
+   # END_DEF
+   #
+   # connection
+   # The isolation_level None means that the transaction is begun explicitly.
+   connection = sqlite3.connect(
+      job_queue_database, timeout = 60.0, isolation_level = None
+   )
+   connection.execute('BEGIN IMMEDIATE')
+   #
+   # job_status
+   command = 'UPDATE job_queue SET job_status = ? WHERE job_id = ?'
+   connection.execute(command, (job_status, job_id) )
+   #
+   if job_status == 'run' :
+      #
+      # host_name, process_id, start_time
+      command  = 'UPDATE job_queue SET host_name = ?, process_id = ?, '
+      command += 'start_time = ?, end_time = NULL WHERE job_id = ?'
+      connection.execute(
+         command, (socket.gethostname(), os.getpid(), time.time(), job_id)
+      )
+   else :
+      #
+      # end_time
+      command = 'UPDATE job_queue SET end_time = ? WHERE job_id = ?'
+      connection.execute(command, (time.time(), job_id) )
+   #
+   if job_status == 'done' :
+      #
+      # start_child_job_id, end_child_job_id
+      command  = 'SELECT start_child_job_id, end_child_job_id '
+      command += 'FROM job_queue WHERE job_id = ?'
+      (start_child_job_id, end_child_job_id) = \
+         connection.execute(command, (job_id,) ).fetchone()
+      #
+      # job_status for children
+      command  = "UPDATE job_queue SET job_status = 'ready' "
+      command += "WHERE job_id >= ? AND job_id < ? AND job_status = 'wait'"
+      connection.execute(command, (start_child_job_id, end_child_job_id) )
+   elif job_status == 'error' :
+      #
+      # subtree_begin, subtree_end
+      command  = 'SELECT subtree_begin, subtree_end '
+      command += 'FROM job_queue WHERE job_id = ?'
+      (subtree_begin, subtree_end) = \
+         connection.execute(command, (job_id,) ).fetchone()
+      #
+      # job_status for descendants
+      command  = "UPDATE job_queue SET job_status = 'abort' "
+      command += 'WHERE subtree_begin > ? AND subtree_begin < ? '
+      command += "AND job_status != 'skip'"
+      connection.execute(command, (subtree_begin, subtree_end) )
+   #
+   connection.execute('COMMIT')
+   connection.close()
+   return
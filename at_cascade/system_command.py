@@ -0,0 +1,194 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+'''
+{xrst_begin system_command}
+{xrst_spell
+   rss
+   stderr
+   stdout
+}
+
+Run a System Command and Return its Resource Usage
+##################################################
+
+Prototype
+*********
+{xrst_literal ,
+   # BEGIN_DEF, # END_DEF
+   # BEGIN_RETURN, # END_RETURN
+}
+
+Purpose
+*******
+This is similar to ``dismod_at.system_command_prc`` with
+*return_stdout* and *return_stderr* false.
+In addition, it returns the resources used by the command.
+
+command
+*******
+is a ``list`` of ``str`` containing the program and its arguments.
+
+file_stdout
+***********
+If this is None, the command is printed and its standard output
+is not redirected.
+Otherwise, it is a ``io.TextIOBase`` object
+corresponding to a file that is opened for writing.
+In this case, the command, and its standard output, are written to this file.
+
+timeout
+*******
+If *timeout* is None, there is no limit on the time for the command.
+Otherwise, it is a ``float`` specifying the maximum wall clock time,
+in seconds, for the command.
+If the command has not completed by this time, it is killed and
+an exception is raised with a message that starts with
+``system_command timeout:`` .
+
+stderr
+******
+If the command writes to standard error,
+it is printed (or written to *file_stdout* ) after the command completes.
+
+Error
+*****
+If the command's return code is not zero,
+an exception is raised with a message that starts with
+``system_command failed:`` .
+
+usage
+*****
+The return value *usage* is a ``dict`` with the following keys:
+
+.. csv-table::
+   :header-rows: 1
+
+   Key,            Meaning
+   wall_time,      elapsed time in seconds
+   user_time,      user cpu time in seconds used by the command
+   system_time,    system cpu time in seconds used by the command
+   max_rss,        maximum resident set size in megabytes for the command
+
+The time values are ``float`` .
+If ``os.wait4`` is not available on this system,
+the cpu time and maximum resident set size values are None.
+
+{xrst_end system_command}
+'''
+# -----------------------------------------------------------------------------
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+# -----------------------------------------------------------------------------
+# returncode = get_returncode(status)
+# convert a status returned by os.wait4 to a subprocess returncode
+def get_returncode(status) :
+   if os.WIFSIGNALED(status) :
+      return - os.WTERMSIG(status)
+   return os.WEXITSTATUS(status)
+# -----------------------------------------------------------------------------
+# BEGIN_DEF
+# at_cascade.system_command
+def system_command(command, file_stdout = None, timeout = None) :
+   assert type(command) == list
+   if file_stdout is not None :
+      assert isinstance(file_stdout, io.TextIOBase)
+   if timeout is not None :
+      assert type(timeout) == float
+   # END_DEF
+   #
+   # command_str
+   command_str = ' '.join(command)
+   if file_stdout is None :
+      print( command_str )
+      sys.stdout.flush()
+   else :
+      file_stdout.write( command_str + '\n' )
+      file_stdout.flush()
+   #
+   # usage
+   usage = {
+      'wall_time'   : None,
+      'user_time'   : None,
+      'system_time' : None,
+      'max_rss'     : None,
+   }
+   #
+   # file_stderr
+   # A temporary file (instead of a pipe) is used for standard error
+   # so that the command cannot block when writing a lot of output.
+   with tempfile.TemporaryFile(mode = 'w+') as file_stderr :
+      #
+      # process
+      start_time = time.time()
+      process    = subprocess.Popen(
+         command,
+         stdout   = file_stdout,
+         stderr   = file_stderr,
+         encoding = 'utf-8',
+      )
+      #
+      # timer, timed_out
+      # The timer kills the process if it does not complete in time.
+      timer     = None
+      timed_out = threading.Event()
+      if timeout is not None :
+         def kill_process() :
+            timed_out.set()
+            process.kill()
+         timer = threading.Timer( max(timeout, 0.0), kill_process )
+         timer.start()
+      #
+      # returncode, usage
+      if hasattr(os, 'wait4') :
+         (pid, status, rusage) = os.wait4(process.pid, 0)
+         returncode            = get_returncode(status)
+         process.returncode    = returncode
+         #
+         # max_rss
+         # ru_maxrss is in bytes on darwin and in kilobytes otherwise
+         if sys.platform == 'darwin' :
+            max_rss = rusage.ru_maxrss / (1024.0 * 1024.0)
+         else :
+            max_rss = rusage.ru_maxrss / 1024.0
+         #
+         usage['user_time']   = rusage.ru_utime
+         usage['system_time'] = rusage.ru_stime
+         usage['max_rss']     = max_rss
+      else :
+         returncode = process.wait()
+      usage['wall_time'] = time.time() - start_time
+      if timer is not None :
+         timer.cancel()
+      #
+      # stderr
+      file_stderr.seek(0)
+      stderr = file_stderr.read()
+   #
+   # stderr
+   if stderr != '' :
+      if file_stdout is None :
+         print( stderr )
+      else :
+         file_stdout.write( stderr )
+         file_stdout.flush()
+   #
+   if returncode != 0 and timed_out.is_set() :
+      msg  = 'system_command timeout: '
+      msg += f'after {timeout} seconds, command = {command_str}'
+      assert False, msg
+   if returncode != 0 :
+      msg  = 'system_command failed: '
+      msg += f'returncode = {returncode}, command = {command_str}'
+      assert False, msg
+   #
+   # BEGIN_RETURN
+   assert type(usage) == dict
+   return usage
+   # END_RETURN
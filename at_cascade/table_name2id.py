@@ -1,6 +1,6 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 # SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
-# SPDX-FileContributor: 2021-24 Bradley M. Bell
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
 # ----------------------------------------------------------------------------
 r'''
 {xrst_begin table_name2id}
@@ -37,10 +37,52 @@ row_id
 ******
 This is the index of the row in the table where
 *row_name* occurs. An assert will occur if there is no such row.
+If *row_name* occurs more than once, the last row where it occurs is used.
+
+Index
+*****
+The first call for a *table* and *tbl_name* builds a
+``dict`` that maps each name to its row index.
+This index is cached and used by the following calls with the same
+*table* object (so a loop over rows is linear, not quadratic,
+in the size of the table).
+The index is rebuilt when the number of rows in *table* has changed,
+when the cached row for *row_name* no longer has that name,
+or when *row_name* is not in the index.
+A table that is changed in place should not create a second row with
+a name that is already in the table.
+Only the most recently used tables are kept in the cache.
 
 {xrst_end table_name2id}
 '''
 # -----------------------------------------------------------------------------
+# name2id_cache
+# name2id_cache[ (id(table), tbl_name) ] = (table, n_row, name2id) where
+# n_row is the number of rows in table when name2id was built and
+# name2id[row_name] is the last row_id with the specified name.
+# Keeping a reference to table makes sure that id(table) is not reused.
+name2id_cache     = dict()
+name2id_cache_max = 16
+#
+# name2id = get_name2id(table, tbl_name, rebuild)
+def get_name2id(table, tbl_name, rebuild) :
+   key   = ( id(table), tbl_name )
+   entry = name2id_cache.pop(key, None)
+   if entry != None and not rebuild and entry[1] == len(table) :
+      name2id = entry[2]
+   else :
+      col_name = tbl_name + '_name'
+      name2id  = dict()
+      for (index, row) in enumerate(table) :
+         name2id[ row[col_name] ] = index
+   #
+   # name2id_cache
+   # the most recently used entry is last
+   while len(name2id_cache) >= name2id_cache_max :
+      del name2id_cache[ next( iter(name2id_cache) ) ]
+   name2id_cache[key] = (table, len(table), name2id)
+   return name2id
+# -----------------------------------------------------------------------------
 # BEGIN_DEF
 # at_cascade.table_name2id
 def table_name2id(
@@ -50,10 +92,13 @@ def table_name2id(
    assert type(tbl_name) == str
    # END_DEF
    col_name = tbl_name + '_name'
-   row_id   = None
-   for (index, row) in enumerate(table) :
-      if row[col_name] == row_name :
-         row_id = index
+   #
+   # row_id
+   name2id = get_name2id(table, tbl_name, rebuild = False)
+   row_id  = name2id.get(row_name, None)
+   if row_id == None or table[row_id][col_name] != row_name :
+      name2id = get_name2id(table, tbl_name, rebuild = True)
+      row_id  = name2id.get(row_name, None)
    if row_id == None :
       msg  = f'table_name2id: "{row_name}" '
       msg += f'is not presnet in column "{col_name}" of "{tbl_name}" table.'
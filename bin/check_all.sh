@@ -73,7 +73,7 @@ do
 done
 # -----------------------------------------------------------------------------
 list='
-   at_cascade/fit_one_process.py
+   at_cascade/run_one_job.py
    at_cascade/csv/pre_one_process.py
 '
 for file in $list
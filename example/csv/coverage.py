@@ -139,7 +139,6 @@ import os
 import sys
 import shutil
 import numpy
-import scipy
 # import at_cascade with a preference current directory version
 current_directory = os.getcwd()
 if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
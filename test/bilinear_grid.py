@@ -0,0 +1,214 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test the bilinear spline evaluation at arrays of points and for many
+# columns at once, compare with values computed by the previous version of
+# bilinear (which used linear scipy splines), and report the time for
+# evaluating the columns at once and one point at a time.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# check_scipy_baseline()
+# The values in scipy_value were computed using the previous version of
+# bilinear; i.e., scipy.interpolate.RectBivariateSpline and
+# scipy.interpolate.UnivariateSpline with degree one.
+# They are the same up to floating point rounding; see bilinear@Scipy .
+def check_scipy_baseline() :
+   #
+   # x_grid, y_grid, z_list
+   x_grid = [ 0.0, 1.0, 5.0, 20.0, 50.0, 80.0, 100.0 ]
+   y_grid = [ 1990.0, 2000.0, 2005.0, 2010.0, 2020.0 ]
+   z_list = [ 'both', 'const_x', 'const_y', 'const' ]
+   #
+   # table
+   table = list()
+   for x in x_grid :
+      for y in y_grid :
+         row = {
+            'x'       : x,
+            'y'       : y,
+            'both'    : 1.0 / (3.0 + x / 7.0 + (y - 1990.0) / 11.0),
+            'const_x' : 1.0 / (3.0 + (y - 1990.0) / 11.0),
+            'const_y' : 1.0 / (3.0 + x / 7.0),
+            'const'   : 1.0 / 3.0,
+         }
+         table.append(row)
+   #
+   # point_list
+   # Some of the points are grid points and some are outside the grid.
+   point_list = [
+      (-10.0, 1980.0), (0.0, 1990.0), (0.5, 1995.0), (3.0, 2001.0),
+      (5.0, 2004.0), (12.5, 2005.0), (20.0, 2007.5), (33.3, 2012.0),
+      (50.0, 2020.0), (64.0, 2019.0), (79.9, 1999.9), (90.0, 2030.0),
+      (100.0, 2003.0), (120.0, 2015.0),
+   ]
+   #
+   # scipy_value
+   scipy_value = dict()
+   scipy_value['both'] = [
+      0.3333333333333333, 0.3333333333333333, 0.2885309941995988,
+      0.22711809900879565, 0.20080318399954025, 0.1677100774623268,
+      0.13438842834361953, 0.10753183622074565, 0.07769929364278508,
+      0.06910840462672532, 0.0653244727810364, 0.054128364202094555,
+      0.054156998880624474, 0.051156448420269715,
+   ]
+   scipy_value['const_x'] = [
+      0.3333333333333333, 0.3333333333333333, 0.2945736434108527,
+      0.250484496124031, 0.23449612403100778, 0.22916666666666669,
+      0.21835691823899372, 0.20095837076969153, 0.17460317460317462,
+      0.17789757412398924, 0.25658914728682103, 0.17460317460317462,
+      0.23982558139534887, 0.19107517220724768,
+   ]
+   scipy_value['const_y'] = [
+      0.3333333333333333, 0.3333333333333333, 0.32575757575757575,
+      0.2937062937062937, 0.2692307692307692, 0.2199812382739212,
+      0.17073170731707316, 0.1387495705942975, 0.09859154929577466,
+      0.08492539394784548, 0.06940454608841164, 0.06357908518124539,
+      0.05785123966942149, 0.05785123966942149,
+   ]
+   scipy_value['const'] = len(point_list) * [ 1.0 / 3.0 ]
+   #
+   # spline_dict
+   (x_check, y_check, spline_dict) = at_cascade.bilinear(
+      table = table, x_name = 'x', y_name = 'y', z_list = z_list
+   )
+   #
+   # check
+   x = numpy.array( [ point[0] for point in point_list ] )
+   y = numpy.array( [ point[1] for point in point_list ] )
+   for z_name in z_list :
+      value = spline_dict[z_name](x, y)
+      check = numpy.array( scipy_value[z_name] )
+      assert numpy.all( numpy.abs(value - check) <= 1e-14 * numpy.abs(check) )
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # x_grid, y_grid
+   x_grid = [ 0.0, 1.0, 5.0, 20.0, 50.0, 80.0, 100.0 ]
+   y_grid = [ 1990.0, 2000.0, 2005.0, 2010.0, 2020.0 ]
+   n_x    = len(x_grid)
+   n_y    = len(y_grid)
+   #
+   # z_list, z_value
+   # z_value[z_name][x_index, y_index]
+   z_list  = list()
+   z_value = dict()
+   for k in range(20) :
+      z_name  = f'z_{k}'
+      z_grid  = numpy.array(
+         [ [ random.uniform(0.0, 1.0) for y in y_grid ] for x in x_grid ]
+      )
+      if k % 4 == 1 :
+         z_grid[:, :] = z_grid[0:1, :]
+      if k % 4 == 2 :
+         z_grid[:, :] = z_grid[:, 0:1]
+      if k % 4 == 3 :
+         z_grid[:, :] = z_grid[0, 0]
+      z_list.append( z_name )
+      z_value[z_name] = z_grid
+   #
+   # table
+   table = list()
+   for (x_index, x) in enumerate(x_grid) :
+      for (y_index, y) in enumerate(y_grid) :
+         row = { 'x' : x, 'y' : y }
+         for z_name in z_list :
+            row[z_name] = z_value[z_name][x_index, y_index]
+         table.append(row)
+   random.shuffle(table)
+   #
+   # spline_dict
+   start_time = time.time()
+   (x_check, y_check, spline_dict) = at_cascade.bilinear(
+      table = table, x_name = 'x', y_name = 'y', z_list = z_list
+   )
+   assert x_check == x_grid
+   assert y_check == y_grid
+   #
+   # x, y
+   # Some of the points are grid points and some are outside the grid.
+   n_point = 50000
+   x       = numpy.array(
+      [ random.uniform(-10.0, 110.0) for i in range(n_point) ]
+   )
+   y       = numpy.array(
+      [ random.uniform(1980.0, 2030.0) for i in range(n_point) ]
+   )
+   x[: n_x * n_y] = numpy.repeat(x_grid, n_y)
+   y[: n_x * n_y] = numpy.tile(y_grid, n_x)
+   #
+   # value, grid_time
+   # all the columns at once
+   grid         = spline_dict[ z_list[0] ].grid
+   z_index_list = [ spline_dict[z_name].z_index for z_name in z_list ]
+   value        = grid(x, y, z_index_list)
+   grid_time    = time.time() - start_time
+   assert value.shape == ( len(z_list), n_point )
+   #
+   # column_time
+   # one column at a time
+   start_time   = time.time()
+   column_value = list()
+   for z_name in z_list :
+      column_value.append( spline_dict[z_name](x, y) )
+   column_time = time.time() - start_time
+   #
+   for (k, z_name) in enumerate(z_list) :
+      #
+      # one column at a time is the same as all the columns at once
+      spline = spline_dict[z_name]
+      assert spline.grid is grid
+      assert numpy.array_equal( column_value[k], value[k] )
+      #
+      # grid points
+      z_grid = z_value[z_name]
+      check  = value[k, : n_x * n_y].reshape(n_x, n_y)
+      assert numpy.array_equal(check, z_grid)
+      #
+      # constant columns are exactly constant
+      if k % 4 == 3 :
+         assert numpy.all( value[k] == z_grid[0, 0] )
+      #
+      # scalar calls are the same as the array values
+      for i in range(0, n_point, 1000) :
+         assert spline( float(x[i]), float(y[i]) ) == value[k, i]
+   #
+   # int arguments
+   spline = spline_dict[ z_list[0] ]
+   assert spline(100, 2020) == z_value[ z_list[0] ][-1, -1]
+   #
+   # n_scalar
+   n_scalar = 2000
+   #
+   # scalar_time
+   start_time = time.time()
+   for i in range(n_scalar) :
+      spline( float(x[i]), float(y[i]) )
+   scalar_time = time.time() - start_time
+   #
+   # timing
+   n_z = len(z_list)
+   print( f'n_z = {n_z}, n_point = {n_point}: ', end = '' )
+   print( f'columns {column_time:.3f} sec, grid {grid_time:.3f} sec' )
+   print( f'n_scalar = {n_scalar}: spline {scalar_time:.3f} sec' )
+   #
+   # check_scipy_baseline
+   check_scipy_baseline()
+#
+if __name__ == '__main__' :
+   main()
+   print('bilinear_grid: OK')
@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test the caching, indexing, and database_dir in cascade_context.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import sqlite3
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# create_all_node_db(all_node_database, result_dir)
+def create_all_node_db(all_node_database, result_dir) :
+   connection = sqlite3.connect(all_node_database)
+   #
+   # option_all
+   command  = 'CREATE TABLE option_all('
+   command += 'option_all_id INTEGER PRIMARY KEY, '
+   command += 'option_name TEXT, option_value TEXT)'
+   connection.execute(command)
+   command  = 'INSERT INTO option_all VALUES (?, ?, ?)'
+   connection.executemany(command, [
+      ( 0, 'result_dir',                result_dir ),
+      ( 1, 'root_node_name',            'n0' ),
+      ( 2, 'root_split_reference_name', 'both' ),
+   ] )
+   #
+   # split_reference
+   command  = 'CREATE TABLE split_reference('
+   command += 'split_reference_id INTEGER PRIMARY KEY, '
+   command += 'split_reference_name TEXT, split_reference_value REAL)'
+   connection.execute(command)
+   command  = 'INSERT INTO split_reference VALUES (?, ?, ?)'
+   connection.executemany(command, [
+      ( 0, 'female', -0.5 ), ( 1, 'both', 0.0 ), ( 2, 'male', 0.5 )
+   ] )
+   #
+   # node_split
+   command  = 'CREATE TABLE node_split('
+   command += 'node_split_id INTEGER PRIMARY KEY, node_id INTEGER)'
+   connection.execute(command)
+   connection.execute( 'INSERT INTO node_split VALUES (0, 1)' )
+   #
+   # cov_reference
+   command  = 'CREATE TABLE cov_reference('
+   command += 'cov_reference_id INTEGER PRIMARY KEY, node_id INTEGER, '
+   command += 'split_reference_id INTEGER, covariate_id INTEGER, '
+   command += 'reference_value REAL)'
+   connection.execute(command)
+   row_list = list()
+   for node_id in range(3) :
+      for split_reference_id in range(3) :
+         for covariate_id in range(2) :
+            reference_value = 100 * node_id + 10 * split_reference_id
+            reference_value += covariate_id
+            row_list.append( (
+               len(row_list),
+               node_id,
+               split_reference_id,
+               covariate_id,
+               float(reference_value),
+            ) )
+   command = 'INSERT INTO cov_reference VALUES (?, ?, ?, ?, ?)'
+   connection.executemany(command, row_list)
+   #
+   connection.commit()
+   connection.close()
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # work_dir
+   work_dir = 'build/test'
+   at_cascade.empty_directory(work_dir)
+   #
+   # all_node_database
+   all_node_database = f'{work_dir}/all_node.db'
+   create_all_node_db(all_node_database, 'result')
+   #
+   # node_table
+   node_table = [
+      { 'node_id' : 0, 'node_name' : 'n0', 'parent' : None },
+      { 'node_id' : 1, 'node_name' : 'n1', 'parent' : 0 },
+      { 'node_id' : 2, 'node_name' : 'n2', 'parent' : 1 },
+   ]
+   #
+   # context
+   context = at_cascade.cascade_context(all_node_database)
+   assert context.option_all['result_dir'] == 'result'
+   assert context.node_split_set == { 1 }
+   #
+   # context is cached
+   assert at_cascade.cascade_context(all_node_database) is context
+   table = context.get_table('cov_reference')
+   assert context.get_table('cov_reference') is table
+   assert len(table) == 18
+   #
+   # get_index
+   index = context.get_index('cov_reference')
+   assert len(index) == 9
+   row_list = index[ (2, 1) ]
+   assert [ row['reference_value'] for row in row_list ] == [ 210.0, 211.0 ]
+   #
+   # cov_reference_index
+   cov_reference_index = context.cov_reference_index()
+   assert len(cov_reference_index) == 9
+   assert cov_reference_index[ (2, 1) ] == [ 210.0, 211.0 ]
+   assert context.cov_reference_index() is cov_reference_index
+   #
+   # database_dir
+   database_dir = context.database_dir(node_table, 0, 1)
+   assert database_dir == 'n0'
+   database_dir = context.database_dir(node_table, 2, 0)
+   assert database_dir == 'n0/n1/female/n2'
+   #
+   # all_node_database
+   # make sure the modification time changes
+   time.sleep(0.01)
+   connection = sqlite3.connect(all_node_database)
+   command    = "UPDATE option_all SET option_value = 'other' "
+   command   += "WHERE option_name = 'result_dir'"
+   connection.execute(command)
+   connection.commit()
+   connection.close()
+   #
+   # context is not cached after the database changes
+   new_context = at_cascade.cascade_context(all_node_database)
+   assert new_context is not context
+   assert new_context.option_all['result_dir'] == 'other'
+#
+if __name__ == '__main__' :
+   main()
+   print('cascade_context: OK')
@@ -0,0 +1,543 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# imports
+# ----------------------------------------------------------------------------
+# Test the option_all options that change how the jobs in a cascade are run;
+# i.e., worker_pool, job_queue, slim_shift_db, max_shift_db_process,
+# and resuming a cascade that did not complete or was killed.
+# The same cascade is run for each case and the fit results are compared
+# with running the jobs sequentially.
+#
+import sys
+import os
+import copy
+import json
+import time
+import signal
+import sqlite3
+import multiprocessing
+import dismod_at
+import math
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# -----------------------------------------------------------------------------
+# global variables
+# -----------------------------------------------------------------------------
+#
+# node_parent
+node_parent = {
+   'n0' : '',
+   'n1' : 'n0',
+   'n2' : 'n0',
+   'n3' : 'n1',
+   'n4' : 'n1',
+   'n5' : 'n2',
+   'n6' : 'n2',
+}
+#
+# fit_goal_set
+fit_goal_set = { 'n3', 'n4', 'n5', 'n6' }
+#
+# iota_true
+iota_true = {
+   'n3' : 0.010,
+   'n4' : 0.012,
+   'n5' : 0.014,
+   'n6' : 0.016,
+}
+iota_avg = sum( iota_true.values() ) / len( iota_true )
+#
+# result_dir
+result_dir = 'build/test'
+# ----------------------------------------------------------------------------
+def root_node_db(file_name) :
+   #
+   # prior_table
+   prior_table = [
+      { # prior_iota_value
+         'name':    'prior_iota_value',
+         'density': 'uniform',
+         'lower':   iota_avg / 10.0,
+         'upper':   iota_avg * 10.0,
+         'mean':    iota_avg,
+      },{ # prior_iota_child
+         'name':    'prior_iota_child',
+         'density': 'gaussian',
+         'mean':    0.0,
+         'std':     1.0,
+      },
+   ]
+   #
+   # smooth_table
+   smooth_table = list()
+   #
+   # smooth_iota_value
+   fun = lambda a, t : ('prior_iota_value', None, None)
+   smooth_table.append({
+      'name':       'smooth_iota_value',
+      'age_id':     [0],
+      'time_id':    [0],
+      'fun':        fun,
+   })
+   #
+   # smooth_iota_child
+   fun = lambda a, t : ('prior_iota_child', None, None)
+   smooth_table.append({
+      'name':       'smooth_iota_child',
+      'age_id':     [0],
+      'time_id':    [0],
+      'fun':        fun,
+   })
+   #
+   # node_table
+   node_table = list()
+   for node_name in node_parent :
+      node_table.append(
+         { 'name' : node_name, 'parent' : node_parent[node_name] }
+      )
+   #
+   # rate_table
+   rate_table = [ {
+      'name':           'iota',
+      'parent_smooth':  'smooth_iota_value',
+      'child_smooth':   'smooth_iota_child' ,
+   } ]
+   #
+   # covariate_table, mulcov_table
+   covariate_table = list()
+   mulcov_table    = list()
+   #
+   # subgroup_table
+   subgroup_table = [ {'subgroup': 'world', 'group':'world'} ]
+   #
+   # integrand_table
+   integrand_table = [ {'name':'Sincidence'} ]
+   #
+   # avgint_table
+   avgint_table = list()
+   #
+   # data_table
+   data_table  = list()
+   row = {
+      'subgroup':     'world',
+      'weight':       '',
+      'age_lower':    50.0,
+      'age_upper':    50.0,
+      'time_lower':   2000.0,
+      'time_upper':   2000.0,
+      'integrand':    'Sincidence',
+      'density':      'gaussian',
+      'hold_out':     False,
+   }
+   for node_name in iota_true :
+      meas_value        = iota_true[node_name]
+      row['node']       = node_name
+      row['meas_value'] = meas_value
+      row['meas_std']   = meas_value / 10.0
+      data_table.append( copy.copy(row) )
+   #
+   # age_grid, time_grid
+   age_grid  = [ 0.0, 100.0 ]
+   time_grid = [ 2000.0 ]
+   #
+   # weight table:
+   weight_table = list()
+   #
+   # nslist_table
+   nslist_table = dict()
+   #
+   # option_table
+   # random_seed is set so that the samples, and hence the child priors,
+   # are the same for each case.
+   option_table = [
+      { 'name':'parent_node_name',      'value':'n0'},
+      { 'name':'rate_case',             'value':'iota_pos_rho_zero'},
+      { 'name':'quasi_fixed',           'value':'false'},
+      { 'name':'max_num_iter_fixed',    'value':'50'},
+      { 'name':'tolerance_fixed',       'value':'1e-8'},
+      { 'name':'random_seed',           'value':'1234'},
+   ]
+   # ----------------------------------------------------------------------
+   # create database
+   dismod_at.create_database(
+      file_name,
+      age_grid,
+      time_grid,
+      integrand_table,
+      node_table,
+      subgroup_table,
+      weight_table,
+      covariate_table,
+      avgint_table,
+      data_table,
+      prior_table,
+      smooth_table,
+      nslist_table,
+      rate_table,
+      mulcov_table,
+      option_table
+   )
+# ----------------------------------------------------------------------------
+# fit_node_dir = get_fit_node_dir(fit_node_name)
+def get_fit_node_dir(fit_node_name) :
+   node_path = fit_node_name
+   node_name = node_parent[fit_node_name]
+   while node_name != '' :
+      node_path = f'{node_name}/{node_path}'
+      node_name = node_parent[node_name]
+   return f'{result_dir}/{node_path}'
+# ----------------------------------------------------------------------------
+# message_list = get_message_list(fit_node_name)
+# at_cascade messages in the log table for the fit of fit_node_name
+def get_message_list(fit_node_name) :
+   fit_database = get_fit_node_dir(fit_node_name) + '/dismod.db'
+   connection   = dismod_at.create_connection(
+      fit_database, new = False, readonly = True
+   )
+   log_table = dismod_at.get_table_dict(connection, 'log')
+   connection.close()
+   message_list = list()
+   for row in log_table :
+      if row['message_type'] == 'at_cascade' :
+         message_list.append( row['message'] )
+   return message_list
+# ----------------------------------------------------------------------------
+# fit_var = get_fit_var()
+# fit_var[fit_node_name] is the list of fit_var values for fit_node_name
+def get_fit_var() :
+   fit_var = dict()
+   for fit_node_name in node_parent :
+      fit_database = get_fit_node_dir(fit_node_name) + '/dismod.db'
+      connection   = dismod_at.create_connection(
+         fit_database, new = False, readonly = True
+      )
+      fit_var_table = dismod_at.get_table_dict(connection, 'fit_var')
+      connection.close()
+      fit_var[fit_node_name] = [ row['fit_var_value'] for row in fit_var_table ]
+   return fit_var
+# ----------------------------------------------------------------------------
+# check_fit_var(fit_var, check)
+# the fit results are the same as the check results
+def check_fit_var(fit_var, check) :
+   for fit_node_name in node_parent :
+      assert len( fit_var[fit_node_name] ) == len( check[fit_node_name] )
+      for (value, check_value) in zip(
+         fit_var[fit_node_name], check[fit_node_name]
+      ) :
+         assert math.isclose(value, check_value, rel_tol = 1e-10)
+# ----------------------------------------------------------------------------
+# all_node_database = create_cascade(option_extra)
+# Empty the result directory, create the root node database, and create
+# the all node database with the options in option_extra added to the
+# option_all table.
+def create_cascade(option_extra) :
+   #
+   # result_dir
+   at_cascade.empty_directory(result_dir)
+   #
+   # root.db
+   root_database       = f'{result_dir}/root.db'
+   root_node_db(root_database)
+   #
+   # option_all
+   option_all        = {
+      'result_dir':           result_dir,
+      'root_node_name':       'n0',
+      'root_database':        root_database,
+      'shared_memory_prefix': 'cascade_option_test',
+   }
+   option_all.update(option_extra)
+   #
+   # all_node.db
+   all_node_database = f'{result_dir}/all_node.db'
+   at_cascade.create_all_node_db(
+      all_node_database       = all_node_database,
+      option_all              = option_all,
+   )
+   return all_node_database
+# ----------------------------------------------------------------------------
+# all_node_database = run_cascade(option_extra)
+# Run the cascade starting at the root node with the options in option_extra
+# added to the option_all table, check the log tables, and return the
+# all node database.
+def run_cascade(option_extra) :
+   #
+   # all_node_database
+   all_node_database = create_cascade(option_extra)
+   #
+   # cascade starting at root node
+   at_cascade.cascade_root_node(
+      all_node_database  = all_node_database ,
+      fit_goal_set       = fit_goal_set      ,
+   )
+   #
+   # check
+   for fit_node_name in node_parent :
+      fit_node_dir = get_fit_node_dir(fit_node_name)
+      #
+      # trace.out
+      # max_number_cpu > 1 so each job should have a trace file
+      if int( option_extra['max_number_cpu'] ) > 1 :
+         assert os.path.isfile( f'{fit_node_dir}/trace.out' )
+      #
+      # message_list
+      message_list = get_message_list(fit_node_name)
+      assert 'sample: OK' in message_list
+      if fit_node_name not in fit_goal_set :
+         assert 'children: OK' in message_list
+   #
+   return all_node_database
+# ----------------------------------------------------------------------------
+# check_worker_pool(check)
+# Test running a cascade in parallel using a pool of worker processes
+def check_worker_pool(check) :
+   #
+   # run_cascade
+   run_cascade( {
+      'max_number_cpu' : '3', 'worker_pool' : 'true', 'stage_metrics' : 'true'
+   } )
+   check_fit_var( get_fit_var(), check )
+   #
+   # progress is not reported by default
+   assert not os.path.exists( f'{result_dir}/progress_n0.json' )
+   #
+   # stage_metrics
+   connection = dismod_at.create_connection(
+      f'{result_dir}/stage_metrics.db', new = False, readonly = True
+   )
+   stage_metrics = dismod_at.get_table_dict(connection, 'stage_metrics')
+   connection.close()
+   #
+   # check stage_metrics
+   # each job has one fit stage and it is after n_data and n_var are known
+   fit_job_set = set()
+   for row in stage_metrics :
+      assert row['wall_time'] >= 0.0
+      if row['stage'] == 'fit' :
+         assert row['job_name'] not in fit_job_set
+         assert row['n_data'] >= 1
+         assert row['n_var'] >= 1
+         fit_job_set.add( row['job_name'] )
+   assert fit_job_set == set( node_parent.keys() )
+# ----------------------------------------------------------------------------
+# check_job_queue(check)
+# Test running a cascade in parallel using queue worker processes that
+# only communicate through a job queue database in the result directory.
+def check_job_queue(check) :
+   #
+   # run_cascade
+   run_cascade( {
+      'max_number_cpu'    : '3',
+      'job_queue'         : 'result_dir',
+      'progress_interval' : '1',
+   } )
+   check_fit_var( get_fit_var(), check )
+   #
+   # progress_n0.json
+   file_obj = open( f'{result_dir}/progress_n0.json', 'r' )
+   progress = json.load(file_obj)
+   file_obj.close()
+   assert progress['status_count']['done'] == len(node_parent)
+   #
+   # job_queue_database
+   # The root node job name is n0 and shared_unique is the empty string.
+   job_queue_database = f'{result_dir}/job_queue_n0.db'
+   connection = dismod_at.create_connection(
+      job_queue_database, new = False, readonly = True
+   )
+   command    = 'SELECT job_status, process_id FROM job_queue'
+   row_list   = dismod_at.sql_command(connection, command)
+   connection.close()
+   #
+   # check row_list
+   assert len(row_list) == len(node_parent)
+   for (job_status, process_id) in row_list :
+      assert job_status == 'done'
+      assert process_id is not None
+# ----------------------------------------------------------------------------
+# check_slim_shift_db(check)
+# Test that fitting the children using slim shift databases gives the same
+# results as copying the entire parent fit database.
+def check_slim_shift_db(check) :
+   #
+   # run_cascade
+   run_cascade( { 'max_number_cpu' : '1', 'slim_shift_db' : 'true' } )
+   check_fit_var( get_fit_var(), check )
+# ----------------------------------------------------------------------------
+# check_max_shift_db_process(check)
+# Test creating the shift databases for the children of a node in parallel.
+def check_max_shift_db_process(check) :
+   #
+   # run_cascade
+   run_cascade( { 'max_number_cpu' : '1', 'max_shift_db_process' : '2' } )
+   check_fit_var( get_fit_var(), check )
+   #
+   # tmp files
+   # each shift database was renamed after it was complete
+   for fit_node_name in node_parent :
+      fit_node_dir = get_fit_node_dir(fit_node_name)
+      assert not os.path.exists( f'{fit_node_dir}/dismod.db.tmp' )
+# ----------------------------------------------------------------------------
+# check_resume(check)
+# Test resuming a cascade that did not complete.
+# The trace files are used to check which jobs are run when resuming.
+def check_resume(check) :
+   #
+   # run_cascade
+   all_node_database = run_cascade( { 'max_number_cpu' : '2' } )
+   #
+   # n2 log table
+   # remove the children: OK message from the n2 log table; i.e., simulate
+   # the cascade being terminated while fitting n2.
+   fit_database = get_fit_node_dir('n2') + '/dismod.db'
+   connection   = dismod_at.create_connection(
+      fit_database, new = False, readonly = False
+   )
+   command  = 'DELETE FROM log WHERE '
+   command += "message_type = 'at_cascade' AND message = 'children: OK'"
+   dismod_at.sql_command(connection, command)
+   connection.close()
+   #
+   # trace.out
+   # remove the trace files so we can tell which jobs are run when resuming
+   for fit_node_name in node_parent :
+      os.remove( get_fit_node_dir(fit_node_name) + '/trace.out' )
+   #
+   # resume cascade starting at root node
+   at_cascade.cascade_root_node(
+      all_node_database  = all_node_database ,
+      fit_goal_set       = fit_goal_set      ,
+      resume             = True              ,
+   )
+   #
+   # run_set
+   run_set = set()
+   for fit_node_name in node_parent :
+      if os.path.isfile( get_fit_node_dir(fit_node_name) + '/trace.out' ) :
+         run_set.add(fit_node_name)
+   #
+   # check run_set
+   # only n2 and its descendants should have been run when resuming
+   assert run_set == { 'n2', 'n5', 'n6' }
+   #
+   # job_queue_n0.db
+   # the job queue database is not used in this case
+   assert not os.path.exists( f'{result_dir}/job_queue_n0.db' )
+   #
+   # check log tables
+   for fit_node_name in node_parent :
+      message_list = get_message_list(fit_node_name)
+      assert 'sample: OK' in message_list
+      assert 'children: OK' in message_list
+   check_fit_var( get_fit_var(), check )
+# ----------------------------------------------------------------------------
+# child_cascade(all_node_database)
+# Run the cascade starting at the root node in a new session so that this
+# process, and all the processes it starts, can be killed at once.
+def child_cascade(all_node_database) :
+   os.setsid()
+   at_cascade.cascade_root_node(
+      all_node_database  = all_node_database ,
+      fit_goal_set       = fit_goal_set      ,
+   )
+# ----------------------------------------------------------------------------
+# check_interrupt(check)
+# Test resuming a cascade that was killed while it was running.
+# Only max_number_cpu is set in the option_all table, so the job queue
+# is in shared memory and the job queue database is not created.
+def check_interrupt(check) :
+   #
+   # all_node_database
+   all_node_database = create_cascade( { 'max_number_cpu' : '2' } )
+   #
+   # process
+   context = multiprocessing.get_context('fork')
+   process = context.Process(
+      target = child_cascade, args = (all_node_database,)
+   )
+   process.start()
+   #
+   # wait for the root node job to complete
+   n0_database = get_fit_node_dir('n0') + '/dismod.db'
+   n0_complete = False
+   while not n0_complete :
+      assert process.is_alive()
+      time.sleep(0.1)
+      if os.path.isfile(n0_database) :
+         try :
+            n0_complete = 'children: OK' in get_message_list('n0')
+         except sqlite3.OperationalError :
+            # the log table does not exist yet or the database is locked
+            pass
+   #
+   # kill the cascade
+   os.killpg(process.pid, signal.SIGKILL)
+   process.join()
+   #
+   # the cascade did not complete
+   complete = True
+   for fit_node_name in fit_goal_set :
+      if not os.path.isfile( get_fit_node_dir(fit_node_name) + '/dismod.db' ) :
+         complete = False
+      elif 'sample: OK' not in get_message_list(fit_node_name) :
+         complete = False
+   assert not complete
+   #
+   # trace.out
+   # remove the trace files so we can tell which jobs are run when resuming
+   for fit_node_name in node_parent :
+      file_name = get_fit_node_dir(fit_node_name) + '/trace.out'
+      if os.path.isfile(file_name) :
+         os.remove(file_name)
+   #
+   # resume cascade starting at root node
+   # This also clears the shared memory left by the killed processes.
+   at_cascade.cascade_root_node(
+      all_node_database  = all_node_database ,
+      fit_goal_set       = fit_goal_set      ,
+      resume             = True              ,
+   )
+   #
+   # run_set
+   run_set = set()
+   for fit_node_name in node_parent :
+      if os.path.isfile( get_fit_node_dir(fit_node_name) + '/trace.out' ) :
+         run_set.add(fit_node_name)
+   #
+   # check run_set
+   # the root node job completed before the kill so it is not run again
+   assert 'n0' not in run_set
+   assert fit_goal_set.issubset(run_set)
+   #
+   # check log tables
+   for fit_node_name in node_parent :
+      message_list = get_message_list(fit_node_name)
+      assert 'sample: OK' in message_list
+      assert 'children: OK' in message_list
+   check_fit_var( get_fit_var(), check )
+# ----------------------------------------------------------------------------
+# main
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # check
+   # results when the jobs are run sequentially
+   run_cascade( { 'max_number_cpu' : '1' } )
+   check = get_fit_var()
+   #
+   check_worker_pool(check)
+   check_job_queue(check)
+   check_slim_shift_db(check)
+   check_max_shift_db_process(check)
+   check_resume(check)
+   check_interrupt(check)
+#
+if __name__ == '__main__' :
+   main()
+   print('cascade_option: OK')
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test com_cov_reference_all by checking that it gives exactly the same
+# values as com_cov_reference and report the time for each as the size
+# of the problem increases.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import math
+import random
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# (node_table, data_table) = random_tables(n_node, n_data)
+def random_tables(n_node, n_data) :
+   #
+   # node_table
+   # The nodes are not in breadth first order; i.e., a parent can have
+   # a larger node_id than its child.
+   node_table = list()
+   for node_id in range(n_node) :
+      if node_id == 0 :
+         parent = None
+      else :
+         parent = random.randrange(0, node_id)
+      node_table.append( { 'node_name' : f'n{node_id}', 'parent' : parent } )
+   permutation    = list( range(1, n_node) )
+   random.shuffle(permutation)
+   permutation    = [ 0 ] + permutation
+   new_node_table = n_node * [ None ]
+   for (node_id, row) in enumerate(node_table) :
+      parent = row['parent']
+      if parent is not None :
+         parent = permutation[parent]
+      new_node_table[ permutation[node_id] ] = {
+         'node_name' : row['node_name'], 'parent' : parent
+      }
+   node_table = new_node_table
+   #
+   # data_table
+   data_table = list()
+   for data_id in range(n_data) :
+      x_1 = random.uniform(0.0, 10.0)
+      x_2 = random.uniform(0.0, 1.0)
+      if random.random() < 0.1 :
+         x_2 = None
+      data_table.append( {
+         'node_id' : random.randrange(0, n_node),
+         'x_0'     : random.choice( [ -0.5, 0.0, 0.5 ] ),
+         'x_1'     : x_1,
+         'x_2'     : x_2,
+         'x_3'     : random.uniform(0.0, 1.0),
+      } )
+   return (node_table, data_table)
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # option_all_table
+   # The root_database is not used because the data table is an argument.
+   option_all_table = [
+      { 'option_name' : 'root_database',        'option_value' : 'root.db' },
+      { 'option_name' : 'split_covariate_name', 'option_value' : 'sex' },
+      { 'option_name' : 'absolute_covariates',  'option_value' : 'vaccine' },
+   ]
+   #
+   # split_reference_table
+   split_reference_table = [
+      { 'split_reference_name' : 'female', 'split_reference_value' : -0.5 },
+      { 'split_reference_name' : 'both',   'split_reference_value' :  0.0 },
+      { 'split_reference_name' : 'male',   'split_reference_value' : +0.5 },
+   ]
+   #
+   # covariate_table
+   covariate_table = [
+      { 'covariate_name' : 'sex',     'reference' : 0.0 },
+      { 'covariate_name' : 'income',  'reference' : 5.0 },
+      { 'covariate_name' : 'bmi',     'reference' : 0.5 },
+      { 'covariate_name' : 'vaccine', 'reference' : 0.3 },
+   ]
+   max_difference = [ 0.5, None, math.inf, None ]
+   for (covariate_id, row) in enumerate(covariate_table) :
+      row['max_difference'] = max_difference[covariate_id]
+   #
+   for (n_node, n_data) in [ (50, 500), (200, 2000) ] :
+      #
+      # node_table, data_table, shift_node_list
+      (node_table, data_table) = random_tables(n_node, n_data)
+      shift_node_list = list( range(n_node) )
+      #
+      # cov_reference_dict
+      start_time         = time.time()
+      cov_reference_dict = at_cascade.com_cov_reference_all(
+         option_all_table      = option_all_table,
+         split_reference_table = split_reference_table,
+         node_table            = node_table,
+         covariate_table       = covariate_table,
+         shift_node_list       = shift_node_list,
+         data_table            = data_table,
+      )
+      all_time = time.time() - start_time
+      #
+      # check
+      start_time = time.time()
+      for shift_node_id in shift_node_list :
+         for split_reference_id in range( len(split_reference_table) ) :
+            cov_reference_list = at_cascade.com_cov_reference(
+               option_all_table      = option_all_table,
+               split_reference_table = split_reference_table,
+               node_table            = node_table,
+               covariate_table       = covariate_table,
+               shift_node_id         = shift_node_id,
+               split_reference_id    = split_reference_id,
+               data_table            = data_table,
+            )
+            # the values are identical, not just close
+            check = cov_reference_dict[ (shift_node_id, split_reference_id) ]
+            assert cov_reference_list == check
+      one_time = time.time() - start_time
+      #
+      # timing
+      print( f'n_node = {n_node}, n_data = {n_data}: ', end = '' )
+      print( f'com_cov_reference {one_time:.3f} sec, ', end = '' )
+      print( f'com_cov_reference_all {all_time:.3f} sec' )
+#
+if __name__ == '__main__' :
+   main()
+   print('com_cov_reference_all: OK')
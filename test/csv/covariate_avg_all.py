@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test csv.covariate_avg_all by comparing it with csv.covariate_avg
+# and report the time for each.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# covariate_table = random_covariate_table(n_node)
+def random_covariate_table(n_node) :
+   covariate_table = list()
+   for node_id in range(n_node) :
+      for sex in [ 'female', 'male' ] :
+         for age in [ 0.0, 50.0, 100.0 ] :
+            for time in [ 1990.0, 2020.0 ] :
+               income = random.uniform(0.0, 1.0)
+               if sex == 'male' and random.random() < 0.3 :
+                  income = covariate_table[-6]['income']
+               covariate_table.append( {
+                  'node_name' : f'n{node_id}' ,
+                  'sex'       : sex ,
+                  'age'       : age ,
+                  'time'      : time ,
+                  'omega'     : random.uniform(0.0, 0.1) ,
+                  'income'    : income ,
+                  'bmi'       : random.uniform(20.0, 30.0) ,
+               } )
+   return covariate_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   for n_node in [ 10, 200 ] :
+      #
+      # covariate_table
+      covariate_table = random_covariate_table(n_node)
+      #
+      # check both rows derived by covariate_avg_all
+      covariate_average_dict = at_cascade.csv.covariate_avg_all(
+         covariate_table
+      )
+      #
+      # covariate_table, start_time
+      covariate_table = at_cascade.csv.covariate_both(covariate_table)
+      start_time      = time.time()
+      #
+      # covariate_average_dict
+      both_average_dict = at_cascade.csv.covariate_avg_all(covariate_table)
+      all_time          = time.time() - start_time
+      assert both_average_dict == covariate_average_dict
+      #
+      # check
+      start_time = time.time()
+      for node_id in range(n_node) :
+         node_name = f'n{node_id}'
+         for sex in [ 'female', 'male', 'both' ] :
+            covariate_average = at_cascade.csv.covariate_avg(
+               covariate_table, node_name, sex
+            )
+            check = covariate_average_dict[ (node_name, sex) ]
+            assert set( check.keys() ) == { 'income', 'bmi' }
+            # the values are exactly equal
+            assert check == covariate_average
+      one_time = time.time() - start_time
+      assert len( covariate_average_dict ) == 3 * n_node
+      #
+      # timing
+      print( f'n_node = {n_node}: ', end = '' )
+      print( f'covariate_avg {one_time:.3f} sec, ', end = '' )
+      print( f'covariate_avg_all {all_time:.3f} sec' )
+#
+if __name__ == '__main__' :
+   main()
+   print('covariate_avg_all: OK')
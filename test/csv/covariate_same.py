@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test that csv.covariate_same gives the same result as sorting the lists of
+# values for each (node_name, sex) pair, and that it is faster when there
+# are many nodes. Also report the time for each.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# cov_same = sort_covariate_same(covariate_table)
+# the method that covariate_same used to use (including its argument check)
+def sort_covariate_same(covariate_table) :
+   for row in covariate_table :
+      for key in row :
+         type_check = str if key in [ 'node_name' , 'sex' ] else float
+         assert type( row[key] ) == type_check
+   exclude  = { 'node_name', 'sex', 'age', 'time' }
+   cov_list = list( set( covariate_table[0].keys() ) - exclude )
+   #
+   # cov_subtable
+   pair_set = set()
+   for row in covariate_table :
+      pair_set.add( (row['node_name'], row['sex']) )
+   cov_subtable = { pair : list() for pair in sorted(pair_set) }
+   for row in covariate_table :
+      cov_subtable[ (row['node_name'], row['sex']) ].append(row)
+   for pair in cov_subtable :
+      cov_subtable[pair] = sorted(
+         cov_subtable[pair], key = lambda row : (row['age'], row['time'])
+      )
+   #
+   # cov_same
+   cov_same = dict()
+   for cov_name in cov_list :
+      cov_value_dict = dict()
+      for pair in cov_subtable :
+         cov_value_dict[pair] = [ row[cov_name] for row in cov_subtable[pair] ]
+      cov_value_list  = sorted(cov_value_dict.items(), key = lambda x : x[1])
+      previous_value  = None
+      previous_triple = None
+      for (pair, cov_value) in cov_value_list :
+         triple = (pair[0], pair[1], cov_name)
+         if cov_value == previous_value :
+            cov_same[triple] = cov_same[previous_triple]
+         else :
+            cov_same[triple] = triple
+         previous_value  = cov_value
+         previous_triple = triple
+   return cov_same
+# ----------------------------------------------------------------------------
+# covariate_table = random_covariate_table(n_node)
+# Each covariate has a few distinct columns that are shared by many pairs.
+def random_covariate_table(n_node) :
+   age_grid  = [ 0.0, 20.0, 50.0, 100.0 ]
+   time_grid = [ 1990.0, 2000.0, 2010.0, 2020.0 ]
+   n_grid    = len(age_grid) * len(time_grid)
+   #
+   # choice
+   # choice[cov_name] is a list of the possible columns for cov_name
+   choice = dict()
+   for cov_name in [ 'omega', 'income', 'smoke' ] :
+      choice[cov_name] = list()
+      for k in range(5) :
+         column = [ random.uniform(0.0, 1.0) for i in range(n_grid) ]
+         choice[cov_name].append(column)
+   # columns that are almost the same and columns with zeros
+   choice['omega'].append( choice['omega'][0][: -1] + [ 2.0 ] )
+   choice['income'].append( n_grid * [ 0.0 ] )
+   choice['income'].append( n_grid * [ -0.0 ] )
+   #
+   # covariate_table
+   covariate_table = list()
+   for node_id in range(n_node) :
+      for sex in [ 'female', 'male', 'both' ] :
+         column = dict()
+         for cov_name in choice :
+            column[cov_name] = random.choice( choice[cov_name] )
+         index = 0
+         for age in age_grid :
+            for time in time_grid :
+               row = {
+                  'node_name' : f'n{node_id}' ,
+                  'sex'       : sex ,
+                  'age'       : age ,
+                  'time'      : time ,
+               }
+               for cov_name in choice :
+                  row[cov_name] = column[cov_name][index]
+               covariate_table.append(row)
+               index += 1
+   random.shuffle(covariate_table)
+   return covariate_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   for n_node in [ 1, 10, 5000 ] :
+      #
+      # covariate_table
+      covariate_table = random_covariate_table(n_node)
+      #
+      # check, sort_time
+      start_time = time.time()
+      check      = sort_covariate_same(covariate_table)
+      sort_time  = time.time() - start_time
+      #
+      # cov_same, hash_time
+      # (this time includes checking the arguments and the age-time grid)
+      start_time = time.time()
+      cov_same   = at_cascade.csv.covariate_same(covariate_table)
+      hash_time  = time.time() - start_time
+      #
+      # same result
+      assert cov_same == check
+      #
+      # each group has one triple that represents it
+      for triple in cov_same :
+         other = cov_same[triple]
+         assert cov_same[other] == other
+         assert other[2] == triple[2]
+      #
+      # timing
+      print( f'n_node = {n_node}: ', end = '' )
+      print( f'sort {sort_time:.3f} sec, covariate_same {hash_time:.3f} sec' )
+      #
+      # speed
+      # 5000 nodes, three sexes, and 16 age-time grid points is 240,000 rows
+      if n_node == 5000 :
+         assert hash_time < sort_time
+   #
+   # nan
+   # a pair that has a nan value is only the same as itself
+   covariate_table = list()
+   for node_name in [ 'n0', 'n1', 'n2', 'n3' ] :
+      for age in [ 0.0, 100.0 ] :
+         income = 1.0 if node_name in [ 'n0', 'n3' ] else float('nan')
+         covariate_table.append( {
+            'node_name' : node_name ,
+            'sex'       : 'female' ,
+            'age'       : age ,
+            'time'      : 2000.0 ,
+            'income'    : income ,
+         } )
+   cov_same = at_cascade.csv.covariate_same(covariate_table)
+   assert cov_same[ ('n0', 'female', 'income') ] == ('n0', 'female', 'income')
+   assert cov_same[ ('n1', 'female', 'income') ] == ('n1', 'female', 'income')
+   assert cov_same[ ('n2', 'female', 'income') ] == ('n2', 'female', 'income')
+   assert cov_same[ ('n3', 'female', 'income') ] == ('n0', 'female', 'income')
+   #
+   # grid that is not rectangular
+   covariate_table = random_covariate_table(2)
+   covariate_table.append( dict( covariate_table[0] ) )
+   try :
+      at_cascade.csv.covariate_same(covariate_table)
+      ok = False
+   except AssertionError as error :
+      ok = 'Expected following rectangular grid' in str(error)
+   assert ok
+#
+if __name__ == '__main__' :
+   main()
+   print('covariate_same: OK')
@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test that the data covariate values computed by csv.fit, for all the rows
+# in each (node_name, sex) group at once, are equal to the values computed
+# one row and one covariate at a time. Also report the time for each.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import random
+import importlib
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# fit_module
+# (at_cascade.csv.fit is the function with the same name)
+fit_module = importlib.import_module('at_cascade.csv.fit')
+# ----------------------------------------------------------------------------
+# covariate_table = random_covariate_table(node_set)
+# income: varies with age and time
+# bmi:    varies with time
+# smoke:  varies with age
+# urban:  constant for each node and sex
+def random_covariate_table(node_set) :
+   covariate_table = list()
+   for node_name in sorted(node_set) :
+      for sex in [ 'female', 'male' ] :
+         smoke = dict()
+         for age in [ 0.0, 50.0, 100.0 ] :
+            smoke[age] = random.uniform(0.0, 1.0)
+         bmi = dict()
+         for time in [ 1990.0, 2000.0, 2020.0 ] :
+            bmi[time] = random.uniform(20.0, 30.0)
+         urban = random.uniform(0.0, 1.0)
+         for age in [ 0.0, 50.0, 100.0 ] :
+            for time in [ 1990.0, 2000.0, 2020.0 ] :
+               covariate_table.append( {
+                  'node_name' : node_name ,
+                  'sex'       : sex ,
+                  'age'       : age ,
+                  'time'      : time ,
+                  'omega'     : random.uniform(0.0, 0.1) ,
+                  'income'    : random.uniform(0.0, 1.0) ,
+                  'bmi'       : bmi[time] ,
+                  'smoke'     : smoke[age] ,
+                  'urban'     : urban ,
+               } )
+   return covariate_table
+# ----------------------------------------------------------------------------
+# data_table = random_data_table(node_set, n_data)
+# Some of the age and time midpoints are outside the covariate grid.
+def random_data_table(node_set, n_data) :
+   node_list  = sorted(node_set)
+   data_table = list()
+   for data_id in range(n_data) :
+      age_lower  = random.uniform(-10.0, 110.0)
+      time_lower = random.uniform(1980.0, 2030.0)
+      data_table.append( {
+         'data_id'    : str(data_id) ,
+         'node_name'  : random.choice(node_list) ,
+         'sex'        : random.choice( [ 'female', 'male', 'both' ] ) ,
+         'age_lower'  : str( age_lower ) ,
+         'age_upper'  : str( age_lower + random.uniform(0.0, 10.0) ) ,
+         'time_lower' : str( time_lower ) ,
+         'time_upper' : str( time_lower + random.uniform(0.0, 5.0) ) ,
+      } )
+   return data_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # node_set, covariate_name_list
+   node_set            = { f'n{i}' for i in range(20) }
+   covariate_name_list = [ 'income', 'bmi', 'smoke', 'urban' ]
+   #
+   # spline_cov
+   covariate_table = random_covariate_table(node_set)
+   covariate_table = at_cascade.csv.covariate_both(covariate_table)
+   age_grid, time_grid, spline_cov = at_cascade.csv.covariate_spline(
+      covariate_table, node_set
+   )
+   #
+   # data_table, age_mid, time_mid
+   n_data     = 20000
+   data_table = random_data_table(node_set, n_data)
+   age_mid    = numpy.empty(n_data)
+   time_mid   = numpy.empty(n_data)
+   for (i_row, row) in enumerate(data_table) :
+      age_lower       = float( row['age_lower'] )
+      age_upper       = float( row['age_upper'] )
+      time_lower      = float( row['time_lower'] )
+      time_upper      = float( row['time_upper'] )
+      age_mid[i_row]  = (age_lower + age_upper) / 2.0
+      time_mid[i_row] = (time_lower + time_upper) / 2.0
+   #
+   # check_table, one_time
+   # the covariate values computed one row at a time
+   start_time  = time.time()
+   check_table = list()
+   for (i_row, row) in enumerate(data_table) :
+      node_name = row['node_name']
+      sex       = row['sex']
+      check_row = dict()
+      for covariate_name in covariate_name_list :
+         if sex != 'both' :
+            spline          = spline_cov[node_name][sex][covariate_name]
+            covariate_value = spline(
+               float( age_mid[i_row] ), float( time_mid[i_row] )
+            )
+            check_row[covariate_name] = covariate_value
+         else :
+            check_row[covariate_name] = 0.0
+            for tmp in [ 'female', 'male' ] :
+               spline          = spline_cov[node_name][tmp][covariate_name]
+               covariate_value = spline(
+                  float( age_mid[i_row] ), float( time_mid[i_row] )
+               )
+               check_row[covariate_name] += covariate_value / 2.0
+      check_table.append(check_row)
+   one_time = time.time() - start_time
+   #
+   # data_table, group_time
+   start_time = time.time()
+   fit_module.set_data_covariate(
+      data_table          = data_table ,
+      age_mid             = age_mid ,
+      time_mid            = time_mid ,
+      spline_cov          = spline_cov ,
+      covariate_name_list = covariate_name_list ,
+   )
+   group_time = time.time() - start_time
+   #
+   # check
+   # the values are exactly equal
+   for (row, check_row) in zip(data_table, check_table) :
+      for covariate_name in covariate_name_list :
+         assert type( row[covariate_name] ) == float
+         assert row[covariate_name] == check_row[covariate_name]
+   #
+   # timing
+   print( f'n_data = {n_data}: ', end = '' )
+   print( f'one row {one_time:.3f} sec, by group {group_time:.3f} sec' )
+#
+if __name__ == '__main__' :
+   main()
+   print('data_covariate: OK')
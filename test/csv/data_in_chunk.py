@@ -0,0 +1,345 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test that the root node database created by csv.fit does not depend on
+# the number of data_in.csv rows that are processed at once.
+# A chunk size of three is compared with processing all the rows at once,
+# and with passing all the rows to dismod_at.create_database
+# (which is how the data table was created before it was processed in chunks).
+# ----------------------------------------------------------------------------
+import os
+import sys
+import random
+import importlib
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+import dismod_at
+#
+# fit_module
+# (at_cascade.csv.fit is the function with the same name)
+fit_module = importlib.import_module('at_cascade.csv.fit')
+#
+# csv_file
+csv_file = dict()
+#
+# option_fit.csv
+csv_file['option_fit.csv'] = \
+'''name,value
+refit_split,false
+random_seed,1234
+'''
+#
+# node.csv
+csv_file['node.csv'] = \
+'''node_name,parent_name
+n0,
+n1,n0
+n2,n0
+n3,n1
+'''
+#
+# fit_goal.csv
+csv_file['fit_goal.csv'] = \
+'''node_name
+n3
+'''
+#
+# predict_integrand.csv
+csv_file['predict_integrand.csv'] = \
+'''integrand_name
+Sincidence
+prevalence
+'''
+#
+# prior.csv
+csv_file['prior.csv'] = \
+'''name,density,mean,std,eta,lower,upper
+uniform_eps_1,uniform,0.02,,,1e-6,1.0
+delta_prior,log_gaussian,0.0,0.1,1e-5,,
+random_prior,gaussian,0.0,0.2,,,
+'''
+#
+# parent_rate.csv
+csv_file['parent_rate.csv'] = \
+'''rate_name,age,time,value_prior,dage_prior,dtime_prior,const_value
+iota,0.0,1990.0,uniform_eps_1,delta_prior,delta_prior,
+iota,100.0,1990.0,uniform_eps_1,delta_prior,delta_prior,
+iota,0.0,2020.0,uniform_eps_1,delta_prior,delta_prior,
+iota,100.0,2020.0,uniform_eps_1,delta_prior,delta_prior,
+'''
+#
+# child_rate.csv
+csv_file['child_rate.csv'] = \
+'''rate_name,value_prior
+iota,random_prior
+'''
+#
+# mulcov.csv
+csv_file['mulcov.csv'] = \
+'''covariate,type,effected,value_prior,const_value
+income,rate_value,iota,,0.5
+'''
+# ----------------------------------------------------------------------------
+# covariate_text = get_covariate_text()
+# The population covariate is used to weight the data for each row
+# that has a non-zero age or time interval.
+def get_covariate_text() :
+   text = 'node_name,sex,age,time,omega,income,population\n'
+   for node_name in [ 'n0', 'n1', 'n2', 'n3' ] :
+      for sex in [ 'female', 'male' ] :
+         population = random.uniform(1.0, 2.0)
+         for age in [ 0.0, 50.0, 100.0 ] :
+            for time in [ 1990.0, 2020.0 ] :
+               income = random.uniform(0.0, 1.0)
+               text  += f'{node_name},{sex},{age},{time},0.01,{income},'
+               text  += f'{population + age / 100.0}\n'
+   return text
+# ----------------------------------------------------------------------------
+# data_in_text = get_data_in_text(n_data)
+# Some of the rows have sex both, an age or time interval, or no eta.
+def get_data_in_text(n_data) :
+   text  = 'data_id,integrand_name,node_name,sex,age_lower,age_upper,'
+   text += 'time_lower,time_upper,meas_value,meas_std,hold_out,'
+   text += 'density_name,eta,nu\n'
+   for data_id in range(n_data) :
+      integrand_name = random.choice( [ 'Sincidence', 'prevalence' ] )
+      node_name      = random.choice( [ 'n0', 'n1', 'n2', 'n3' ] )
+      sex            = random.choice( [ 'female', 'male', 'both' ] )
+      age_lower      = random.uniform(0.0, 100.0)
+      age_upper      = age_lower
+      if data_id % 2 == 0 :
+         age_upper += random.uniform(0.0, 10.0)
+      time_lower     = random.uniform(1990.0, 2020.0)
+      time_upper     = time_lower + random.uniform(0.0, 3.0)
+      meas_value     = random.uniform(0.01, 0.1)
+      meas_std       = meas_value / 10.0
+      hold_out       = random.choice( [ 0, 1 ] )
+      density_name   = random.choice( [ 'gaussian', 'log_gaussian' ] )
+      eta            = random.choice( [ '', '1e-4' ] )
+      text += f'{data_id},{integrand_name},{node_name},{sex},'
+      text += f'{age_lower},{age_upper},{time_lower},{time_upper},'
+      text += f'{meas_value},{meas_std},{hold_out},{density_name},{eta},\n'
+   return text
+# ----------------------------------------------------------------------------
+# root_table = create_root_database(fit_dir, chunk_size)
+# root_table[tbl_name] is the table tbl_name in the root node database.
+def create_root_database(fit_dir, chunk_size) :
+   #
+   # data_in_chunk_size
+   save_chunk_size               = fit_module.data_in_chunk_size
+   fit_module.data_in_chunk_size = chunk_size
+   #
+   # root.db
+   file_name    = f'{fit_dir}/option_fit.csv'
+   option_table = at_cascade.csv.read_table(file_name)
+   try :
+      fit_module.set_global_option_value(fit_dir, option_table, 'n0')
+      fit_module.create_root_database(fit_dir)
+   finally :
+      fit_module.data_in_chunk_size = save_chunk_size
+   #
+   # root_table
+   root_table = dict()
+   connection = dismod_at.create_connection(
+      f'{fit_dir}/root.db', new = False, readonly = True
+   )
+   for tbl_name in [
+      'data', 'integrand', 'covariate', 'weight', 'weight_grid'
+   ] :
+      root_table[tbl_name] = dismod_at.get_table_dict(connection, tbl_name)
+   connection.close()
+   return root_table
+# ----------------------------------------------------------------------------
+# data_table = create_database_data_table(
+#     file_name, spline_cov, covariate_name_list, weight_dict
+# )
+# Create the data table argument to dismod_at.create_database using all the
+# rows in data_in.csv at once. This is the same as in csv.fit before
+# the data_in.csv rows were processed in chunks.
+def create_database_data_table(
+   file_name, spline_cov, covariate_name_list, weight_dict
+) :
+   #
+   # data_table
+   table      = at_cascade.csv.read_table(file_name)
+   data_table = at_cascade.csv.empty_str(table, 'to_none')
+   #
+   # age_mid, time_mid
+   age_mid    = numpy.empty( len(data_table) )
+   time_mid   = numpy.empty( len(data_table) )
+   for (i_row, row) in enumerate(data_table) :
+      age_mid[i_row]  = ( float(row['age_lower']) + float(row['age_upper']) )
+      age_mid[i_row] /= 2.0
+      time_mid[i_row] = ( float(row['time_lower']) + float(row['time_upper']) )
+      time_mid[i_row] /= 2.0
+   #
+   # row[c_j] for j = 0, ..., n_covariate - 1
+   fit_module.set_data_covariate(
+      data_table          = data_table,
+      age_mid             = age_mid,
+      time_mid            = time_mid,
+      spline_cov          = spline_cov,
+      covariate_name_list = covariate_name_list,
+   )
+   #
+   # data_table
+   for row in data_table :
+      age_lower         = float( row['age_lower'] )
+      age_upper         = float( row['age_upper'] )
+      sex               = row['sex']
+      row['node']       = row['node_name']
+      row['integrand']  = row['integrand_name']
+      row['density']    = row['density_name']
+      for key in [ 'eta', 'nu' ] :
+         if key in row :
+            if row[key] != None :
+               row[key] = float( row[key] )
+      row['age_lower']  = age_lower
+      row['age_upper']  = age_upper
+      row['time_lower'] = float( row['time_lower'] )
+      row['time_upper'] = float( row['time_upper'] )
+      row['weight']     = ''
+      row['subgroup']   = 'world'
+      row['sex']        = at_cascade.csv.sex_name2value[sex]
+      row['one']        = '1.0'
+      if weight_dict != None and age_lower != age_upper :
+         fun           = weight_dict[ (row['node_name'], sex, 'population') ]
+         row['weight'] = f'weight_{fun.index}'
+   return data_table
+# ----------------------------------------------------------------------------
+# data_table = create_database_data(fit_dir)
+# Create the root node database and then use the same arguments to
+# dismod_at.create_database, except that the data table argument is
+# the entire data table. The return value is the data table in the
+# database that dismod_at.create_database creates.
+def create_database_data(fit_dir) :
+   #
+   # create_database, insert_data_in
+   # capture the arguments to these routines when creating root.db
+   argument             = dict()
+   save_create_database = dismod_at.create_database
+   save_insert_data_in  = fit_module.insert_data_in
+   def create_database(**kwargs) :
+      argument['create_database'] = kwargs
+      save_create_database(**kwargs)
+   def insert_data_in(**kwargs) :
+      argument['insert_data_in'] = kwargs
+      save_insert_data_in(**kwargs)
+   #
+   # root.db
+   file_name    = f'{fit_dir}/option_fit.csv'
+   option_table = at_cascade.csv.read_table(file_name)
+   try :
+      dismod_at.create_database = create_database
+      fit_module.insert_data_in = insert_data_in
+      fit_module.set_global_option_value(fit_dir, option_table, 'n0')
+      fit_module.create_root_database(fit_dir)
+   finally :
+      dismod_at.create_database = save_create_database
+      fit_module.insert_data_in = save_insert_data_in
+   #
+   # data_table
+   data_table = create_database_data_table(
+      file_name           = argument['insert_data_in']['file_name'] ,
+      spline_cov          = argument['insert_data_in']['spline_cov'] ,
+      covariate_name_list = argument['insert_data_in']['covariate_name_list'],
+      weight_dict         = argument['insert_data_in']['weight_dict'] ,
+   )
+   #
+   # create_database.db
+   file_name                 = f'{fit_dir}/create_database.db'
+   kwargs                    = argument['create_database']
+   kwargs['file_name']       = file_name
+   kwargs['data_table']      = data_table
+   save_create_database(**kwargs)
+   #
+   # data_table
+   connection = dismod_at.create_connection(
+      file_name, new = False, readonly = True
+   )
+   data_table = dismod_at.get_table_dict(connection, 'data')
+   connection.close()
+   return data_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # fit_dir
+   fit_dir = 'build/test/csv'
+   at_cascade.empty_directory(fit_dir)
+   #
+   # covariate.csv, data_in.csv
+   n_data = 20
+   csv_file['covariate.csv'] = get_covariate_text()
+   csv_file['data_in.csv']   = get_data_in_text(n_data)
+   #
+   # write csv files
+   for name in csv_file :
+      file_name = f'{fit_dir}/{name}'
+      file_ptr  = open(file_name, 'w')
+      file_ptr.write( csv_file[name] )
+      file_ptr.close()
+   #
+   # check
+   # all the data_in.csv rows are processed at once
+   check = create_root_database(fit_dir, n_data)
+   #
+   # root_table
+   # three rows are processed at a time so rows with sex both,
+   # and rows that use the population weighting, are in more than one chunk
+   root_table = create_root_database(fit_dir, 3)
+   #
+   # check root_table
+   assert len( check['data'] ) == n_data
+   for tbl_name in check :
+      assert root_table[tbl_name] == check[tbl_name]
+   #
+   # data_table
+   # all the rows are passed to dismod_at.create_database
+   data_table = create_database_data(fit_dir)
+   #
+   # check data_table
+   # Every column is compared, including data_name, hold_out, the columns
+   # that are computed using a name to id mapping, and the covariates.
+   col_name = list( data_table[0].keys() )
+   for name in [
+      'data_name', 'hold_out', 'integrand_id', 'density_id', 'node_id',
+      'subgroup_id', 'weight_id', 'x_0', 'x_1', 'x_2'
+   ] :
+      assert name in col_name
+   assert len( root_table['data'] ) == len( data_table )
+   for (data_id, row) in enumerate( root_table['data'] ) :
+      assert list( row.keys() ) == col_name
+      for name in col_name :
+         if row[name] != data_table[data_id][name] :
+            msg  = f'data_id = {data_id}, column = {name}: '
+            msg += f'{row[name]} != {data_table[data_id][name]}'
+            assert False, msg
+   #
+   # data_in.csv
+   # data_id for line 9 is not correct; i.e., in the third chunk
+   line_list = csv_file['data_in.csv'].split('\n')
+   line_list[8] = '1000' + line_list[8][ line_list[8].index(',') : ]
+   file_ptr  = open(f'{fit_dir}/data_in.csv', 'w')
+   file_ptr.write( '\n'.join(line_list) )
+   file_ptr.close()
+   #
+   # check error message
+   try :
+      create_root_database(fit_dir, 3)
+      ok = False
+   except AssertionError as error :
+      ok = 'Expected data_id = 7 in line 9 of data_in.csv' in str(error)
+   assert ok
+#
+if __name__ == '__main__' :
+   main()
+   print('data_in_chunk: OK')
@@ -0,0 +1,165 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test csv.read_column and csv.read_column_chunk by comparing them with
+# csv.read_table and report the time for each.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import math
+import random
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# write_data_in(file_name, n_row)
+def write_data_in(file_name, n_row) :
+   table = list()
+   for data_id in range(n_row) :
+      age_lower = random.uniform(0.0, 100.0)
+      eta       = 1e-4 if random.random() < 0.5 else ''
+      table.append( {
+         'data_id'        : data_id ,
+         'integrand_name' : random.choice( [ 'Sincidence', 'prevalence' ] ) ,
+         'node_name'      : random.choice( [ 'n0', 'n1', 'n2' ] ) ,
+         'sex'            : random.choice( [ 'female', 'male', 'both' ] ) ,
+         'age_lower'      : age_lower ,
+         'age_upper'      : age_lower + random.uniform(0.0, 5.0) ,
+         'time_lower'     : random.uniform(1990.0, 2020.0) ,
+         'time_upper'     : random.uniform(1990.0, 2020.0) ,
+         'meas_value'     : random.uniform(0.0, 0.1) ,
+         'meas_std'       : random.uniform(0.001, 0.01) ,
+         'hold_out'       : random.choice( [ 0, 1 ] ) ,
+         'density_name'   : 'gaussian' ,
+         'eta'            : eta ,
+      } )
+   if n_row > 0 :
+      at_cascade.csv.write_table(file_name, table)
+   else :
+      # write_table needs at least one row to determine the header
+      file_ptr = open(file_name, 'w')
+      file_ptr.write( 'data_id,integrand_name,node_name,sex,' )
+      file_ptr.write( 'age_lower,age_upper,time_lower,time_upper,' )
+      file_ptr.write( 'meas_value,meas_std,hold_out,density_name,eta\n' )
+      file_ptr.close()
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # file_name
+   file_name = 'build/test/data_in.csv'
+   if not os.path.exists('build/test') :
+      os.makedirs('build/test')
+   #
+   # column_type
+   column_type = {
+      'data_id'        : int,
+      'integrand_name' : str,
+      'age_lower'      : float,
+      'age_upper'      : float,
+      'time_lower'     : float,
+      'time_upper'     : float,
+      'meas_value'     : float,
+      'meas_std'       : float,
+      'hold_out'       : int,
+      'eta'            : float,
+   }
+   #
+   for n_row in [ 0, 10, 100000 ] :
+      #
+      # data_in.csv
+      write_data_in(file_name, n_row)
+      #
+      # table, table_time
+      # read_table followed by converting the values in each row
+      start_time = time.time()
+      table      = at_cascade.csv.read_table(file_name)
+      for row in table :
+         for name in column_type :
+            if row[name] == '' :
+               row[name] = None
+            elif column_type[name] != str :
+               row[name] = column_type[name]( row[name] )
+      table_time = time.time() - start_time
+      #
+      # column, column_time
+      start_time  = time.time()
+      column      = at_cascade.csv.read_column(file_name, column_type)
+      column_time = time.time() - start_time
+      #
+      # check column
+      for name in column_type :
+         assert len( column[name] ) == n_row
+         if column_type[name] == str :
+            assert type( column[name] ) == list
+         else :
+            assert type( column[name] ) == numpy.ndarray
+            assert column[name].dtype == column_type[name]
+         for (row, value) in zip(table, column[name]) :
+            if row[name] == None :
+               if column_type[name] == float :
+                  assert math.isnan(value)
+               else :
+                  assert value == None
+            else :
+               assert row[name] == value
+      #
+      # check read_column_chunk
+      chunk_size = 3000
+      n_chunk    = 0
+      for chunk in at_cascade.csv.read_column_chunk(
+         file_name, column_type, chunk_size
+      ) :
+         start = n_chunk * chunk_size
+         end   = min(start + chunk_size, n_row)
+         for name in column_type :
+            assert len( chunk[name] ) == end - start
+            if column_type[name] == str :
+               assert chunk[name] == column[name][start : end]
+            else :
+               assert numpy.array_equal(
+                  chunk[name], column[name][start : end], equal_nan = True
+               )
+         n_chunk += 1
+      assert n_chunk == math.ceil(n_row / chunk_size)
+      #
+      # timing
+      print( f'n_row = {n_row}: ', end = '' )
+      print( f'read_table {table_time:.3f} sec, ', end = '' )
+      print( f'read_column {column_time:.3f} sec' )
+   #
+   # error message
+   file_ptr = open(file_name, 'w')
+   file_ptr.write('data_id,age_lower\n0,1.0\n1,one\n')
+   file_ptr.close()
+   try :
+      column_type = { 'age_lower' : float }
+      at_cascade.csv.read_column(file_name, column_type)
+      ok = False
+   except AssertionError as error :
+      ok = 'line 3: column age_lower' in str(error)
+   assert ok
+   #
+   # row that is missing columns
+   file_ptr = open(file_name, 'w')
+   file_ptr.write('data_id,age_lower\n0,1.0\n1,2.0\n2\n')
+   file_ptr.close()
+   try :
+      column_type = { 'age_lower' : float }
+      at_cascade.csv.read_column(file_name, column_type)
+      ok = False
+   except AssertionError as error :
+      ok = 'line 4: has 1 columns' in str(error)
+   assert ok
+#
+if __name__ == '__main__' :
+   main()
+   print('read_column: OK')
@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test that fit_parallel starts a job soon after its parent job completes;
+# i.e., the dispatch latency does not depend on the ten second timeout
+# that the processes use while waiting for a change in the job status.
+# The dismod_at fits are replaced by a function that sleeps for a short time
+# and records when each job starts and ends.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import multiprocessing
+import dismod_at
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# result_dir
+result_dir = 'build/test'
+#
+# job_seconds
+# time for each job
+job_seconds = 0.1
+#
+# max_number_cpu
+# this is the number of jobs at the bottom of the job table so no job
+# waits for a cpu to be available
+n_level        = 4
+max_number_cpu = 2 ** (n_level - 1)
+# ----------------------------------------------------------------------------
+# job_table = binary_job_table(n_level)
+# Each job that is not at the bottom level has two children.
+def binary_job_table(n_level) :
+   job_table = [ {
+      'job_name'           : 'n0' ,
+      'fit_node_id'        : 0 ,
+      'split_reference_id' : None ,
+      'parent_job_id'      : None ,
+      'prior_only'         : False ,
+   } ]
+   job_id = 0
+   while job_id < len(job_table) :
+      row   = job_table[job_id]
+      level = row['job_name'].count('_')
+      row['start_child_job_id'] = len(job_table)
+      if level + 1 < n_level :
+         for child in range(2) :
+            job_table.append( {
+               'job_name'           : row['job_name'] + f'_{child}' ,
+               'fit_node_id'        : len(job_table) ,
+               'split_reference_id' : None ,
+               'parent_job_id'      : job_id ,
+               'prior_only'         : False ,
+            } )
+      row['end_child_job_id'] = len(job_table)
+      job_id += 1
+   return job_table
+# ----------------------------------------------------------------------------
+# (job_done, fit_type, peak_rss) = sleep_one_job(job_table, run_job_id, ...)
+# This replaces at_cascade.run_one_job.
+def sleep_one_job(job_table, run_job_id, **kwargs) :
+   start = time.time()
+   time.sleep(job_seconds)
+   end   = time.time()
+   job_name = job_table[run_job_id]['job_name']
+   with open( f'{result_dir}/job_time.csv', 'a' ) as file_obj :
+      file_obj.write( f'{job_name},{start},{end}\n' )
+   return (True, 'both', None)
+# ----------------------------------------------------------------------------
+# max_latency = run_fit_parallel(job_table, worker_pool)
+# maximum over the jobs of the time from the end of its parent job
+# to the start of the job.
+def run_fit_parallel(job_table, worker_pool) :
+   #
+   # all_node_database
+   all_node_database = f'{result_dir}/all_node.db'
+   connection = dismod_at.create_connection(
+      all_node_database, new = True, readonly = False
+   )
+   option_all = {
+      'result_dir'           : result_dir ,
+      'worker_pool'          : worker_pool ,
+      'shared_memory_prefix' : 'dispatch_latency_test' ,
+   }
+   tbl_name = 'option_all'
+   col_name = [ 'option_name', 'option_value' ]
+   col_type = [ 'text', 'text' ]
+   row_list = [ [ key, option_all[key] ] for key in option_all ]
+   dismod_at.create_table(connection, tbl_name, col_name, col_type, row_list)
+   connection.close()
+   #
+   # job_time.csv
+   file_name = f'{result_dir}/job_time.csv'
+   if os.path.exists(file_name) :
+      os.remove(file_name)
+   #
+   # fit_parallel
+   at_cascade.fit_parallel(
+      job_table         = job_table ,
+      start_job_id      = 0 ,
+      all_node_database = all_node_database ,
+      node_table        = list() ,
+      fit_integrand     = set() ,
+      skip_start_job    = False ,
+      max_number_cpu    = max_number_cpu ,
+      fit_type_list     = [ 'both' ] ,
+      shared_unique     = '' ,
+   )
+   #
+   # job_time
+   job_time = dict()
+   file_obj = open(file_name, 'r')
+   for line in file_obj :
+      (job_name, start, end) = line.strip().split(',')
+      job_time[job_name] = ( float(start), float(end) )
+   file_obj.close()
+   assert len(job_time) == len(job_table)
+   #
+   # max_latency
+   max_latency = 0.0
+   for row in job_table :
+      parent_job_id = row['parent_job_id']
+      if parent_job_id is not None :
+         parent_name = job_table[parent_job_id]['job_name']
+         latency     = job_time[ row['job_name'] ][0] - job_time[parent_name][1]
+         assert 0.0 <= latency
+         max_latency = max(max_latency, latency)
+   return max_latency
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # result_dir
+   at_cascade.empty_directory(result_dir)
+   #
+   # at_cascade.run_one_job
+   # The processes are forked so they use this version of run_one_job.
+   multiprocessing.set_start_method('fork', force = True)
+   at_cascade.run_one_job = sleep_one_job
+   #
+   # job_table
+   job_table = binary_job_table(n_level)
+   #
+   # check max_latency
+   # The processes wait at most ten seconds for a change in the job status.
+   # A job should start much sooner than that after its parent completes.
+   for worker_pool in [ 'true', 'false' ] :
+      max_latency = run_fit_parallel(job_table, worker_pool)
+      print( f'worker_pool = {worker_pool}: max_latency = {max_latency:.3f}' )
+      assert max_latency < 1.0
+#
+if __name__ == '__main__' :
+   main()
+   print('dispatch_latency: OK')
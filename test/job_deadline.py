@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test the timeout messages when fit_one_job runs a command with a
+# job deadline: a command that is running when the deadline is reached
+# is killed, and a command is not started after the deadline.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import importlib
+import dismod_at
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# fit_one_job_module
+# (at_cascade.fit_one_job is the function with the same name)
+fit_one_job_module = importlib.import_module('at_cascade.fit_one_job')
+# ----------------------------------------------------------------------------
+# message = run_command(metrics, command)
+# the exception message when fit_one_job runs command (None if no exception)
+def run_command(metrics, command) :
+   file_name = 'build/test/stdout.txt'
+   message   = None
+   with open(file_name, 'w') as file_stdout :
+      try :
+         fit_one_job_module.system_command(command, file_stdout, metrics)
+      except Exception as e :
+         message = str(e)
+   return message
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # work_dir
+   work_dir = 'build/test'
+   at_cascade.empty_directory(work_dir)
+   #
+   # fit_database
+   fit_database = f'{work_dir}/dismod.db'
+   connection   = dismod_at.create_connection(
+      fit_database, new = True, readonly = False
+   )
+   connection.close()
+   #
+   # metrics
+   metrics = {
+      'database'        : None,
+      'fit_database'    : fit_database,
+      'job_name'        : 'n0',
+      'fit_type'        : 'both',
+      'n_data'          : None,
+      'n_var'           : None,
+      'peak_rss'        : None,
+      'command_timeout' : None,
+      'deadline'        : None,
+   }
+   #
+   # command
+   # command[2] plays the role of the dismod_at command name
+   python_executable = sys.executable
+   command = [ python_executable, '-c', 'import time; time.sleep(60)' ]
+   #
+   # check command killed at the deadline
+   metrics['deadline'] = time.time() + 0.5
+   message = run_command(metrics, command)
+   assert message.startswith( f'timeout: {command[2]} after ' )
+   assert message.endswith( ' seconds n0' )
+   #
+   # check command not started after the deadline
+   # The deadline has passed, so the command is not run even though
+   # it would complete quickly.
+   command = [ python_executable, '-c', "print('hello world')" ]
+   message = run_command(metrics, command)
+   assert message == f'timeout: job_timeout exceeded before {command[2]} n0'
+   with open(f'{work_dir}/stdout.txt', 'r') as file_obj :
+      assert file_obj.read() == ''
+   #
+   # check log table
+   connection = dismod_at.create_connection(
+      fit_database, new = False, readonly = True
+   )
+   log_table = dismod_at.get_table_dict(connection, 'log')
+   connection.close()
+   message_list = [ row['message'] for row in log_table ]
+   assert len(message_list) == 2
+   assert message_list[0].startswith('timeout: import time; time.sleep(60)')
+   assert message_list[1].startswith('timeout: job_timeout exceeded before')
+   #
+   # check command that completes before the deadline
+   metrics['deadline'] = time.time() + 60.0
+   assert run_command(metrics, command) is None
+#
+if __name__ == '__main__' :
+   main()
+   print('job_deadline: OK')
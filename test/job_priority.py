@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Benchmark job_priority on a synthetic unbalanced tree.
+# The makespan (total wall time) for running the jobs with a fixed number
+# of processes is simulated using job_id order and subtree priority order.
+# ----------------------------------------------------------------------------
+import sys
+import os
+import heapq
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# job_table = synthetic_job_table(n_leaf, n_chain)
+# The root job has n_leaf leaf children followed by one child that is the
+# start of a chain of n_chain jobs. Each job in the chain has one leaf child.
+# The jobs are in breadth first order, like create_job_table.
+def synthetic_job_table(n_leaf, n_chain) :
+   #
+   # children
+   children = { 'r' : [ f'l{i}' for i in range(n_leaf) ] + [ 'c0' ] }
+   for i in range(n_chain) :
+      children[f'c{i}'] = [ f'c{i}l' ]
+      if i + 1 < n_chain :
+         children[f'c{i}'].append( f'c{i+1}' )
+   #
+   # job_table
+   job_table = [ {
+      'job_name'           : 'r',
+      'fit_node_id'        : 0,
+      'split_reference_id' : None,
+      'prior_only'         : False,
+      'parent_job_id'      : None,
+   } ]
+   job_id = 0
+   while job_id < len(job_table) :
+      row                       = job_table[job_id]
+      row['start_child_job_id'] = len(job_table)
+      for name in children.get( row['job_name'], list() ) :
+         job_table.append( {
+            'job_name'           : name,
+            'fit_node_id'        : len(job_table),
+            'split_reference_id' : None,
+            'prior_only'         : False,
+            'parent_job_id'      : job_id,
+         } )
+      row['end_child_job_id']   = len(job_table)
+      job_id += 1
+   return job_table
+# ----------------------------------------------------------------------------
+# makespan = simulate(job_table, n_cpu, job_time, priority)
+# Simulate the scheduling done by fit_one_process and return the time
+# at which the last job completes.
+def simulate(job_table, n_cpu, job_time, priority) :
+   #
+   # job_id_ready, running, now
+   job_id_ready = [ 0 ]
+   running      = list()
+   now          = 0.0
+   while len(job_id_ready) > 0 or len(running) > 0 :
+      #
+      # running
+      # start as many ready jobs as there are free processes
+      order = numpy.array( sorted(job_id_ready), dtype = int )
+      if priority is not None :
+         order = order[ numpy.argsort( - priority[order], kind = 'stable' ) ]
+      n_start      = min( len(order), n_cpu - len(running) )
+      job_id_ready = [ int(job_id) for job_id in order[n_start :] ]
+      for job_id in order[: n_start] :
+         heapq.heappush(running, (now + job_time[job_id], int(job_id)) )
+      #
+      # now, job_id_ready
+      # wait for the next job to complete
+      (now, job_id) = heapq.heappop(running)
+      start = job_table[job_id]['start_child_job_id']
+      end   = job_table[job_id]['end_child_job_id']
+      job_id_ready += list( range(start, end) )
+   return now
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # job_table, n_job
+   n_leaf    = 40
+   n_chain   = 20
+   job_table = synthetic_job_table(n_leaf, n_chain)
+   n_job     = len(job_table)
+   assert n_job == 1 + n_leaf + 2 * n_chain
+   #
+   # job_time
+   job_time = numpy.ones(n_job, dtype = float)
+   #
+   # subtree
+   subtree = at_cascade.job_priority(job_table)
+   assert subtree[0] == n_job
+   assert subtree[n_leaf + 1] == 2 * n_chain
+   for job_id in range(1, n_leaf + 1) :
+      assert subtree[job_id] == 1.0
+   #
+   # weighted
+   # weighting by job_time gives the same result when all the times are one
+   weighted = at_cascade.job_priority(job_table, list(job_time) )
+   assert numpy.all( weighted == subtree )
+   #
+   # n_cpu
+   for n_cpu in [ 2, 4, 8 ] :
+      #
+      # makespan_job_id, makespan_subtree
+      makespan_job_id  = simulate(job_table, n_cpu, job_time, None)
+      makespan_subtree = simulate(job_table, n_cpu, job_time, subtree)
+      print( f'n_cpu = {n_cpu}, makespan: ', end = '' )
+      print( f'job_id order = {makespan_job_id}, ', end = '' )
+      print( f'subtree order = {makespan_subtree}' )
+      #
+      # The chain of n_chain jobs after the root must be run sequentially,
+      # so n_chain + 1 is a lower bound for the makespan.
+      assert n_chain + 1 <= makespan_subtree
+      assert makespan_subtree < makespan_job_id
+#
+if __name__ == '__main__' :
+   main()
+   print('job_priority: OK')
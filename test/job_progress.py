@@ -0,0 +1,144 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test job_progress using a job queue database with known job times.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import sqlite3
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# The job tree for this test:
+#
+#           n0
+#       /        \
+#     n1          n2
+#   /    \      /    \
+# n3      n4  n5      n6
+#                     |
+#                     n7
+#
+def get_job_table() :
+   parent_list = [ None, 0, 0, 1, 1, 2, 2, 6 ]
+   job_table   = list()
+   for (job_id, parent_job_id) in enumerate(parent_list) :
+      child_list = [
+         i for (i, parent) in enumerate(parent_list) if parent == job_id
+      ]
+      if len(child_list) == 0 :
+         start_child_job_id = len(parent_list)
+         end_child_job_id   = len(parent_list)
+      else :
+         start_child_job_id = child_list[0]
+         end_child_job_id   = child_list[-1] + 1
+      job_table.append( {
+         'job_name'           : f'n{job_id}',
+         'fit_node_id'        : job_id,
+         'split_reference_id' : None,
+         'parent_job_id'      : parent_job_id,
+         'start_child_job_id' : start_child_job_id,
+         'end_child_job_id'   : end_child_job_id,
+         'prior_only'         : False,
+      } )
+   return job_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # work_dir
+   work_dir = 'build/test'
+   at_cascade.empty_directory(work_dir)
+   #
+   # job_table
+   job_table = get_job_table()
+   n_job     = len(job_table)
+   #
+   # job_queue_database
+   job_queue_database = f'{work_dir}/job_queue.db'
+   job_status         = [ 'wait' ] * n_job
+   job_status[0]      = 'ready'
+   at_cascade.create_job_queue(
+      job_queue_database = job_queue_database,
+      job_table          = job_table,
+      all_node_database  = 'all_node.db',
+      fit_integrand      = set(),
+      fit_type_list      = [ 'both' ],
+      priority           = None,
+      job_status         = job_status,
+   )
+   #
+   # progress
+   # no job has started yet
+   progress = at_cascade.job_progress(job_queue_database, 2)
+   assert progress['status_count']['ready'] == 1
+   assert progress['status_count']['wait']  == n_job - 1
+   assert progress['running']               == list()
+   assert progress['eta_seconds']           is None
+   assert progress['line'].endswith('rate unknown eta unknown')
+   #
+   # job_queue_database
+   # n0 and n1 are done, n2 is running
+   for job_id in [ 0, 1, 2 ] :
+      at_cascade.set_job_queue_status(job_queue_database, job_id, 'run')
+   for job_id in [ 0, 1 ] :
+      at_cascade.set_job_queue_status(job_queue_database, job_id, 'done')
+   #
+   # job_queue_database
+   # n0 took 100 seconds, n1 took 50 seconds, and n2 started 20 seconds ago
+   now        = time.time()
+   connection = sqlite3.connect(job_queue_database)
+   command    = 'UPDATE job_queue SET start_time = ?, end_time = ? '
+   command   += 'WHERE job_id = ?'
+   connection.execute(command, (now - 200.0, now - 100.0, 0) )
+   connection.execute(command, (now - 100.0, now - 50.0,  1) )
+   connection.execute(command, (now - 20.0,  None,        2) )
+   connection.commit()
+   connection.close()
+   #
+   # progress
+   progress     = at_cascade.job_progress(job_queue_database, 2)
+   status_count = progress['status_count']
+   assert status_count['done']  == 2
+   assert status_count['run']   == 1
+   assert status_count['ready'] == 2
+   assert status_count['wait']  == 3
+   #
+   # running
+   running = progress['running']
+   assert len(running) == 1
+   assert running[0]['job_name']   == 'n2'
+   assert running[0]['process_id'] == os.getpid()
+   assert abs( running[0]['elapsed_time'] - 20.0 ) < 5.0
+   #
+   # mean_job_time, jobs_per_hour, percent_complete
+   assert abs( progress['mean_job_time'] - 75.0 ) < 1e-6
+   assert abs( progress['jobs_per_hour'] - 36.0 ) < 1.0
+   assert abs( progress['percent_complete'] - 25.0 ) < 1e-6
+   #
+   # eta_seconds
+   # The remaining work is 6 * 75 - 20 = 430 seconds and 430 / 2 = 215.
+   # The longest chain of waiting and ready jobs is n6, n7 so 2 * 75 = 150.
+   assert abs( progress['eta_seconds'] - 215.0 ) < 5.0
+   progress = at_cascade.job_progress(job_queue_database, 8)
+   assert abs( progress['eta_seconds'] - 150.0 ) < 1e-6
+   #
+   # line
+   assert ' done 2/8 (25%) run 1 ready 2 wait 3 error 0 abort 0 ' \
+      in progress['line']
+   #
+   # job_queue_database
+   # n2 fails so n5, n6, and n7 are aborted
+   at_cascade.set_job_queue_status(job_queue_database, 2, 'error')
+   progress = at_cascade.job_progress(job_queue_database, 2)
+   assert progress['status_count']['abort'] == 3
+   assert abs( progress['percent_complete'] - 75.0 ) < 1e-6
+#
+if __name__ == '__main__' :
+   main()
+   print('job_progress: OK')
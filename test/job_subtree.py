@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test job_subtree using job_descendant to check the descendants of each job.
+# ----------------------------------------------------------------------------
+import sys
+import os
+import random
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# job_table = random_job_table(n_job)
+# Create a job table, in breadth first order, with a random number
+# of children for each job.
+def random_job_table(n_job) :
+   job_table = [ { 'parent_job_id' : None } ]
+   job_id    = 0
+   while job_id < len(job_table) :
+      row                       = job_table[job_id]
+      row['start_child_job_id'] = len(job_table)
+      n_child = random.randint(0, 4)
+      n_child = min(n_child, n_job - len(job_table) )
+      if job_id + 1 == len(job_table) :
+         # make sure we get to n_job jobs
+         n_child = max(n_child, min(1, n_job - len(job_table) ) )
+      for i in range(n_child) :
+         job_table.append( { 'parent_job_id' : job_id } )
+      row['end_child_job_id']   = len(job_table)
+      job_id += 1
+   assert len(job_table) == n_job
+   return job_table
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # random.seed
+   random.seed(0)
+   #
+   # job_table
+   n_job     = 200
+   job_table = random_job_table(n_job)
+   #
+   # subtree_order, subtree_begin, subtree_end
+   (subtree_order, subtree_begin, subtree_end) = \
+      at_cascade.job_subtree(job_table)
+   assert sorted(subtree_order) == list( range(n_job) )
+   #
+   for job_id in range(n_job) :
+      #
+      # subtree
+      begin = subtree_begin[job_id]
+      end   = subtree_end[job_id]
+      assert subtree_order[begin] == job_id
+      subtree = set( int(j) for j in subtree_order[begin : end] )
+      #
+      # check
+      for other_id in range(n_job) :
+         generation = at_cascade.job_descendant(job_table, job_id, other_id)
+         assert (generation is not None) == (other_id in subtree)
+#
+if __name__ == '__main__' :
+   main()
+   print('job_subtree: OK')
@@ -0,0 +1,178 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test the memory estimates and the admission of ready jobs used by
+# fit_one_process when there is a memory budget. The observed peak memory
+# values are set directly instead of being observed.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import heapq
+import importlib
+import numpy
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# fit_module
+# (at_cascade.fit_one_process is the function with the same name)
+fit_module = importlib.import_module('at_cascade.fit_one_process')
+# ----------------------------------------------------------------------------
+# job_id_admit = check_admit(
+#  job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+# )
+# Calls admit_jobs and checks that pop_admitted_jobs gives the same result
+# when the ready jobs are in a heap.
+def check_admit(
+   job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+) :
+   job_id_admit = fit_module.admit_jobs(
+      job_id_ready, job_id_run, n_slot, memory_budget, shared_peak_rss
+   )
+   #
+   # ready_heap
+   # the key keeps the order in job_id_ready
+   ready_heap = list()
+   for (index, job_id) in enumerate( job_id_ready.tolist() ) :
+      heapq.heappush( ready_heap, (index, job_id) )
+   #
+   # dispatch_list
+   running_set   = set( job_id_run.tolist() )
+   dispatch_list = fit_module.pop_admitted_jobs(
+      ready_heap, running_set, n_slot, memory_budget, shared_peak_rss
+   )
+   assert dispatch_list == job_id_admit.tolist()
+   #
+   # ready_heap
+   # the jobs that were not admitted are still in the heap
+   remaining = [ job_id for (key, job_id) in sorted(ready_heap) ]
+   check     = [ j for j in job_id_ready.tolist() if j not in dispatch_list ]
+   assert remaining == check
+   #
+   return job_id_admit
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # job_size
+   # job 0 is the root, jobs 1 and 2 are its children, and the other jobs
+   # are leaves. The size is one plus the number of data rows.
+   job_size = [ 10001.0, 5001.0, 5001.0 ] + 9 * [ 11.0 ]
+   job_size = numpy.array(job_size)
+   n_job    = len(job_size)
+   #
+   # memory_budget
+   # the budget is in megabytes
+   memory_budget = {
+      'max_memory' : 64.0 * 1024.0,
+      'job_size'   : job_size,
+   }
+   #
+   # shared_peak_rss
+   # the peak memory is in kilobytes (-1 if not observed)
+   shared_peak_rss = numpy.full(n_job, -1, dtype = int)
+   #
+   # all_job, no_job
+   all_job = numpy.arange(n_job, dtype = int)
+   no_job  = numpy.array( [], dtype = int )
+   #
+   # no observed peak memory: one job at a time
+   job_memory = fit_module.estimate_memory(
+      all_job, memory_budget, shared_peak_rss
+   )
+   assert job_memory is None
+   job_id_admit = check_admit(
+      all_job, no_job, 4, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == [ 0 ]
+   job_id_admit = check_admit(
+      all_job[1 :], all_job[: 1], 4, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == []
+   #
+   # shared_peak_rss
+   # root peak is 8 gigabytes and one leaf peak is 200 megabytes
+   root_peak = 8.0 * 1024.0
+   leaf_peak = 200.0
+   shared_peak_rss[0] = int( 1024.0 * root_peak )
+   shared_peak_rss[3] = int( 1024.0 * leaf_peak )
+   #
+   # job_memory
+   job_memory = fit_module.estimate_memory(
+      all_job, memory_budget, shared_peak_rss
+   )
+   #
+   # check observed jobs
+   assert job_memory[0] == root_peak
+   assert job_memory[3] == leaf_peak
+   #
+   # check root children
+   # The fixed memory in the small leaf does not inflate the estimate.
+   slope = (root_peak - leaf_peak) / job_size[0]
+   check = leaf_peak + slope * job_size[1]
+   for job_id in [ 1, 2 ] :
+      assert abs( job_memory[job_id] - check ) < 1e-10 * check
+      assert job_memory[job_id] < root_peak
+   #
+   # check other leaves
+   check = leaf_peak + slope * job_size[4]
+   for job_id in range(4, n_job) :
+      assert abs( job_memory[job_id] - check ) < 1e-10 * check
+   #
+   # estimates are not more than the largest observed peak
+   memory_budget['job_size']    = job_size.copy()
+   memory_budget['job_size'][1] = 3.0 * job_size[0]
+   job_memory = fit_module.estimate_memory(
+      all_job[1 : 2], memory_budget, shared_peak_rss
+   )
+   assert job_memory[0] == root_peak
+   memory_budget['job_size'] = job_size
+   #
+   # both root children fit in the budget
+   job_id_admit = check_admit(
+      all_job[1 : 3], no_job, 4, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == [ 1, 2 ]
+   #
+   # n_slot limits the number of jobs
+   job_id_admit = check_admit(
+      all_job[4 :], no_job, 3, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == [ 4, 5, 6 ]
+   #
+   # a job that does not fit does not block the following jobs
+   # job 1 is running, job 2 does not fit with it, the leaves do.
+   memory_budget['max_memory'] = 6.0 * 1024.0
+   job_id_ready = numpy.array( [ 2 ] + list( range(4, n_job) ), dtype = int)
+   job_id_admit = check_admit(
+      job_id_ready, all_job[1 : 2], 10, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == list( range(4, n_job) )
+   #
+   # if no job is running, the first ready job is admitted even if it
+   # does not fit in the budget
+   memory_budget['max_memory'] = 1.0 * 1024.0
+   job_id_admit = check_admit(
+      job_id_ready, no_job, 10, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit[0] == 2
+   #
+   # no memory budget
+   job_id_admit = check_admit(
+      job_id_ready, all_job[1 : 2], 3, None, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == [ 2, 4, 5 ]
+   #
+   # budget is used up by the running job so no other job is considered
+   memory_budget['max_memory'] = root_peak + leaf_peak / 2.0
+   job_id_admit = check_admit(
+      all_job[1 :], all_job[: 1], 10, memory_budget, shared_peak_rss
+   )
+   assert job_id_admit.tolist() == []
+#
+if __name__ == '__main__' :
+   main()
+   print('memory_budget: OK')
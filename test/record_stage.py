@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test writing rows to the stage_metrics table and that a failure to write
+# a row does not raise an exception.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import io
+import sqlite3
+import importlib
+import contextlib
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# fit_one_job_module
+# (at_cascade.fit_one_job is the function with the same name)
+fit_one_job_module = importlib.import_module('at_cascade.fit_one_job')
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # result_dir
+   result_dir = 'build/test'
+   at_cascade.empty_directory(result_dir)
+   #
+   # stage_metrics.db
+   database   = f'{result_dir}/stage_metrics.db'
+   connection = sqlite3.connect(database)
+   command  = 'CREATE TABLE stage_metrics ('
+   command += 'stage_metrics_id integer primary key, job_name text, '
+   command += 'fit_type text, stage text, command text, wall_time real, '
+   command += 'user_time real, system_time real, max_rss real, '
+   command += 'n_data integer, n_var integer, unix_time real)'
+   connection.execute(command)
+   connection.commit()
+   connection.close()
+   #
+   # metrics, usage
+   metrics = {
+      'database' : database,
+      'job_name' : "n0.'both'",
+      'fit_type' : 'both',
+      'n_data'   : None,
+      'n_var'    : None,
+   }
+   usage = {
+      'wall_time'   : 1.5,
+      'user_time'   : None,
+      'system_time' : None,
+      'max_rss'     : 10.0,
+   }
+   #
+   # record_stage
+   fit_one_job_module.record_stage(metrics, 'setup', None, usage)
+   metrics['n_data'] = 3
+   metrics['n_var']  = 4
+   fit_one_job_module.record_stage(metrics, 'fit', 'dismod_at db fit', usage)
+   #
+   # check the table
+   connection = sqlite3.connect(database)
+   command  = 'SELECT job_name, stage, command, wall_time, user_time, '
+   command += 'n_data, n_var FROM stage_metrics ORDER BY stage_metrics_id'
+   row_list = connection.execute(command).fetchall()
+   connection.close()
+   assert row_list == [
+      ( "n0.'both'", 'setup', None, 1.5, None, None, None ),
+      ( "n0.'both'", 'fit', 'dismod_at db fit', 1.5, None, 3, 4 ),
+   ]
+   #
+   # check a failure to write a row
+   # the table does not exist in this database
+   metrics['database'] = f'{result_dir}/empty.db'
+   file_stdout = io.StringIO()
+   with contextlib.redirect_stdout(file_stdout) :
+      fit_one_job_module.record_stage(metrics, 'fit', None, usage)
+   assert file_stdout.getvalue().startswith('warning: stage_metrics:')
+#
+if __name__ == '__main__' :
+   main()
+   print('record_stage: OK')
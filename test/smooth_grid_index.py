@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Micro-benchmark for the smooth_grid index used by create_shift_db.
+# It compares finding the grid rows for each smoothing by scanning the
+# smooth_grid table with using the index. The model has many covariate
+# multipliers and fine age and time grids.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+import importlib
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+# create_shift_db_module
+# (at_cascade.create_shift_db is the function with the same name)
+create_shift_db_module = importlib.import_module('at_cascade.create_shift_db')
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # n_mulcov, n_rate, n_age, n_time, n_child
+   n_mulcov = 40
+   n_rate   = 4
+   n_age    = 41
+   n_time   = 11
+   n_child  = 10
+   #
+   # n_smooth
+   # one smoothing for each mulcov, a parent and child smoothing for each rate
+   n_smooth = n_mulcov + 2 * n_rate
+   #
+   # smooth_grid_table
+   # The rows for the different smoothings are interleaved.
+   smooth_grid_table = list()
+   for age_id in range(n_age) :
+      for time_id in range(n_time) :
+         for smooth_id in range(n_smooth) :
+            smooth_grid_table.append( {
+               'smooth_id'      : smooth_id ,
+               'age_id'         : age_id ,
+               'time_id'        : time_id ,
+               'value_prior_id' : 3 * smooth_id ,
+               'dage_prior_id'  : 3 * smooth_id + 1 ,
+               'dtime_prior_id' : 3 * smooth_id + 2 ,
+               'const_value'    : None ,
+            } )
+   #
+   # scan_list, scan_time
+   # rows for each child and smoothing found by scanning the table
+   start_time = time.time()
+   scan_list  = list()
+   for child in range(n_child) :
+      for smooth_id in range(n_smooth) :
+         row_list = list()
+         for row in smooth_grid_table :
+            if row['smooth_id'] == smooth_id :
+               row_list.append(row)
+         scan_list.append(row_list)
+   scan_time = time.time() - start_time
+   #
+   # index_list, index_time
+   # rows for each child and smoothing found using the index
+   start_time        = time.time()
+   smooth_grid_index = create_shift_db_module.get_smooth_grid_index(
+      smooth_grid_table
+   )
+   index_list = list()
+   for child in range(n_child) :
+      for smooth_id in range(n_smooth) :
+         index_list.append( smooth_grid_index[smooth_id] )
+   index_time = time.time() - start_time
+   #
+   # check
+   # same rows in the same order
+   assert len(scan_list) == len(index_list)
+   for (scan_rows, index_rows) in zip(scan_list, index_list) :
+      assert len(scan_rows) == n_age * n_time
+      assert len(scan_rows) == len(index_rows)
+      for (scan_row, index_row) in zip(scan_rows, index_rows) :
+         assert scan_row is index_row
+   #
+   # timing
+   n_grid = len(smooth_grid_table)
+   print( f'n_smooth = {n_smooth}, n_grid = {n_grid}, n_child = {n_child}: ' )
+   print( f'scan {scan_time:.3f} sec, index {index_time:.3f} sec' )
+#
+if __name__ == '__main__' :
+   main()
+   print('smooth_grid_index: OK')
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+import os
+import sys
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+#
+def main() :
+   #
+   # work_dir
+   work_dir = 'build/test'
+   at_cascade.empty_directory(work_dir)
+   #
+   # python_executable
+   python_executable = sys.executable
+   #
+   # usage
+   # allocate about 50 megabytes and write to standard output
+   command = [
+      python_executable, '-c',
+      "x = bytearray(50 * 1024 * 1024); print('hello world')"
+   ]
+   file_name = f'{work_dir}/stdout.txt'
+   with open(file_name, 'w') as file_stdout :
+      usage = at_cascade.system_command(command, file_stdout)
+   #
+   # check stdout
+   with open(file_name, 'r') as file_obj :
+      line_list = file_obj.readlines()
+   assert line_list[0] == ' '.join(command) + '\n'
+   assert line_list[1] == 'hello world\n'
+   #
+   # check usage
+   assert usage['wall_time'] >= 0.0
+   if usage['max_rss'] is not None :
+      assert usage['max_rss'] >= 50.0
+      assert usage['user_time'] >= 0.0
+      assert usage['system_time'] >= 0.0
+   #
+   # check error
+   command = [ python_executable, '-c', 'import sys; sys.exit(3)' ]
+   with open(file_name, 'w') as file_stdout :
+      try :
+         at_cascade.system_command(command, file_stdout)
+         ok = False
+      except AssertionError as e :
+         ok = str(e).startswith('system_command failed: returncode = 3')
+   assert ok
+   #
+   # check timeout
+   command = [ python_executable, '-c', 'import time; time.sleep(60)' ]
+   with open(file_name, 'w') as file_stdout :
+      try :
+         at_cascade.system_command(command, file_stdout, timeout = 0.5)
+         ok = False
+      except AssertionError as e :
+         ok = str(e).startswith('system_command timeout: after 0.5 seconds')
+   assert ok
+   #
+   # check command that completes before timeout
+   command = [ python_executable, '-c', "print('hello world')" ]
+   with open(file_name, 'w') as file_stdout :
+      usage = at_cascade.system_command(command, file_stdout, timeout = 60.0)
+   assert usage['wall_time'] < 60.0
+#
+if __name__ == '__main__' :
+   main()
+   print('system_command: OK')
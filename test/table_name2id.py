@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+# SPDX-FileCopyrightText: University of Washington <https://www.washington.edu>
+# SPDX-FileContributor: 2021-26 Bradley M. Bell
+# ----------------------------------------------------------------------------
+# Test table_name2id, including changes to a table after its index is cached,
+# and report the time to look up every row of a large node table.
+# ----------------------------------------------------------------------------
+import os
+import sys
+import time
+#
+# import at_cascade with a preference current directory version
+current_directory = os.getcwd()
+if os.path.isfile( current_directory + '/at_cascade/__init__.py' ) :
+   sys.path.insert(0, current_directory)
+import at_cascade
+# ----------------------------------------------------------------------------
+# row_id = scan_name2id(table, tbl_name, row_name)
+# the linear search that table_name2id used to do
+def scan_name2id(table, tbl_name, row_name) :
+   col_name = tbl_name + '_name'
+   row_id   = None
+   for (index, row) in enumerate(table) :
+      if row[col_name] == row_name :
+         row_id = index
+   return row_id
+# ----------------------------------------------------------------------------
+def main() :
+   #
+   # node_table
+   node_table = list()
+   for node_id in range(4) :
+      node_table.append( { 'node_name' : f'n{node_id}', 'parent' : None } )
+   assert at_cascade.table_name2id(node_table, 'node', 'n2') == 2
+   #
+   # append a row
+   node_table.append( { 'node_name' : 'n4', 'parent' : 0 } )
+   assert at_cascade.table_name2id(node_table, 'node', 'n4') == 4
+   #
+   # change a name in place
+   node_table[1]['node_name'] = 'one'
+   assert at_cascade.table_name2id(node_table, 'node', 'one') == 1
+   node_table[3]['node_name'] = 'n1'
+   assert at_cascade.table_name2id(node_table, 'node', 'n1') == 3
+   #
+   # replace a row
+   node_table[0] = { 'node_name' : 'zero', 'parent' : None }
+   assert at_cascade.table_name2id(node_table, 'node', 'zero') == 0
+   #
+   # a name that is not in the table
+   try :
+      at_cascade.table_name2id(node_table, 'node', 'n0')
+      ok = False
+   except AssertionError as error :
+      ok = 'is not presnet in column "node_name"' in str(error)
+   assert ok
+   #
+   # same table object with a different table name
+   table = [ { 'a_name' : 'x', 'b_name' : 'y' } ]
+   assert at_cascade.table_name2id(table, 'a', 'x') == 0
+   assert at_cascade.table_name2id(table, 'b', 'y') == 0
+   #
+   # the last row with a name is used
+   table = [ { 'c_name' : 'x' }, { 'c_name' : 'y' }, { 'c_name' : 'x' } ]
+   assert at_cascade.table_name2id(table, 'c', 'x') == 2
+   #
+   # node_table
+   n_node     = 5000
+   node_table = list()
+   for node_id in range(n_node) :
+      node_table.append( { 'node_name' : f'n{node_id}', 'parent' : None } )
+   #
+   # scan_time
+   start_time = time.time()
+   for node_id in range(n_node) :
+      row_id = scan_name2id(node_table, 'node', f'n{node_id}')
+      assert row_id == node_id
+   scan_time = time.time() - start_time
+   #
+   # index_time
+   start_time = time.time()
+   for node_id in range(n_node) :
+      row_id = at_cascade.table_name2id(node_table, 'node', f'n{node_id}')
+      assert row_id == node_id
+   index_time = time.time() - start_time
+   #
+   # timing
+   print( f'n_node = {n_node}: ', end = '' )
+   print( f'scan {scan_time:.3f} sec, table_name2id {index_time:.3f} sec' )
+#
+if __name__ == '__main__' :
+   main()
+   print('table_name2id: OK')